@@ -1,4 +1,14 @@
-import { boolean, customType, pgTable, text, timestamp, jsonb, json } from 'drizzle-orm/pg-core';
+import {
+	boolean,
+	customType,
+	index,
+	integer,
+	pgTable,
+	text,
+	timestamp,
+	jsonb,
+	json
+} from 'drizzle-orm/pg-core';
 import { relations, sql } from 'drizzle-orm';
 
 export const userTable = pgTable('user', {
@@ -80,6 +90,28 @@ export const fileRelations = relations(fileTable, ({ one }) => ({
 	})
 }));
 
+// The queue of files whose analyses the kernel precomputes in the background
+export const precomputeJobTable = pgTable(
+	'precompute_job',
+	{
+		file: text('file')
+			.primaryKey()
+			.references(() => fileTable.id, { onDelete: 'cascade' }),
+		// the version of the file the job is for
+		modifiedTime: timestamp('modified_time').notNull(),
+		// pending, running, done or failed
+		status: text('status').notNull().default('pending'),
+		attempts: integer('attempts').notNull().default(0),
+		error: text('error'),
+		updatedTime: timestamp('updated_time')
+			.default(sql`CURRENT_TIMESTAMP`)
+			.notNull()
+	},
+	(table) => ({
+		statusIndex: index('precompute_job_status_index').on(table.status, table.updatedTime)
+	})
+);
+
 export const sessionTable = pgTable('session', {
 	id: text('id').primaryKey(),
 	name: text('name').notNull(),
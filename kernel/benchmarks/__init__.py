@@ -0,0 +1 @@
+"""Benchmarks of the kernel, run as modules from the root of the kernel."""
@@ -0,0 +1,99 @@
+"""
+Benchmark the chunked pitch and formant analysis of a long recording.
+
+The torgo test recordings are concatenated into a recording of about ten minutes, which is
+analysed at once like Praat does, and in chunks on a pool of worker processes. For the formants,
+resampling the recording is part of both timings, as the chunked analysis does it up front.
+
+Run from the root of the kernel with: poetry run python -m benchmarks.bench_chunked_analysis
+"""
+
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import parselmouth
+
+from spectral.signal_analysis import (
+    FORMANT_CEILING,
+    analyse_time_window,
+    global_peak,
+    load_wav,
+)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "tests" / "data" / "torgo-dataset"
+DURATION = 600
+CHUNK_DURATION = 30.0
+PROCESSES = os.cpu_count() or 1
+
+
+def long_recording() -> parselmouth.Sound:
+    """Concatenate the torgo recordings until the recording is DURATION seconds long."""
+    recordings = [
+        load_wav(path.read_bytes()).sound.resample(16000).as_array()[0]
+        for path in sorted(DATA_DIR.iterdir())
+    ]
+    samples = np.concatenate(recordings)
+    samples = np.tile(samples, -(-DURATION * 16000 // len(samples)))[: DURATION * 16000]
+    return parselmouth.Sound(samples, sampling_frequency=16000)
+
+
+def timed(function: Callable[[], object]) -> float:
+    """Return the time (in seconds) a call of the function takes."""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print the time of the single and chunked analyses, and the speedup."""
+    sound = long_recording()
+    with ProcessPoolExecutor(max_workers=PROCESSES) as pool:
+        # start the workers before timing
+        list(pool.map(abs, range(PROCESSES)))
+        analyses = {
+            "pitch": (
+                lambda: sound.to_pitch(time_step=0.01),
+                lambda: analyse_time_window(
+                    sound,
+                    None,
+                    None,
+                    0.04,
+                    0.01,
+                    "pitch",
+                    {"peak": global_peak(sound)},
+                    pool,
+                    CHUNK_DURATION,
+                ),
+            ),
+            "formants": (
+                lambda: sound.to_formant_burg(time_step=0.00625, window_length=0.025),
+                lambda: analyse_time_window(
+                    sound.resample(2 * FORMANT_CEILING),
+                    None,
+                    None,
+                    0.05,
+                    0.00625,
+                    "formant",
+                    {"window_length": 0.025, "n_formants": 5},
+                    pool,
+                    CHUNK_DURATION,
+                ),
+            ),
+        }
+        print(f"{DURATION} s recording, {CHUNK_DURATION} s chunks, {PROCESSES} processes")  # noqa: T201
+        print(f"{'analysis':<12}{'single (s)':>12}{'chunked (s)':>13}{'speedup':>10}")  # noqa: T201
+        for name, (single, chunked) in analyses.items():
+            single_time = timed(single)
+            chunked_time = timed(chunked)
+            print(  # noqa: T201
+                f"{name:<12}{single_time:>12.2f}{chunked_time:>13.2f}"
+                f"{single_time / chunked_time:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark the per-request cost of convert_to_wav on the torgo test recordings.
+
+Compares transcoding every recording with ffmpeg against the header sniffing, which returns
+recordings that already are 16-bit PCM wav files untouched.
+
+Run from the root of the kernel with: poetry run python -m benchmarks.bench_convert_to_wav
+"""
+
+import timeit
+from functools import partial
+from pathlib import Path
+
+from spectral.mode_handler import _run_ffmpeg, convert_to_wav, fix_wav_header
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "tests" / "data" / "torgo-dataset"
+REPEAT = 20
+
+
+def transcode(data: bytes) -> bytes:
+    """Transcode a recording like convert_to_wav did for every recording before the sniffing."""
+    return fix_wav_header(_run_ffmpeg("pipe:0", data).stdout)
+
+
+def best_time(function: partial) -> float:
+    """Return the fastest of `REPEAT` calls of the function, in milliseconds."""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1000
+
+
+def main() -> None:
+    """Print the time of transcoding and of sniffing every recording."""
+    print(f"{'file':<40}{'ffmpeg (ms)':>14}{'sniffed (ms)':>14}{'saved (ms)':>14}")  # noqa: T201
+    for path in sorted(DATA_DIR.iterdir()):
+        data = path.read_bytes()
+        ffmpeg_time = best_time(partial(transcode, data))
+        sniffed_time = best_time(partial(convert_to_wav, data))
+        print(  # noqa: T201
+            f"{path.name:<40}{ffmpeg_time:>14.3f}{sniffed_time:>14.3f}"
+            f"{ffmpeg_time - sniffed_time:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
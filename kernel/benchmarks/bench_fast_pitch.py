@@ -0,0 +1,55 @@
+"""
+Benchmark the speed and accuracy of the yin pitch engine against the pitch analysis of Praat.
+
+Both engines run through calculate_sound_pitch on the torgo test recordings, on the same frames.
+The accuracy of yin is relative to Praat: the fraction of frames with the same voicing, the
+fraction of frames voiced by both that are off by more than a quarter octave (gross errors), and
+the median difference in cents of the other frames.
+
+Run from the root of the kernel with: poetry run python -m benchmarks.bench_fast_pitch
+"""
+
+import timeit
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from spectral.signal_analysis import calculate_sound_pitch, load_wav
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "tests" / "data" / "torgo-dataset"
+REPEAT = 20
+GROSS_ERROR_CENTS = 300
+
+
+def best_time(function: partial) -> float:
+    """Return the fastest of `REPEAT` calls of the function, in milliseconds."""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1000
+
+
+def main() -> None:
+    """Print the time of both engines on every recording, and the accuracy of yin."""
+    print(  # noqa: T201
+        f"{'file':<40}{'frames':>8}{'praat (ms)':>12}{'yin (ms)':>10}{'speedup':>10}"
+        f"{'voicing':>9}{'gross':>8}{'cents':>8}"
+    )
+    for path in sorted(DATA_DIR.iterdir()):
+        sound = load_wav(path.read_bytes()).sound
+        # a sound has no analysis context to memoize the pitch in, so every call computes it
+        praat_time = best_time(partial(calculate_sound_pitch, sound))
+        yin_time = best_time(partial(calculate_sound_pitch, sound, engine="yin"))
+
+        praat = np.array(calculate_sound_pitch(sound)["data"])
+        yin = np.array(calculate_sound_pitch(sound, engine="yin")["data"])
+        voiced = (praat > 0) & (yin > 0)
+        cents = np.abs(1200 * np.log2(yin[voiced] / praat[voiced]))
+        gross = cents > GROSS_ERROR_CENTS
+        print(  # noqa: T201
+            f"{path.name:<40}{len(praat):>8}{praat_time:>12.2f}{yin_time:>10.2f}"
+            f"{praat_time / yin_time:>9.1f}x{np.mean((praat > 0) == (yin > 0)):>9.1%}"
+            f"{np.mean(gross):>8.1%}{np.median(cents[~gross]):>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
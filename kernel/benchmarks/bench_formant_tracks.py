@@ -0,0 +1,69 @@
+"""
+Benchmark the extraction of formant tracks on the torgo test recordings.
+
+Compares looking up every formant of every frame with get_value_at_time, which is what
+calculate_sound_formants_for_spectrogram used to do, against extracting all frames at once
+with formant_tracks. The Burg analysis itself is left out of the timings, it is the same for both.
+
+Run from the root of the kernel with: poetry run python -m benchmarks.bench_formant_tracks
+"""
+
+import math
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import parselmouth
+
+from spectral.signal_analysis import formant_tracks, load_wav, nan_to_none
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "tests" / "data" / "torgo-dataset"
+REPEAT = 20
+N_FORMANTS = 5
+
+
+def per_frame(formants: parselmouth.Formant) -> list:
+    """Look up the formants frame by frame, like before formant_tracks."""
+    data: list = []
+    for frame in np.arange(1, len(formants) + 1):
+        frame_formant_data: list = []
+        for x in range(1, N_FORMANTS + 1):
+            cur = formants.get_value_at_time(
+                formant_number=x,
+                time=formants.frame_number_to_time(frame),
+            )
+            if math.isnan(cur):
+                cur = None
+            frame_formant_data.append(cur)
+        data.append(frame_formant_data)
+    return data
+
+
+def tracks(formants: parselmouth.Formant) -> list:
+    """Extract the formants of all frames at once, like the kernel does."""
+    return nan_to_none(formant_tracks(formants, N_FORMANTS))
+
+
+def best_time(
+    extract: Callable[[parselmouth.Formant], list], formants: parselmouth.Formant
+) -> float:
+    """Return the fastest of `REPEAT` extractions of the formants, in milliseconds."""
+    return min(timeit.repeat(lambda: extract(formants), number=1, repeat=REPEAT)) * 1000
+
+
+def main() -> None:
+    """Print the time of both extractions on every recording."""
+    print(f"{'file':<40}{'frames':>8}{'per frame (ms)':>16}{'tracks (ms)':>14}{'speedup':>10}")  # noqa: T201
+    for path in sorted(DATA_DIR.iterdir()):
+        formants = load_wav(path.read_bytes()).sound.to_formant_burg(window_length=0.025)
+        loop_time = best_time(per_frame, formants)
+        tracks_time = best_time(tracks, formants)
+        print(  # noqa: T201
+            f"{path.name:<40}{len(formants):>8}{loop_time:>16.3f}{tracks_time:>14.3f}"
+            f"{loop_time / tracks_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark the encoding of spectrogram-matrix responses on the torgo test recordings.
+
+Compares rendering the spectrogram as nested lists with orjson, which is what the JSON response
+used to cost, against the float32 and uint8 binary encodings.
+
+Run from the root of the kernel with: poetry run python -m benchmarks.bench_spectrogram_response
+"""
+
+from __future__ import annotations
+
+import timeit
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from spectral.mode_handler import spectrogram_matrix_analysis
+from spectral.spectrogram_response import encode_spectrogram
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "tests" / "data" / "torgo-dataset"
+REPEAT = 10
+
+
+def as_json(spectrogram: dict[str, Any]) -> bytes:
+    """Render the JSON response, with the values converted to nested lists first."""
+    return orjson.dumps({**spectrogram, "data": spectrogram["data"].tolist()})
+
+
+ENCODERS = {
+    "json": as_json,
+    "float32": partial(encode_spectrogram, encoding="float32"),
+    "uint8": partial(encode_spectrogram, encoding="uint8"),
+}
+
+
+def main() -> None:
+    """Print the size and encoding time of every encoding of every recording."""
+    print(f"{'file':<36}{'encoding':>10}{'size (kB)':>12}{'time (ms)':>12}")  # noqa: T201
+    for path in sorted(DATA_DIR.iterdir()):
+        spectrogram = spectrogram_matrix_analysis({"data": path.read_bytes()}, {})
+        for name, encode in ENCODERS.items():
+            size = len(encode(spectrogram)) / 1000
+            encode_time = (
+                min(timeit.repeat(partial(encode, spectrogram), number=1, repeat=REPEAT)) * 1000
+            )
+            print(f"{path.name:<36}{name:>10}{size:>12.1f}{encode_time:>12.3f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
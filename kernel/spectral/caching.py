@@ -0,0 +1,181 @@
+"""In-process caches, shared by the different analysis stages of the kernel."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe least recently used cache with a budget on the total size of its entries.
+
+    The size of an entry is determined by `size_of` when it is stored, by default every entry
+    has size 1, which makes `max_size` a bound on the amount of entries. When storing an entry
+    would exceed the budget, the least recently used entries are evicted first. Entries larger
+    than the whole budget are not stored at all.
+
+    Attributes
+    ----------
+        max_size (int): The budget for the total size of the entries.
+        hits (int): The amount of lookups that found an entry.
+        misses (int): The amount of lookups that did not find an entry.
+        evictions (int): The amount of entries that were evicted to make room for others.
+
+    """
+
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_size: int, size_of: Callable[[V], int] | None = None) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+        ----
+            max_size (int): The budget for the total size of the entries.
+            size_of (Callable | None): Returns the size of an entry, 1 for every entry if None.
+
+        """
+        self.max_size = max_size
+        self._size_of = size_of
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> V | None:
+        """Return the entry stored under the key and mark it as recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        """Store an entry under the key, evicting the least recently used entries if needed."""
+        size = 1 if self._size_of is None else self._size_of(value)
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._size -= old_entry[1]
+            if size > self.max_size:
+                return
+            while self._entries and self._size + size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self._size += size
+
+    def delete(self, key: K) -> None:
+        """Remove the entry stored under the key, if any."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def __contains__(self, key: object) -> bool:
+        """Check whether an entry is stored under the key, without counting a lookup."""
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        """Return the amount of entries."""
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self._size,
+                "maxSize": self.max_size,
+            }
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent computations with the same key into a single one.
+
+    The first call with a key starts the computation as a task, calls with the same key made
+    while it runs await that task instead of computing again. A caller that is cancelled does
+    not cancel the computation for the others. Only computations that are still running are
+    shared, finished results are not kept.
+
+    Attributes
+    ----------
+        calls (int): The amount of computations that were started.
+        coalesced (int): The amount of calls that awaited a computation started by another.
+
+    """
+
+    calls: int
+    coalesced: int
+
+    def __init__(self) -> None:
+        """Initialize without running computations."""
+        self._tasks: dict[K, asyncio.Task[V]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _finish(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, in case every caller was cancelled
+
+    async def run(self, key: K, compute: Callable[[], Awaitable[V]]) -> V:
+        """Return the result of `compute`, shared with the concurrent calls with the same key."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._tasks[key] = task
+            task.add_done_callback(lambda task: self._finish(key, task))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        """Return the amount of running computations."""
+        return len(self._tasks)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters and the amount of running computations."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inFlight": len(self._tasks),
+        }
+
+    def clear(self) -> None:
+        """Reset the counters, running computations are left to finish."""
+        self.calls = 0
+        self.coalesced = 0
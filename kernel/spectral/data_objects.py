@@ -58,11 +58,42 @@ class WaveformResponse(BaseModel):
     ----------
         pitch (list[float]): List of pitch frequencies for multiple frames (in Hz).
         formants (list[list[float]]): List of f1 and f2's for multiple frames (in Hz).
+        pitchTimeStep (float): Time between the pitch frames (in seconds).
+        pitchStartTime (float): Time of the center of the first pitch frame (in seconds).
+        formantsTimeStep (float): Time between the formant frames (in seconds).
+        formantsStartTime (float): Time of the center of the first formant frame (in seconds).
 
     """
 
     pitch: list[float]
-    formants: list[list[float]]
+    formants: list[list[float | None]]
+    pitchTimeStep: float | None = None
+    pitchStartTime: float | None = None
+    formantsTimeStep: float | None = None
+    formantsStartTime: float | None = None
+
+
+class PeaksResponse(BaseModel):
+    """
+    PeaksResponse model representing the envelopes of a signal for drawing its waveform.
+
+    Attributes
+    ----------
+        frameRate (int): Sample frequency of the signal (in Hz).
+        levels (list[int]): Amount of samples per peak at every available level.
+        samplesPerPeak (int): Amount of samples per peak at the returned level.
+        min (list[float]): Minimum sample of every peak.
+        max (list[float]): Maximum sample of every peak.
+        rms (list[float]): Root mean square of the samples of every peak.
+
+    """
+
+    frameRate: int
+    levels: list[int]
+    samplesPerPeak: int
+    min: list[float]
+    max: list[float]
+    rms: list[float]
 
 
 class VowelSpaceResponse(BaseModel):
@@ -80,6 +111,20 @@ class VowelSpaceResponse(BaseModel):
     f2: float
 
 
+class FramesResponse(BaseModel):
+    """
+    FramesResponse model representing the results of the analysis of many frames.
+
+    Attributes
+    ----------
+        frames (list[FrameAnalysisResponse]): Frame analysis results for every requested frame,
+                                              in the order they were requested.
+
+    """
+
+    frames: list[FrameAnalysisResponse]
+
+
 class TranscriptionSegment(BaseModel):
     """
     TranscriptionSegment model representing a segment of a signal transcription.
@@ -204,10 +249,87 @@ class SpectrogramResponse(BaseModel):
     Attributes
     ----------
         formants (List[List[float|None]]): List of 5 formants.
+        timeStep (float): Time between the frames (in seconds).
+        startTime (float): Time of the center of the first frame (in seconds).
 
     """
 
     formants: list[list[float | None]]
+    timeStep: float | None = None
+    startTime: float | None = None
+
+
+class SpectrogramMatrixResponse(BaseModel):
+    """
+    SpectrogramMatrixResponse model representing the JSON response of the spectrogram-matrix mode.
+
+    Attributes
+    ----------
+        timeStep (float): Time between the center of the frames (in seconds).
+        windowLength (float): Duration of the analysis window (in seconds).
+        frequencyStep (float): Frequency resolution (in Hz).
+        startTime (float): Time of the center of the first frame (in seconds).
+        data (List[List[float]]): Power spectral density of every frequency bin in every frame.
+
+    """
+
+    timeStep: float
+    windowLength: float
+    frequencyStep: float
+    startTime: float
+    data: list[list[float]]
+
+
+class SpectrogramTileResponse(BaseModel):
+    """
+    SpectrogramTileResponse model representing the JSON response of the spectrogram tile endpoint.
+
+    Attributes
+    ----------
+        zoom (int): The zoom level of the tile.
+        index (int): The index of the tile within the zoom level.
+        maxZoom (int): The zoom level at the full resolution of the spectrogram.
+        tiles (int): The amount of tiles at the zoom level.
+        timeStep (float): Time between the center of the frames (in seconds).
+        windowLength (float): Duration of the analysis window (in seconds).
+        frequencyStep (float): Frequency resolution (in Hz).
+        startTime (float): Time of the center of the first frame of the tile (in seconds).
+        data (List[List[float]]): Power spectral density of every frequency bin in every frame.
+
+    """
+
+    zoom: int
+    index: int
+    maxZoom: int
+    tiles: int
+    timeStep: float
+    windowLength: float
+    frequencyStep: float
+    startTime: float
+    data: list[list[float]]
+
+
+class PrecomputeJobResponse(BaseModel):
+    """
+    PrecomputeJobResponse model representing the precompute job of a file.
+
+    Attributes
+    ----------
+        file (str): The ID of the file.
+        status (str): "pending", "running", "done" or "failed".
+        attempts (int): The amount of times the job was started.
+        error (str | None): Why the job failed, if it did.
+        modifiedTime (datetime): The version of the file the job is for.
+        updatedTime (datetime): When the status of the job last changed.
+
+    """
+
+    file: str
+    status: Literal["pending", "running", "done", "failed"]
+    attempts: int
+    error: str | None
+    modifiedTime: datetime
+    updatedTime: datetime
 
 
 class FileStateBody(BaseModel):
@@ -2,26 +2,342 @@
 
 from __future__ import annotations
 
+import contextlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
+from itertools import groupby
 from typing import Self
 
 import psycopg
+from psycopg import Column, sql
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
 
 
-class Database:
+def create_async_connection_pool(  # noqa: PLR0913
+    user: str,
+    password: str,
+    host: str,
+    port: str,
+    dbname: str,
+    min_size: int = 1,
+    max_size: int = 10,
+) -> AsyncConnectionPool:
     """
-    Database class for interacting with a PostgreSQL database.
+    Create an asynchronous pool of connections to the specified PostgreSQL database.
 
-    This class handles connecting to the database, fetching files, and closing the connection.
+    The pool is not opened yet: this has to happen from within a running event loop, by
+    awaiting `pool.open()`.
+
+    Args:
+    ----
+        user (str): The username for the database.
+        password (str): The password for the database.
+        host (str): The host address of the database.
+        port (str): The port number for the database.
+        dbname (str): The name of the database.
+        min_size (int): The amount of connections the pool keeps open.
+        max_size (int): The maximum amount of connections the pool can hand out at once.
+
+    Returns:
+    -------
+        AsyncConnectionPool: The (still closed) connection pool.
+
+    """
+    conninfo = make_conninfo(dbname=dbname, user=user, password=password, host=host, port=port)
+    return AsyncConnectionPool(conninfo, min_size=min_size, max_size=max_size, open=False)
+
+
+def snake_to_camel(snake_case_str: str) -> str:
+    """
+    Convert a snake_case string to camelCase.
+
+    Parameters
+    ----------
+    - snake_case_str (str): The snake_case string to be converted.
+
+    Returns
+    -------
+    - str: The camelCase version of the input string.
+
+    Example:
+    ```python
+    camel_case_str = snake_to_camel('example_string')
+    ```
+
+    """
+    components = snake_case_str.split("_")
+    return components[0] + "".join(x.title() for x in components[1:])
+
+
+FILE_QUERY = "SELECT * FROM files WHERE id = %s"
+
+FILES_QUERY = "SELECT * FROM files WHERE id = ANY(%s)"
+
+SESSION_FILE_IDS_QUERY = """
+    SELECT id FROM files
+    WHERE session = %s
+    ORDER BY creation_time, id
+"""
+
+# amount of rows a server-side cursor transfers per round trip when streaming files
+FETCH_FILES_BATCH_SIZE = 8
+
+FILE_METADATA_QUERY = """
+    SELECT id, octet_length(data) AS file_size, creation_time, modified_time
+    FROM files
+    WHERE id = %s
+"""
+
+TRANSCRIPTIONS_QUERY = """
+    SELECT file_transcription.file, file_transcription.id, transcription.start,
+           transcription."end", transcription.value
+    FROM file_transcription
+    LEFT JOIN transcription ON transcription.file_transcription = file_transcription.id
+    WHERE file_transcription.file = ANY(%s)
+    ORDER BY file_transcription.file, file_transcription.id, transcription.start
+"""
+
+# a file that already has a job keeps it, unless the file was modified since or the job failed
+ENQUEUE_PRECOMPUTE_JOBS_QUERY = """
+    INSERT INTO precompute_job (file, modified_time)
+    SELECT id, modified_time FROM files
+    WHERE id = ANY(%s)
+    ON CONFLICT (file) DO UPDATE
+    SET status = 'pending', modified_time = EXCLUDED.modified_time, attempts = 0, error = NULL,
+        updated_time = now()
+    WHERE precompute_job.modified_time <> EXCLUDED.modified_time
+       OR precompute_job.status = 'failed'
+"""
+
+# the files uploaded or modified after the newest version of a file with a job, or within the
+# given time (in seconds) when there are no jobs yet, so the existing files are only queued on
+# request, as are the files whose job failed
+ENQUEUE_NEW_FILES_QUERY = """
+    INSERT INTO precompute_job (file, modified_time)
+    SELECT id, modified_time FROM files
+    WHERE modified_time > coalesce(
+        (SELECT max(modified_time) FROM precompute_job),
+        localtimestamp - %s * interval '1 second'
+    )
+    ON CONFLICT (file) DO UPDATE
+    SET status = 'pending', modified_time = EXCLUDED.modified_time, attempts = 0, error = NULL,
+        updated_time = now()
+"""
+
+# the running jobs that were not finished in time too often, which are not claimed again
+FAIL_STALE_PRECOMPUTE_JOBS_QUERY = """
+    UPDATE precompute_job
+    SET status = 'failed', error = 'Not finished after ' || attempts || ' attempts',
+        updated_time = now()
+    WHERE status = 'running' AND attempts >= %s
+      AND updated_time < now() - %s * interval '1 second'
+"""
+
+# the oldest pending job, or a running job whose worker has not finished it in time, the jobs
+# that other workers are claiming at the same moment are skipped instead of waited for
+CLAIM_PRECOMPUTE_JOB_QUERY = """
+    UPDATE precompute_job
+    SET status = 'running', attempts = attempts + 1, updated_time = now()
+    WHERE file = (
+        SELECT file FROM precompute_job
+        WHERE status = 'pending'
+           OR (status = 'running' AND attempts < %s
+               AND updated_time < now() - %s * interval '1 second')
+        ORDER BY updated_time
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING file, modified_time
+"""
+
+# a job is only finished for the version of the file it was claimed for
+FINISH_PRECOMPUTE_JOB_QUERY = """
+    UPDATE precompute_job
+    SET status = %s, error = %s, updated_time = now()
+    WHERE file = %s AND modified_time = %s AND status = 'running'
+"""
+
+PRECOMPUTE_JOB_QUERY = """
+    SELECT file, status, attempts, error, modified_time, updated_time
+    FROM precompute_job
+    WHERE file = %s
+"""
+
+
+def group_transcriptions(rows: Iterable[Sequence]) -> dict[str, list[list[dict]]]:
+    """
+    Group the joined rows of `TRANSCRIPTIONS_QUERY` per file and per file transcription.
+
+    Args:
+    ----
+        rows (Iterable[Sequence]): (file, file_transcription, start, end, value) rows, ordered
+                                   by file and file transcription. A file transcription without
+                                   any transcriptions has a single row with a NULL start.
+
+    Returns:
+    -------
+        dict: Maps the file ids to lists of file transcriptions, each being a list of
+              dictionaries with "start", "end", and "value" keys.
+
+    """
+    res: dict[str, list[list[dict]]] = {}
+    for file_id, file_rows in groupby(rows, key=lambda row: row[0]):
+        res[file_id] = [
+            [
+                {"start": row[2], "end": row[3], "value": row[4]}
+                for row in file_transcription_rows
+                if row[2] is not None
+            ]
+            for _, file_transcription_rows in groupby(file_rows, key=lambda row: row[1])
+        ]
+    return res
+
+
+def file_query(
+    columns: Iterable[str] | None = None,
+    *,
+    many: bool = False,
+) -> str | sql.Composed:
+    """
+    Build the query selecting a single file, optionally only a subset of its columns.
+
+    Args:
+    ----
+        columns (Iterable[str] | None): The (snake_case) columns to select, all if None.
+        many (bool): Select all the files in a list of ids, instead of a single file.
+
+    Returns:
+    -------
+        str | sql.Composed: The query, with the file id (or list of ids) as its only parameter.
+
+    Raises:
+    ------
+        ValueError: If one of the columns is not a column of the files table.
+
+    """
+    if columns is None:
+        return FILES_QUERY if many else FILE_QUERY
+    columns = tuple(columns)
+    known_columns = schema_cache.columns("files")
+    if known_columns is not None:
+        unknown_columns = [column for column in columns if column not in known_columns]
+        if unknown_columns:
+            msg = f"Unknown columns of the files table: {unknown_columns}"
+            raise ValueError(msg)
+    condition = sql.SQL("id = ANY(%s)" if many else "id = %s")
+    return sql.SQL("SELECT {} FROM files WHERE {}").format(
+        sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        condition,
+    )
+
+
+class SchemaCache:
+    """
+    Per-process cache of the column layout of the database tables.
+
+    The layout is learned from the description of the cursor after a `SELECT *`, so no extra
+    round trip to `information_schema` is needed. Whenever a query returns a different set of
+    columns than the cached one (e.g. after a migration), the layout is replaced and the
+    version is bumped. The cache can also be cleared on demand with `invalidate`.
+
+    Attributes
+    ----------
+        version (int): Incremented every time a cached layout changes.
+
+    """
+
+    version: int
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self.version = 0
+        self._columns: dict[str, tuple[str, ...]] = {}
+        self._keys: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+    def columns(self, table: str) -> tuple[str, ...] | None:
+        """Return the cached (snake_case) column names of a table, if known."""
+        return self._columns.get(table)
+
+    def update(self, table: str, columns: tuple[str, ...]) -> None:
+        """Store the column names of a table, bumping the version if they changed."""
+        if self._columns.get(table) != columns:
+            self._columns[table] = columns
+            self.version += 1
+
+    def invalidate(self, table: str | None = None) -> None:
+        """Forget the layout of a single table, or of all the tables if none is given."""
+        if table is None:
+            self._columns.clear()
+            self._keys.clear()
+        else:
+            self._columns.pop(table, None)
+        self.version += 1
+
+    def keys(self, columns: tuple[str, ...]) -> tuple[str, ...]:
+        """Return the camelCase keys for a tuple of column names."""
+        keys = self._keys.get(columns)
+        if keys is None:
+            keys = tuple(snake_to_camel(column) for column in columns)
+            self._keys[columns] = keys
+        return keys
+
+    def parse_row(
+        self,
+        description: Sequence[Column],
+        row: Sequence,
+        table: str | None = None,
+    ) -> dict:
+        """
+        Convert a row into a dictionary with camelCase keys, based on the cursor description.
+
+        Args:
+        ----
+            description (Sequence[Column]): The description of the cursor that returned the row.
+            row (Sequence): The row itself.
+            table (str | None): The table the row was selected from with `SELECT *`. If given,
+                                the cached layout of that table is updated.
+
+        Returns:
+        -------
+            dict: A dictionary mapping the camelCase column names to the values of the row.
+
+        """
+        columns = tuple(column.name for column in description)
+        if table is not None:
+            self.update(table, columns)
+        return dict(zip(self.keys(columns), row, strict=True))
+
+
+schema_cache = SchemaCache()
+
+
+class AsyncDatabase:
+    """
+    Database class for interacting with a PostgreSQL database, built on `psycopg.AsyncConnection`.
+
+    All the queries are awaited, so the event loop can serve other requests while this one
+    waits on the database. If a connection pool is given, the connection is borrowed from the
+    pool and handed back on close.
 
     Attributes
     ----------
-        conn (psycopg.Connection): The connection object to the database.
-        cursor (psycopg.Cursor): The cursor object to execute database queries.
+        conn (psycopg.AsyncConnection): The connection object to the database.
+        cursor (psycopg.AsyncCursor): The cursor object to execute database queries.
+        pool (AsyncConnectionPool | None): The pool the connection is borrowed from, if any.
 
     Methods
     -------
-        fetch_file(id: int) -> dict:
+        fetch_file(id: int, columns: Iterable[str] | None) -> dict:
             Fetches a file record from the database by its ID.
+        fetch_file_metadata(id: int) -> dict:
+            Fetches the size, creation and modification time of a file by its ID.
+        fetch_files(ids: Iterable[str], columns: Iterable[str] | None) -> AsyncIterator[dict]:
+            Streams multiple file records from the database by their IDs.
+        enqueue_precompute_jobs(ids: Iterable[str]) -> None:
+            Adds precompute jobs for files to the queue.
+        claim_precompute_job(max_attempts: int, timeout: float) -> dict | None:
+            Takes the next precompute job from the queue.
         close():
             Closes the database connection and cursor.
 
@@ -32,11 +348,19 @@ class Database:
     host: str
     port: str
     dbname: str
+    pool: AsyncConnectionPool | None
 
-    def __init__(self, user: str, password: str, host: str, port: str, dbname: str):  # noqa: PLR0913
+    def __init__(  # noqa: PLR0913
+        self,
+        user: str,
+        password: str,
+        host: str,
+        port: str,
+        dbname: str,
+        pool: AsyncConnectionPool | None = None,
+    ):
         """
-        Initialize the Database object and opens a connection to the specified
-        PostgreSQL database.
+        Initialize the AsyncDatabase object, the connection is opened with `connection`.
 
         Args:
         ----
@@ -45,6 +369,7 @@ class Database:
             host (str): The host address of the database.
             port (str): The port number for the database.
             dbname (str): The name of the database.
+            pool (AsyncConnectionPool | None): Pool to borrow the connection from.
 
         """
         self.user = user
@@ -52,70 +377,115 @@ class Database:
         self.host = host
         self.port = port
         self.dbname = dbname
+        self.pool = pool
 
-    def connection(self: Self) -> None:
+    async def connection(self: Self) -> None:
         """Establish the connection the database and setup cursor."""
-        self.conn = psycopg.connect(
-            dbname=self.dbname,
-            user=self.user,
-            password=self.password,
-            host=self.host,
-            port=self.port,
-        )
+        if self.pool is not None:
+            self.conn = await self.pool.getconn()
+        else:
+            self.conn = await psycopg.AsyncConnection.connect(
+                dbname=self.dbname,
+                user=self.user,
+                password=self.password,
+                host=self.host,
+                port=self.port,
+            )
         self.cursor = self.conn.cursor()
 
-    def fetch_file(self: Self, file_id: str) -> dict:
+    async def fetch_file(self: Self, file_id: str, columns: Iterable[str] | None = None) -> dict:
         """
         Fetch a file record from the database by its ID.
 
         Args:
         ----
             file_id (str): The ID of the file to fetch.
+            columns (Iterable[str] | None): The (snake_case) columns to fetch, all if None.
+                                            Leave out "data" if the audio itself is not needed.
 
         Returns:
         -------
             dict: A dictionary containing the file record's details.
 
         """
-        self.cursor.execute("""
-            SELECT column_name, ordinal_position
-            FROM information_schema.columns
-            WHERE table_name = 'files'
-        """)
-        column_data = self.cursor.fetchall()
-        self.cursor.execute("SELECT * FROM files WHERE id = %s", [file_id])
-        db_res = self.cursor.fetchone()  # type: ignore
+        await self.cursor.execute(file_query(columns), [file_id])
+        db_res = await self.cursor.fetchone()
+
+        if db_res is None:
+            raise FileNotFoundError
+
+        table = "files" if columns is None else None
+        return schema_cache.parse_row(self.cursor.description, db_res, table=table)  # type: ignore
+
+    async def fetch_file_metadata(self: Self, file_id: str) -> dict:
+        """
+        Fetch the metadata of a file, without transferring the file data itself.
+
+        Args:
+        ----
+            file_id (str): The ID of the file to fetch.
+
+        Returns:
+        -------
+            dict: A dictionary with the "id", "fileSize" (in bytes), "creationTime" and
+                  "modifiedTime" of the file.
+
+        """
+        await self.cursor.execute(FILE_METADATA_QUERY, [file_id])
+        db_res = await self.cursor.fetchone()
 
         if db_res is None:
             raise FileNotFoundError
 
-        result = {}
-        for column in column_data:
-            result[self.snake_to_camel(column[0])] = db_res[column[1] - 1]
-        return result
+        return schema_cache.parse_row(self.cursor.description, db_res)  # type: ignore
 
-    def snake_to_camel(self, snake_case_str: str) -> str:
+    async def fetch_files(
+        self: Self,
+        file_ids: Iterable[str],
+        columns: Iterable[str] | None = None,
+    ) -> AsyncIterator[dict]:
         """
-        Convert a snake_case string to camelCase.
+        Fetch multiple file records from the database by their IDs.
 
-        Parameters
-        ----------
-        - snake_case_str (str): The snake_case string to be converted.
+        The files are streamed with a server-side cursor, so only a few of them are kept in
+        memory at once. The connection stays busy until the iterator is exhausted or closed.
 
-        Returns
+        Args:
+        ----
+            file_ids (Iterable[str]): The IDs of the files to fetch.
+            columns (Iterable[str] | None): The (snake_case) columns to fetch, all if None.
+
+        Returns:
         -------
-        - str: The camelCase version of the input string.
+            AsyncIterator[dict]: The file records, in no particular order. Files that do not
+                                 exist are left out.
+
+        """
+        query = file_query(columns, many=True)
+        table = "files" if columns is None else None
+        async with self.conn.cursor(name="fetch_files") as cursor:
+            cursor.itersize = FETCH_FILES_BATCH_SIZE
+            await cursor.execute(query, [list(file_ids)])
+            async for row in cursor:
+                yield schema_cache.parse_row(cursor.description, row, table=table)  # type: ignore
+
+    async def fetch_session_file_ids(self: Self, session_id: str) -> list[str]:
+        """
+        Fetch the IDs of all the files in a session.
 
-        Example:
-        ```python
-        camel_case_str = self.snake_to_camel('example_string')
-        ```
+        Args:
+        ----
+            session_id (str): The ID of the session.
+
+        Returns:
+        -------
+            list[str]: The IDs of the files, ordered by their creation time.
 
         """
-        components = snake_case_str.split("_")
-        return components[0] + "".join(x.title() for x in components[1:])
+        await self.cursor.execute(SESSION_FILE_IDS_QUERY, [session_id])
+        return [row[0] for row in await self.cursor.fetchall()]
 
-    def get_transcriptions(self, file_id: str) -> list[list]:
+    async def get_transcriptions(self, file_id: str) -> list[list]:
         """
         Fetch transcriptions associated with a file from the database.
 
@@ -130,40 +500,149 @@ class Database:
                   and contains dictionaries with "start", "end", and "value" keys.
 
         """
-        self.cursor.execute(
-            """
-                           SELECT id FROM file_transcription
-                           WHERE file = %s
-                           """,
-            [file_id],
+        return (await self.get_transcriptions_bulk([file_id])).get(file_id, [])
+
+    async def get_transcriptions_bulk(self, file_ids: Iterable[str]) -> dict[str, list[list]]:
+        """
+        Fetch transcriptions associated with multiple files from the database in one query.
+
+        Args:
+        ----
+            file_ids (Iterable[str]): The IDs of the files to fetch transcriptions for.
+
+        Returns:
+        -------
+            dict: Maps the IDs of the files that have transcriptions to their transcriptions,
+                  in the same format as `get_transcriptions`.
+
+        """
+        await self.cursor.execute(TRANSCRIPTIONS_QUERY, [list(file_ids)])
+        return group_transcriptions(await self.cursor.fetchall())
+
+    async def enqueue_precompute_jobs(self, file_ids: Iterable[str]) -> None:
+        """
+        Add precompute jobs for files to the queue, and commit them.
+
+        Files that already have a job for their current version keep it, unless it failed.
+
+        Args:
+        ----
+            file_ids (Iterable[str]): The IDs of the files, files that do not exist are ignored.
+
+        """
+        await self.cursor.execute(ENQUEUE_PRECOMPUTE_JOBS_QUERY, [list(file_ids)])
+        await self.conn.commit()
+
+    async def enqueue_new_files(self, max_age: float) -> None:
+        """
+        Add precompute jobs for the files uploaded or modified since the newest job.
+
+        Args:
+        ----
+            max_age (float): The time (in seconds) within which files are added when there are
+                             no jobs yet.
+
+        """
+        await self.cursor.execute(ENQUEUE_NEW_FILES_QUERY, [max_age])
+        await self.conn.commit()
+
+    async def claim_precompute_job(self, max_attempts: int, timeout: float) -> dict | None:
+        """
+        Take the next precompute job from the queue, and commit it as running.
+
+        Running jobs that were claimed `max_attempts` times and not finished in time are marked
+        as failed first.
+
+        Args:
+        ----
+            max_attempts (int): The amount of times a job is claimed before it is given up.
+            timeout (float): The time (in seconds) after which a running job is claimed again,
+                             as its worker probably stopped.
+
+        Returns:
+        -------
+            dict | None: The "file" and "modifiedTime" of the job, or None if there is none.
+
+        """
+        await self.cursor.execute(FAIL_STALE_PRECOMPUTE_JOBS_QUERY, [max_attempts, timeout])
+        await self.cursor.execute(CLAIM_PRECOMPUTE_JOB_QUERY, [max_attempts, timeout])
+        db_res = await self.cursor.fetchone()
+        description = self.cursor.description
+        await self.conn.commit()
+
+        if db_res is None:
+            return None
+
+        return schema_cache.parse_row(description, db_res)  # type: ignore
+
+    async def finish_precompute_job(
+        self, file_id: str, modified_time: datetime, error: str | None = None
+    ) -> None:
+        """
+        Mark a claimed precompute job as done, or as failed with an error, and commit it.
+
+        Args:
+        ----
+            file_id (str): The ID of the file of the job.
+            modified_time (datetime): The version of the file the job was claimed for.
+            error (str | None): Why the job failed, None if it is done.
+
+        """
+        status = "done" if error is None else "failed"
+        await self.cursor.execute(
+            FINISH_PRECOMPUTE_JOB_QUERY, [status, error, file_id, modified_time]
         )
-        file_transcriptions = self.cursor.fetchall()
-        res = []
-        for file_transcription in file_transcriptions:
-            self.cursor.execute(
-                """
-                           SELECT start, "end", value FROM transcription
-                           WHERE file_transcription = %s
-                           """,
-                [file_transcription[0]],
-            )
-            transcriptions = self.cursor.fetchall()
-            parsed_file_transcriptions = [
-                {
-                    "start": transcription[0],
-                    "end": transcription[1],
-                    "value": transcription[2],
-                }
-                for transcription in transcriptions
-            ]
-            res.append(parsed_file_transcriptions)
-        return res
+        await self.conn.commit()
+
+    async def fetch_precompute_job(self, file_id: str) -> dict:
+        """
+        Fetch the precompute job of a file.
+
+        Args:
+        ----
+            file_id (str): The ID of the file.
+
+        Returns:
+        -------
+            dict: The "file", "status" ("pending", "running", "done" or "failed"), "attempts",
+                  "error", "modifiedTime" and "updatedTime" of the job.
+
+        """
+        await self.cursor.execute(PRECOMPUTE_JOB_QUERY, [file_id])
+        db_res = await self.cursor.fetchone()
 
-    def close(self) -> None:
-        """Close the database connection and cursor."""
+        if db_res is None:
+            raise FileNotFoundError
+
+        return schema_cache.parse_row(self.cursor.description, db_res)  # type: ignore
+
+    async def close(self, *, commit: bool = True) -> None:
+        """
+        Close the database cursor and close the connection or return it to the pool.
+
+        The connection is returned to the pool (or closed) in any case, and the transaction is
+        rolled back if `commit` is False or committing fails.
+
+        Args:
+        ----
+            commit (bool): Whether to commit the transaction, False after an error.
+
+        """
+        conn = getattr(self, "conn", None)
+        if conn is None:  # never connected
+            return
         try:
-            self.cursor.close()
-            self.conn.commit()
-            self.conn.close()
-        except NameError:
-            pass
+            await self.cursor.close()
+            if commit:
+                await conn.commit()
+            else:
+                await conn.rollback()
+        except Exception:
+            with contextlib.suppress(psycopg.Error):  # e.g. the connection is gone
+                await conn.rollback()
+            raise
+        finally:
+            if self.pool is not None:
+                await self.pool.putconn(conn)
+            else:
+                await conn.close()
@@ -0,0 +1,138 @@
+"""Vectorized pitch estimation with YIN, a faster alternative to the pitch analysis of Praat."""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from scipy.signal import resample_poly
+
+# the threshold on the cumulative mean normalized difference below which a lag is a period
+YIN_THRESHOLD = 0.15
+
+# the defaults of the pitch analysis of Praat, so both engines find pitch in the same range
+PITCH_CEILING = 600.0
+SILENCE_THRESHOLD = 0.03
+
+# signals are decimated to about this sample frequency first, which is plenty for the pitch range
+YIN_SAMPLING_FREQUENCY = 4000.0
+
+# the extra (decimated) samples around the frames, more than half the decimation filter
+RESAMPLE_MARGIN = 32
+
+# the amount of frames analysed at once, which bounds the memory used for long sounds
+YIN_BATCH_FRAMES = 2048
+
+
+def yin_pitch(  # noqa: PLR0913
+    samples: np.ndarray,
+    frame_rate: float,
+    frame_centers: np.ndarray,
+    pitch_floor: float,
+    pitch_ceiling: float = PITCH_CEILING,
+    threshold: float = YIN_THRESHOLD,
+    peak: float | None = None,
+) -> np.ndarray:
+    """
+    Estimate the pitch of frames of a signal with the YIN algorithm, all frames at once.
+
+    The difference function of every frame is computed with FFTs over a batch of strided frames,
+    the lag of the first dip of its cumulative mean normalized difference below the threshold is
+    the period, refined with parabolic interpolation. Like in Praat, frames with a peak below
+    `SILENCE_THRESHOLD` of the peak of the whole signal are unvoiced.
+
+    Parameters
+    ----------
+    - samples: The samples of the signal, of which only the samples around the frames are used.
+    - frame_rate: The sample frequency of the signal.
+    - frame_centers: The centers of the frames, in samples from the first sample.
+    - pitch_floor: The lowest pitch to find, which determines the length of the frames.
+    - pitch_ceiling: The highest pitch to find.
+    - threshold: The YIN threshold, lower is stricter about what is voiced.
+    - peak: The largest deviation from the mean of the whole signal, if the samples are a part of
+      it.
+
+    Returns
+    -------
+    - numpy.ndarray: The pitch (in Hz) of every frame, 0 where it is unvoiced.
+
+    Example:
+    ```python
+    pitch = yin_pitch(samples, 16000, np.arange(320, len(samples) - 320, 160), 75.0)
+    ```
+
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    frame_centers = np.asarray(frame_centers, dtype=np.float64)
+    pitch = np.zeros(len(frame_centers))
+    if len(frame_centers) == 0 or samples.size == 0:
+        return pitch
+    if peak is None:
+        peak = float(np.abs(samples - samples.mean()).max())
+
+    # only the samples around the frames are decimated, starting at a multiple of the decimation
+    # so the frames get the same samples for any set of frames
+    decimation = max(math.floor(frame_rate / YIN_SAMPLING_FREQUENCY), 1)
+    margin = 2 * math.ceil(frame_rate / pitch_floor) + RESAMPLE_MARGIN * decimation
+    start = max(math.floor(frame_centers.min()) - margin, 0) // decimation * decimation
+    end = min(math.ceil(frame_centers.max()) + margin, len(samples))
+    samples = samples[start:end]
+    frame_centers = frame_centers - start
+    if decimation > 1:
+        samples = resample_poly(samples, 1, decimation)
+        frame_rate /= decimation
+        frame_centers = frame_centers / decimation
+
+    max_lag = math.ceil(frame_rate / pitch_floor)
+    min_lag = max(math.floor(frame_rate / pitch_ceiling), 2)
+    # the difference is integrated over the longest period, for all lags up to one more
+    window = max_lag
+    length = window + max_lag + 2
+    n_fft = 1 << (length + window - 1).bit_length()
+    lags = np.arange(1, max_lag + 2)
+
+    padded = np.pad(samples, length)
+    starts = np.round(frame_centers - (length - 1) / 2).astype(np.int64) + length
+    starts = np.clip(starts, 0, len(padded) - length)
+    for batch in range(0, len(frame_centers), YIN_BATCH_FRAMES):
+        frames = padded[starts[batch : batch + YIN_BATCH_FRAMES, None] + np.arange(length)]
+        frames = frames - frames.mean(axis=1, keepdims=True)
+
+        # the correlation of the window with the frame at every lag
+        correlation = np.fft.irfft(
+            np.fft.rfft(frames, n_fft) * np.conj(np.fft.rfft(frames[:, :window], n_fft)),
+            n_fft,
+        )[:, : max_lag + 2]
+        squares = np.concatenate(
+            [np.zeros((len(frames), 1)), np.cumsum(np.square(frames), axis=1)], axis=1
+        )
+        energy = squares[:, window : window + max_lag + 2] - squares[:, : max_lag + 2]
+        difference = np.maximum(energy[:, :1] + energy - 2 * correlation, 0)
+
+        cumulative = np.cumsum(difference[:, 1:], axis=1)
+        normalized = np.ones_like(difference)
+        np.divide(
+            difference[:, 1:] * lags,
+            cumulative,
+            out=normalized[:, 1:],
+            where=cumulative > 0,
+        )
+
+        # the first lag below the threshold that is a local minimum is the bottom of the first dip
+        candidates = normalized[:, min_lag : max_lag + 1] < threshold
+        candidates &= (
+            normalized[:, min_lag : max_lag + 1] <= normalized[:, min_lag + 1 : max_lag + 2]
+        )
+        voiced = candidates.any(axis=1)
+        voiced &= np.abs(frames).max(axis=1) >= SILENCE_THRESHOLD * peak
+        lag = np.argmax(candidates, axis=1) + min_lag
+
+        rows = np.arange(len(frames))
+        before, at, after = (difference[rows, lag + offset] for offset in (-1, 0, 1))
+        curvature = before - 2 * at + after
+        shift = np.divide(
+            0.5 * (before - after), curvature, out=np.zeros(len(frames)), where=curvature > 0
+        )
+        period = lag + np.clip(shift, -0.5, 0.5)
+        pitch[batch : batch + YIN_BATCH_FRAMES] = np.where(voiced, frame_rate / period, 0.0)
+    return pitch
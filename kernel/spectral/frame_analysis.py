@@ -3,16 +3,25 @@
 from __future__ import annotations
 
 from array import array
+from concurrent.futures import Executor
 
 import numpy as np
 import parselmouth
 from fastapi import HTTPException
 
+from .signal_analysis import AnalysisContext, frames_in_window
 from .types import FileStateType
 
+# the frame engines: a new Praat analysis of only the samples of the frame, or the median of the
+# cached pitch and formant tracks of the whole file over the frame, see `track_frame_info`
+FRAME_ENGINES = ("exact", "tracks")
+
+# the amount of frames analysed per job when a batch of frames is spread over worker processes
+FRAME_BATCH_SIZE = 16
+
 
 def simple_frame_info(
-    frame: array,
+    frame: np.ndarray | array,
     fs: float | int,
     frame_info: dict[str, int] | None,
 ) -> dict[str, float] | None:
@@ -57,7 +66,105 @@ def simple_frame_info(
     return res
 
 
-def calculate_frame_duration(frame: array, fs: int | float) -> float:
+def track_frame_info(
+    analysis: AnalysisContext,
+    frame_info: dict[str, int] | None,
+    pitch_engine: str = "praat",
+    formant_engine: str = "praat",
+) -> dict[str, float] | None:
+    """
+    Extract basic information of a frame from the pitch and formant tracks of the whole signal.
+
+    Gives the same information as `simple_frame_info`, but instead of analysing the samples of
+    the frame anew, the pitch and formants are the median of the frames of the (cached) tracks
+    of the whole signal within the frame, see `track_median`. This makes going through the
+    frames of a file cheap once its tracks are computed.
+
+    Parameters
+    ----------
+    - analysis: The analysis context of the signal, with its tracks.
+    - frame_info: A dictionary containing the 'startIndex' and 'endIndex' of the frame.
+    - pitch_engine: The engine of the pitch track, one of `signal_analysis.PITCH_ENGINES`.
+    - formant_engine: The engine of the formant tracks, one of
+      `signal_analysis.FORMANT_ENGINES`.
+
+    Returns
+    -------
+    - dict or None: The "duration", "pitch", "f1" and "f2" of the frame if `frame_info` is
+                    provided, otherwise None.
+
+    Example:
+    ```python
+    frame_info = {"startIndex": 0, "endIndex": 1000}
+    result = track_frame_info(get_analysis_context(file), frame_info)
+    ```
+
+    """
+    if frame_info is None:
+        return None
+    sound = analysis.sound
+    # the samples of the frame span from half a sample before the first to after the last one
+    start_time = sound.x1 + (frame_info["startIndex"] - 0.5) * sound.dx
+    end_time = sound.x1 + (frame_info["endIndex"] - 0.5) * sound.dx
+
+    pitch, pitch_time_step, pitch_start_time = analysis.pitch_track(engine=pitch_engine)
+    formants, formants_time_step, formants_start_time = analysis.formant_tracks(
+        engine=formant_engine
+    )
+    return {
+        "duration": (frame_info["endIndex"] - frame_info["startIndex"]) * sound.dx,
+        "pitch": track_median(
+            np.where(pitch > 0, pitch, np.nan),
+            pitch_time_step,
+            pitch_start_time,
+            start_time,
+            end_time,
+        ),
+        "f1": track_median(
+            formants[:, 0], formants_time_step, formants_start_time, start_time, end_time
+        ),
+        "f2": track_median(
+            formants[:, 1], formants_time_step, formants_start_time, start_time, end_time
+        ),
+    }
+
+
+def track_median(
+    values: np.ndarray,
+    time_step: float,
+    first_frame_time: float,
+    start_time: float,
+    end_time: float,
+) -> float:
+    """
+    Return the median of the defined values of a track in a time window.
+
+    The frames with their center in the window are used, or the frame nearest to the center of
+    the window if it is shorter than the time step.
+
+    Parameters
+    ----------
+    - values: The value of every frame of the track, NaN where it is undefined.
+    - time_step: Time between the center of the frames.
+    - first_frame_time: Time of the center of the first frame.
+    - start_time, end_time: The time window.
+
+    Returns
+    -------
+    - float: The median of the defined values, or NaN if none of them is defined.
+
+    """
+    frames = frames_in_window(len(values), first_frame_time, time_step, start_time, end_time)
+    if len(frames) == 0 and len(values) > 0:
+        nearest = round((0.5 * (start_time + end_time) - first_frame_time) / time_step)
+        nearest = min(max(nearest, 0), len(values) - 1)
+        frames = range(nearest, nearest + 1)
+    window = values[frames.start : frames.stop]
+    defined = window[~np.isnan(window)]
+    return float(np.median(defined)) if defined.size else float("nan")
+
+
+def calculate_frame_duration(frame: np.ndarray | array, fs: int | float) -> float:
     """
     Calculate the duration of a frame based on the frame and the sample frequency.
 
@@ -79,7 +186,7 @@ def calculate_frame_duration(frame: array, fs: int | float) -> float:
     return len(frame) / fs
 
 
-def calculate_frame_pitch(frame: array, fs: float | int) -> float:
+def calculate_frame_pitch(frame: np.ndarray | array, fs: float | int) -> float:
     """
     Calculate the pitch of a frame.
 
@@ -100,7 +207,7 @@ def calculate_frame_pitch(frame: array, fs: float | int) -> float:
     """
     try:
         pitch = parselmouth.Sound(
-            values=np.array(frame).astype("float64"),
+            values=np.asarray(frame, dtype=np.float64),
             sampling_frequency=fs,
         ).to_pitch(
             time_step=calculate_frame_duration(frame, fs) + 1,
@@ -110,7 +217,7 @@ def calculate_frame_pitch(frame: array, fs: float | int) -> float:
         return float("nan")
 
 
-def calculate_frame_f1_f2(frame: array, fs: int | float) -> list[float]:
+def calculate_frame_f1_f2(frame: np.ndarray | array, fs: int | float) -> list[float]:
     """
     Calculate the first and second fromant of a frame.
 
@@ -131,7 +238,7 @@ def calculate_frame_f1_f2(frame: array, fs: int | float) -> list[float]:
     """
     try:
         formants = parselmouth.Sound(
-            values=np.array(frame).astype("float64"),
+            values=np.asarray(frame, dtype=np.float64),
             sampling_frequency=fs,
         ).to_formant_burg(
             time_step=calculate_frame_duration(frame, fs) + 1,
@@ -144,7 +251,7 @@ def calculate_frame_f1_f2(frame: array, fs: int | float) -> list[float]:
         return [float("nan"), float("nan")]
 
 
-def validate_frame_index(data: array, file_state: FileStateType):
+def validate_frame_index(data: np.ndarray | array, file_state: FileStateType):
     """
     Validate the frame index specified in the file_state.
 
@@ -170,8 +277,27 @@ def validate_frame_index(data: array, file_state: FileStateType):
     if "frame" not in file_state or file_state["frame"] is None:
         return None
 
-    frame = file_state["frame"]
+    return validate_frame(data, file_state["frame"])
+
 
+def validate_frame(data: np.ndarray | array, frame: dict[str, int | None]):
+    """
+    Validate the indices of a single frame, see `validate_frame_index`.
+
+    Parameters
+    ----------
+    - data: An array representing the data from which the frame indices are validated.
+    - frame: A dictionary with the 'startIndex' and 'endIndex' of the frame.
+
+    Returns
+    -------
+    - A dictionary with validated 'startIndex' and 'endIndex', or None if both are None.
+
+    Raises
+    ------
+    - HTTPException: If required frame indices are not provided or are invalid.
+
+    """
     if "startIndex" not in frame:
         raise HTTPException(status_code=400, detail="no startIndex provided")
     if "endIndex" not in frame:
@@ -203,3 +329,97 @@ def validate_frame_index(data: array, file_state: FileStateType):
             detail="endIndex should be lower than the file length",
         )
     return {"startIndex": start_index, "endIndex": end_index}
+
+
+def validate_frames(data: np.ndarray | array, file_state: FileStateType) -> list[dict[str, int]]:
+    """
+    Validate the list of frames specified in the file_state.
+
+    Parameters
+    ----------
+    - data: An array representing the data from which the frame indices are validated.
+    - file_state: A dictionary containing the state of the file, including a list of "frames",
+      each with a 'startIndex' and 'endIndex'.
+
+    Returns
+    -------
+    - A list of dictionaries with validated 'startIndex' and 'endIndex'.
+
+    Raises
+    ------
+    - HTTPException: If the frames are not a list, or the indices of one of them are invalid.
+
+    Example:
+    ```python
+    frames = validate_frames(data, {"frames": [{"startIndex": 0, "endIndex": 640}]})
+    ```
+
+    """
+    frames = file_state.get("frames")
+    if not isinstance(frames, list) or not all(isinstance(frame, dict) for frame in frames):
+        raise HTTPException(status_code=400, detail="frames should be a list of frames")
+
+    validated = []
+    for frame in frames:
+        frame_index = validate_frame(data, frame)
+        if frame_index is None:
+            raise HTTPException(status_code=400, detail="no startIndex provided")
+        validated.append(frame_index)
+    return validated
+
+
+def frames_info(
+    samples: np.ndarray | array,
+    fs: float | int,
+    frames: list[dict[str, int]],
+) -> list[dict[str, float] | None]:
+    """Return the `simple_frame_info` of every frame, in order."""
+    return [simple_frame_info(samples, fs, frame) for frame in frames]
+
+
+def batch_frame_info(
+    samples: np.ndarray | array,
+    fs: float | int,
+    frames: list[dict[str, int]],
+    executor: Executor | None = None,
+) -> list[dict[str, float] | None]:
+    """
+    Extract the basic information of many frames of a signal, see `simple_frame_info`.
+
+    With an executor, the frames are analysed in batches of `FRAME_BATCH_SIZE` frames on it.
+    Every batch only gets the samples its frames span, so the whole signal is not sent along
+    with every batch.
+
+    Parameters
+    ----------
+    - samples: The samples of the signal.
+    - fs: The sample frequency of the signal.
+    - frames: The validated frames, see `validate_frames`.
+    - executor: Analyses the batches, e.g. the `signal_analysis.analysis_pool`, or None to
+      analyse all frames in this process.
+
+    Returns
+    -------
+    - list: The information of every frame, in the order of `frames`.
+
+    Example:
+    ```python
+    frames = [{"startIndex": 0, "endIndex": 640}, {"startIndex": 640, "endIndex": 1280}]
+    result = batch_frame_info(samples, fs, frames)
+    ```
+
+    """
+    if executor is None or len(frames) <= FRAME_BATCH_SIZE:
+        return frames_info(samples, fs, frames)
+
+    jobs = []
+    for batch in range(0, len(frames), FRAME_BATCH_SIZE):
+        batch_frames = frames[batch : batch + FRAME_BATCH_SIZE]
+        start = min(frame["startIndex"] for frame in batch_frames)
+        end = max(frame["endIndex"] for frame in batch_frames)
+        shifted = [
+            {"startIndex": frame["startIndex"] - start, "endIndex": frame["endIndex"] - start}
+            for frame in batch_frames
+        ]
+        jobs.append(executor.submit(frames_info, np.asarray(samples[start:end]), fs, shifted))
+    return [info for job in jobs for info in job.result()]
@@ -2,58 +2,140 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Annotated, Any, Literal, Self, Union
 
 import orjson
-from fastapi import Depends, FastAPI, HTTPException, Path
+from fastapi import Depends, FastAPI, HTTPException, Path, Request
 from fastapi.responses import JSONResponse
 
 from .data_objects import (
     ErrorRateResponse,
     FileStateBody,
+    FramesResponse,
     GeneratedTranscriptionsModel,
+    PeaksResponse,
+    PrecomputeJobResponse,
     SimpleInfoResponse,
+    SpectrogramMatrixResponse,
     SpectrogramResponse,
+    SpectrogramTileResponse,
     TranscriptionSegment,
     TranscriptionsTextgridModel,
     VowelSpaceResponse,
     WaveformResponse,
 )
-from .database import Database
+from .database import AsyncDatabase, create_async_connection_pool
 from .mode_handler import (
+    AUDIO_COLUMNS,
     convert_to_wav,
     error_rate_mode,
+    frames_mode,
+    peaks_mode,
+    running_requests,
+    session_mode,
     simple_info_mode,
+    spectrogram_matrix_mode,
     spectrogram_mode,
+    spectrogram_tile_mode,
     transcription_mode,
     vowel_space_mode,
+    wav_cache,
     waveform_mode,
 )
+from .mode_pool import MODE_PROCESSES, ModePool, cache_stats
+from .precompute import PRECOMPUTE_WORKERS, PrecomputeWorker
 from .response_examples import (
     signal_modes_response_examples,
+    spectrogram_tile_response_examples,
     transcription_response_examples,
 )
+from .result_cache import result_cache, running_analyses
+from .signal_analysis import shutdown_analysis_pool, start_analysis_pool
+from .spectrogram_response import spectrogram_response
 from .transcription.textgrid import convert_to_textgrid
 from .transcription.transcription import get_transcription
 from .types import FileStateType
 
 
-def get_db():  # pragma: no cover # noqa
+def get_db_settings() -> dict[str, str]:  # pragma: no cover
+    """Read the database connection settings from the environment."""
+    return {
+        "user": os.getenv("POSTGRES_USER", "user"),
+        "password": os.getenv("POSTGRES_PASSWORD", "password"),
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": os.getenv("POSTGRES_PORT", "5432"),
+        "dbname": os.getenv("POSTGRES_DB", "postgres"),
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # pragma: no cover
+    """
+    Start the pools on startup and close them on shutdown.
+
+    The worker processes of the `ModePool` are started first, as they are forked from this
+    process, see `mode_pool.MODE_PROCESSES`. The workers have their own pools for chunked
+    analyses, so this process only starts one when it runs the analyses itself, see
+    `signal_analysis.ANALYSIS_PROCESSES`. Then the database connection pool is opened, and the
+    `PrecomputeWorker` is started on it, see `precompute.PRECOMPUTE_WORKERS`.
+    """
+    app.state.mode_pool = ModePool() if MODE_PROCESSES > 0 else None
+    if app.state.mode_pool is None:
+        start_analysis_pool()
+    pool = create_async_connection_pool(
+        **get_db_settings(),
+        min_size=int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1")),
+        max_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+    )
+    await pool.open()
+    app.state.db_pool = pool
+
+    async def open_database() -> AsyncDatabase:
+        database = AsyncDatabase(**get_db_settings(), pool=pool)
+        await database.connection()
+        return database
+
+    precompute_worker = None
+    if PRECOMPUTE_WORKERS > 0:
+        precompute_worker = PrecomputeWorker(open_database, app.state.mode_pool)
+        precompute_worker.start()
+    try:
+        yield
+    finally:
+        if precompute_worker is not None:
+            await precompute_worker.stop()
+        await pool.close()
+        if app.state.mode_pool is not None:
+            app.state.mode_pool.shutdown()
+        shutdown_analysis_pool()
+
+
+async def get_db(request: Request):  # pragma: no cover # noqa
     db = None
     try:
-        user = os.getenv("POSTGRES_USER", "user")
-        password = os.getenv("POSTGRES_PASSWORD", "password")
-        host = os.getenv("POSTGRES_HOST", "localhost")
-        port = os.getenv("POSTGRES_PORT", "5432")
-        dbname = os.getenv("POSTGRES_DB", "postgres")
-
-        db = Database(user, password, host, port, dbname)
-        db.connection()
+        # the pool is only missing when the app runs without its lifespan, e.g. in tests
+        pool = getattr(request.app.state, "db_pool", None)
+        db = AsyncDatabase(**get_db_settings(), pool=pool)
+        await db.connection()
         yield db
+    except Exception:
+        if db is not None:
+            await db.close(commit=False)
+            db = None
+        raise
     finally:
         if db is not None:
-            db.close()
+            await db.close()
+
+
+def get_mode_pool(request: Request) -> ModePool | None:
+    """Return the pool to run the analyses of the modes in, if the app started one."""
+    # the pool is only missing when the app runs without its lifespan, e.g. in tests
+    return getattr(request.app.state, "mode_pool", None)
 
 
 class ORJSONResponse(JSONResponse):
@@ -66,7 +148,7 @@ class ORJSONResponse(JSONResponse):
         return orjson.dumps(content)
 
 
-app: FastAPI = FastAPI(default_response_class=ORJSONResponse, root_path="/api")
+app: FastAPI = FastAPI(default_response_class=ORJSONResponse, root_path="/api", lifespan=lifespan)
 
 
 @app.post(
@@ -75,26 +157,33 @@ app: FastAPI = FastAPI(default_response_class=ORJSONResponse, root_path="/api")
         None,
         SimpleInfoResponse,
         VowelSpaceResponse,
+        FramesResponse,
         list[list[TranscriptionSegment]],
         ErrorRateResponse,
         WaveformResponse,
+        PeaksResponse,
         SpectrogramResponse,
+        SpectrogramMatrixResponse,
     ],
     responses=signal_modes_response_examples,
 )
-async def analyze_signal_mode(
+async def analyze_signal_mode(  # noqa: PLR0911
     mode: Annotated[
         Literal[
             "simple-info",
             "spectrogram",
+            "spectrogram-matrix",
             "waveform",
+            "peaks",
             "vowel-space",
+            "frames",
             "transcription",
             "error-rate",
         ],
         Path(title="The analysis mode"),
     ],
     file_state_body: FileStateBody,
+    request: Request,
     database=Depends(get_db),
 ) -> Any:
     """
@@ -103,10 +192,18 @@ async def analyze_signal_mode(
     This endpoint fetches an audio file from the database and performs the analysis
     based on the specified mode.
 
+    The spectrogram-matrix mode responds with binary data instead of JSON when the Accept header
+    asks for one of the media types in `spectrogram_response.SPECTROGRAM_MEDIA_TYPES`.
+
+    The analyses run in the worker processes of the `ModePool` of the app, if it has one, so the
+    other requests are not blocked in the meantime. Their results are kept in the `result_cache`,
+    so the same analysis of the same audio only runs once.
+
     Parameters
     ----------
-    - mode (str): The analysis mode (e.g., "simple-info", "spectrogram", "wave-form",
-                  "vowel-space", "transcription", "error-rate").
+    - mode (str): The analysis mode (e.g., "simple-info", "spectrogram", "spectrogram-matrix",
+                  "wave-form", "peaks", "vowel-space", "frames", "transcription",
+                  "error-rate").
     - fileState (dict): The important state data of the file
 
     Returns
@@ -120,20 +217,184 @@ async def analyze_signal_mode(
     """
     db_session = database
     file_state: FileStateType = file_state_body.fileState
+    pool = get_mode_pool(request)
     if mode == "simple-info":
-        return simple_info_mode(db_session, file_state)
+        return await simple_info_mode(db_session, file_state, pool)
     if mode == "spectrogram":
-        return spectrogram_mode(db_session, file_state)
+        return await spectrogram_mode(db_session, file_state, pool)
+    if mode == "spectrogram-matrix":
+        spectrogram = await spectrogram_matrix_mode(db_session, file_state, pool)
+        return spectrogram_response(spectrogram, request.headers.get("accept"))
     if mode == "waveform":
-        return waveform_mode(db_session, file_state)
+        return await waveform_mode(db_session, file_state, pool)
+    if mode == "peaks":
+        return await peaks_mode(db_session, file_state, pool)
     if mode == "vowel-space":
-        return vowel_space_mode(db_session, file_state)
+        return await vowel_space_mode(db_session, file_state, pool)
+    if mode == "frames":
+        return await frames_mode(db_session, file_state, pool)
     if mode == "transcription":
         return transcription_mode(db_session, file_state)
     if mode == "error-rate":
         return error_rate_mode(db_session, file_state)
 
 
+@app.post(
+    "/sessions/{session_id}/modes/{mode}",
+    response_model=dict[str, Any],
+)
+async def analyze_session_mode(
+    mode: Annotated[
+        Literal[
+            "simple-info",
+            "spectrogram",
+            "waveform",
+            "peaks",
+            "vowel-space",
+        ],
+        Path(title="The analysis mode"),
+    ],
+    session_id: Annotated[str, Path(title="The ID of the session")],
+    file_state_body: FileStateBody,
+    request: Request,
+    database=Depends(get_db),
+) -> Any:
+    """
+    Analyze every audio signal of a session in one of the file analysis modes.
+
+    This endpoint streams all the files of the session from the database and runs the analysis
+    of the specified mode on each of them, using a single database connection.
+
+    Parameters
+    ----------
+    - mode (str): The analysis mode (e.g., "simple-info", "spectrogram", "waveform", "peaks",
+                  "vowel-space").
+    - session_id (str): The ID of the session.
+    - fileState (dict): The state used for every file of the session, the id of each file is
+                        filled in automatically.
+
+    Returns
+    -------
+    - dict: Maps the ID of every file in the session to the result of the analysis, in the same
+            format as the /signals/modes/{mode} endpoint.
+
+    Raises
+    ------
+    - HTTPException: If the input data is invalid for one of the files.
+
+    """
+    return await session_mode(
+        database, session_id, mode, file_state_body.fileState, get_mode_pool(request)
+    )
+
+
+@app.get(
+    "/signals/{file_id}/spectrogram/tiles/{zoom}/{index}",
+    response_model=SpectrogramTileResponse,
+    responses=spectrogram_tile_response_examples,
+)
+async def get_spectrogram_tile(
+    file_id: Annotated[str, Path(title="The ID of the file")],
+    zoom: Annotated[int, Path(title="The zoom level, 0 shows the whole file in one tile")],
+    index: Annotated[int, Path(title="The index of the tile within the zoom level")],
+    request: Request,
+    database=Depends(get_db),
+) -> Any:
+    """
+    Get a tile of the spectrogram of an audio file.
+
+    The spectrogram is kept as a pyramid of zoom levels, every level doubling the time resolution
+    of the previous one, cut into tiles of a fixed amount of frames. The tile at zoom level 0
+    reports the maximum zoom level, and every tile reports the amount of tiles at its level.
+
+    Like the spectrogram-matrix mode, the tile is binary instead of JSON when the Accept header
+    asks for one of the media types in `spectrogram_response.SPECTROGRAM_MEDIA_TYPES`.
+
+    Parameters
+    ----------
+    - file_id (str): The ID of the file.
+    - zoom (int): The zoom level.
+    - index (int): The index of the tile within the zoom level.
+
+    Returns
+    -------
+    - dict: The tile, with the power of every frequency bin in every frame of the tile as "data".
+
+    Raises
+    ------
+    - HTTPException: If the file or the tile is not found.
+
+    """
+    tile = await spectrogram_tile_mode(database, file_id, zoom, index, get_mode_pool(request))
+    return spectrogram_response(tile, request.headers.get("accept"))
+
+
+@app.post(
+    "/signals/{file_id}/precompute",
+    response_model=PrecomputeJobResponse,
+    status_code=202,
+)
+async def precompute_signal(
+    file_id: Annotated[str, Path(title="The ID of the file")],
+    database=Depends(get_db),
+) -> Any:
+    """
+    Queue the analyses of an audio file to be computed in the background.
+
+    The app calls this when a file is uploaded, so the audio is decoded and the tracks and
+    pyramids of the file are computed before it is opened, see `precompute.precompute_file`.
+    Files are also queued by the `PrecomputeWorker` when the queue is empty, so this only
+    moves a file forward. A file that was already precomputed is not queued again, unless it
+    was modified since or its job failed.
+
+    Parameters
+    ----------
+    - file_id (str): The ID of the file.
+
+    Returns
+    -------
+    - dict: The precompute job of the file.
+
+    Raises
+    ------
+    - HTTPException: If the file is not found.
+
+    """
+    await database.enqueue_precompute_jobs([file_id])
+    try:
+        return await database.fetch_precompute_job(file_id)
+    except FileNotFoundError as e:  # nothing was queued
+        raise HTTPException(status_code=404, detail="File not found") from e
+
+
+@app.get("/signals/{file_id}/precompute", response_model=PrecomputeJobResponse)
+async def get_precompute_job(
+    file_id: Annotated[str, Path(title="The ID of the file")],
+    database=Depends(get_db),
+) -> Any:
+    """
+    Get the state of the precompute job of an audio file.
+
+    Parameters
+    ----------
+    - file_id (str): The ID of the file.
+
+    Returns
+    -------
+    - dict: The status of the job ("pending", "running", "done" or "failed"), the amount of
+            attempts, the error if it failed, and the version of the file it is for.
+
+    Raises
+    ------
+    - HTTPException: If the file has no precompute job.
+
+    """
+    try:
+        return await database.fetch_precompute_job(file_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail="Precompute job not found") from e
+
+
 @app.get(
     "/transcription/{model}/{file_id}",
     response_model=GeneratedTranscriptionsModel,
@@ -170,11 +431,11 @@ async def transcribe_file(
     """
     db_session = database
     try:
-        file = db_session.fetch_file(file_id)
+        file = await db_session.fetch_file(file_id, columns=AUDIO_COLUMNS)
     except Exception as e:
         raise HTTPException(status_code=404, detail="File not found") from e
 
-    file["data"] = convert_to_wav(file["data"])
+    file["data"] = await asyncio.to_thread(convert_to_wav, file["data"])
 
     return get_transcription(model, file)
 
@@ -186,3 +447,31 @@ async def transcribe_file(
 async def to_textgrid(transcriptions: TranscriptionsTextgridModel):
     """Convert some transcriptions to textgrid."""
     return convert_to_textgrid(transcriptions)
+
+
+@app.get("/stats", response_model=dict[str, Any])
+async def get_stats(request: Request) -> Any:
+    """
+    Report the state of the caches of the kernel.
+
+    The audio and analysis caches are those of the worker processes of the `ModePool` of the
+    app, if it has one, summed over the workers, with the stats of every worker as "workers".
+    The other caches are those of the main process.
+
+    Returns
+    -------
+    - dict: The hits, misses, evictions, entries, size and maximum size of every cache, for the
+      "resultCache" of its "memory" and "disk" tier. For the "runningAnalyses", the amount of
+      analyses that were started, the amount of requests that shared one of those instead, and
+      the amount of analyses that are running, and likewise for the "runningRequests", which
+      share the fetch of the file as well.
+
+    """
+    pool = get_mode_pool(request)
+    return {
+        **(cache_stats() if pool is None else await pool.cache_stats()),
+        "wavCache": wav_cache.stats(),
+        "resultCache": result_cache.stats(),
+        "runningAnalyses": running_analyses.stats(),
+        "runningRequests": running_requests.stats(),
+    }
@@ -2,32 +2,140 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import os
 import subprocess
 import tempfile
+from collections.abc import Callable, Hashable
 from typing import Any
 
+import orjson
 from fastapi import HTTPException
 
+from .caching import LRUCache, SingleFlight
 from .error_rates import calculate_error_rates
 from .frame_analysis import (
+    FRAME_ENGINES,
+    batch_frame_info,
     calculate_frame_f1_f2,
     simple_frame_info,
+    track_frame_info,
     validate_frame_index,
+    validate_frames,
 )
+from .mode_pool import ModePool
+from .result_cache import MODE_PARAMETERS, cached_analysis
 from .signal_analysis import (
+    FORMANT_ENGINES,
+    PITCH_ENGINES,
+    WAVE_FORMAT_PCM,
+    analysis_pool,
+    audio_cache_key,
     calculate_sound_f1_f2,
     calculate_sound_formants_for_spectrogram,
     calculate_sound_pitch,
+    calculate_sound_spectrogram,
+    get_analysis_context,
     get_audio,
-    signal_to_sound,
     simple_signal_info,
+    wav_chunks,
 )
 from .types import DatabaseType, FileStateType
 
+# the columns needed to analyse the audio of a file, leaving out e.g. its (jsonb) state
+AUDIO_COLUMNS = ("id", "data")
 
-def simple_info_mode(
+# the columns needed to run any of the file analyses, the size of the file is that of its data
+FILE_COLUMNS = ("id", "data", "creation_time", "modified_time")
+
+# the recordings converted to wav by file id, with the modified time of the version they are
+# converted from, so edited files are never served from the cache. The audio is decoded by the
+# process that analyses it, see `get_audio`.
+wav_cache: LRUCache[Hashable, tuple[Any, bytes]] = LRUCache(
+    max_size=int(os.getenv("WAV_CACHE_SIZE", str(512 * 2**20))),
+    size_of=lambda entry: len(entry[1]),
+)
+
+# the requests of the modes that are being answered, by `request_key`, so identical concurrent
+# requests share the fetch and the conversion of the file as well as the analysis
+running_requests: SingleFlight[Hashable, Any] = SingleFlight()
+
+
+def request_key(mode: str, file_state: FileStateType) -> Hashable | None:
+    """
+    Return the key of a request of a mode in `running_requests`.
+
+    The key is the mode, the file ID, the modified time of the version of the file in the
+    `wav_cache` and the `MODE_PARAMETERS` of the file state, so it is known before the file is
+    fetched. A request for a file that was edited since it was cached fetches it again.
+
+    Parameters
+    ----------
+    - mode: The mode.
+    - file_state: The state of the file, including its ID.
+
+    Returns
+    -------
+    - The key, or None if the requests of the mode can not be shared.
+
+    """
+    if mode not in MODE_PARAMETERS or "id" not in file_state:
+        return None
+    cached = wav_cache.get(file_state["id"])
+    parameters = {name: file_state[name] for name in MODE_PARAMETERS[mode] if name in file_state}
+    try:
+        return (
+            mode,
+            file_state["id"],
+            None if cached is None else cached[0],
+            orjson.dumps(parameters, option=orjson.OPT_SORT_KEYS),
+        )
+    except TypeError:
+        return None
+
+
+async def analyse_file(
+    database: DatabaseType,
+    pool: ModePool | None,
+    mode: str,
+    analysis: Callable[[FileStateType, FileStateType], Any],
+    file_state: FileStateType,
+) -> Any:
+    """
+    Fetch a file and return the result of a mode on it, see `get_file` and `cached_analysis`.
+
+    Requests with the same `request_key` that arrive while one is answered await that request
+    instead of fetching, converting and analysing the file again.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+    - mode: The mode, see `MODE_PARAMETERS`.
+    - analysis: The analysis of the mode, a function of the fetched file and the file state.
+    - file_state: The state of the file, including its ID.
+
+    Returns
+    -------
+    - The result of the analysis.
+
+    """
+
+    async def answer() -> Any:
+        file = await get_file(database, file_state)
+        return await cached_analysis(pool, mode, analysis, file, file_state)
+
+    key = request_key(mode, file_state)
+    if key is None:
+        return await answer()
+    return await running_requests.run(key, answer)
+
+
+async def simple_info_mode(
     database: DatabaseType,
     file_state: FileStateType,
+    pool: ModePool | None = None,
 ) -> dict[str, Any]:
     """
     Extract and return basic information about a signal and its corresponding frame.
@@ -37,7 +145,9 @@ def simple_info_mode(
     Parameters
     ----------
     - database: The database object used to fetch the file.
-    - file_state: A dictionary containing the state of the file, including frame indices.
+    - file_state: A dictionary containing the state of the file, including frame indices. The
+      frame is analysed with the "frameEngine" in the file state, see `validate_engine`.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
 
     Returns
     -------
@@ -47,96 +157,361 @@ def simple_info_mode(
 
     Example:
     ```python
-    result = simple_info_mode(database, file_state)
+    result = await simple_info_mode(database, file_state)
     ```
 
     """
-    file = get_file(database, file_state)
+    return await analyse_file(database, pool, "simple-info", simple_info_analysis, file_state)
+
+
+def simple_info_analysis(file: FileStateType, file_state: FileStateType) -> dict[str, Any]:
+    """
+    Run the simple-info analysis on an already fetched file.
+
+    Parameters
+    ----------
+    - file: The file, with its wav "data" (or decoded "audio"), "fileSize" and "creationTime".
+    - file_state: A dictionary containing the state of the file, including frame indices.
 
+    Returns
+    -------
+    - dict: The same result as `simple_info_mode`.
+
+    """
     audio = get_audio(file)
+    analysis = get_analysis_context(file)
+    pitch_engine = validate_engine(file_state, "pitchEngine", PITCH_ENGINES)
+    frame_engine = validate_engine(file_state, "frameEngine", FRAME_ENGINES)
 
-    result = simple_signal_info(audio)
+    result = simple_signal_info(audio, analysis, pitch_engine=pitch_engine)
 
-    result["fileSize"] = len(file["data"])
+    result["fileSize"] = file["fileSize"]
     result["fileCreationDate"] = file["creationTime"]
 
-    frame_index = validate_frame_index(audio.get_array_of_samples(), file_state)
-
-    result["frame"] = simple_frame_info(
-        audio.get_array_of_samples(),
-        audio.frame_rate,
-        frame_index,
-    )
+    frame_index = validate_frame_index(audio.samples, file_state)
+
+    if frame_engine == "tracks":
+        result["frame"] = track_frame_info(
+            analysis,
+            frame_index,
+            pitch_engine,
+            validate_engine(file_state, "formantEngine", FORMANT_ENGINES),
+        )
+    else:
+        result["frame"] = simple_frame_info(
+            audio.samples,
+            audio.frame_rate,
+            frame_index,
+        )
 
     return result
 
 
-def spectrogram_mode(database: DatabaseType, file_state: FileStateType) -> Any:
+def validate_time_window(file_state: FileStateType) -> tuple[float | None, float | None]:
+    """
+    Validate the time window specified in the file_state.
+
+    Parameters
+    ----------
+    - file_state: A dictionary containing the state of the file, optionally with a "startTime"
+      and "endTime" (in seconds) of the part of the file to analyse.
+
+    Returns
+    -------
+    - tuple: The start and end time, either of which is None if not specified.
+
+    Raises
+    ------
+    - HTTPException: If the start or end time is not a number, if the start time is negative or
+      if the start time is not lower than the end time.
+
+    Example:
+    ```python
+    start_time, end_time = validate_time_window({"startTime": 1.5, "endTime": 3.5})
+    ```
+
+    """
+    start_time = file_state.get("startTime")
+    end_time = file_state.get("endTime")
+    for name, value in (("startTime", start_time), ("endTime", end_time)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int | float)):
+            raise HTTPException(status_code=400, detail=f"{name} should be a number")
+    if start_time is not None and start_time < 0:
+        raise HTTPException(status_code=400, detail="startTime should be a positive number")
+    if start_time is not None and end_time is not None and start_time >= end_time:
+        raise HTTPException(
+            status_code=400,
+            detail="startTime should be strictly lower than endTime",
+        )
+    return start_time, end_time
+
+
+def validate_engine(file_state: FileStateType, name: str, engines: tuple[str, ...]) -> str:
+    """
+    Validate an analysis engine specified in the file_state.
+
+    Parameters
+    ----------
+    - file_state: A dictionary containing the state of the file, optionally with the engine
+      under `name`, which is the first of `engines` (Praat) if not specified.
+    - name: The key of the engine in the file state, like "pitchEngine".
+    - engines: The supported engines, like `PITCH_ENGINES` or `FORMANT_ENGINES`.
+
+    Returns
+    -------
+    - str: The engine, one of `engines`.
+
+    Raises
+    ------
+    - HTTPException: If the engine is not one of `engines`.
+
+    """
+    engine = file_state.get(name) or engines[0]
+    if engine not in engines:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name} should be one of {', '.join(engines)}",
+        )
+    return engine
+
+
+async def spectrogram_mode(
+    database: DatabaseType,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> Any:
     """
     Extract first 5 formants from signal to show in spectrogram.
 
+    Only the frames in the time window from "startTime" to "endTime" in the file state are
+    analysed, if given. These are the same frames as when the whole file is analysed. The
+    formants are calculated with the "formantEngine" in the file state, see `validate_engine`.
+
     Parameters
     ----------
     - database: The database object used to fetch the file.
     - file_state: A dictionary containing the state of the file, including frame indices.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
 
     Returns
     -------
     - list: A list of a list with 5 formants for each frame.
 
     """
-    file = get_file(database, file_state)
-    audio = get_audio(file)
-    data = audio.get_array_of_samples()
-    sound = signal_to_sound(data, audio.frame_rate)
+    return await analyse_file(database, pool, "spectrogram", spectrogram_analysis, file_state)
+
+
+def spectrogram_analysis(file: FileStateType, file_state: FileStateType) -> Any:
+    """Run the spectrogram analysis on an already fetched file, see `spectrogram_mode`."""
+    analysis = get_analysis_context(file)
+    start_time, end_time = validate_time_window(file_state)
+    engine = validate_engine(file_state, "formantEngine", FORMANT_ENGINES)
+
+    return calculate_sound_formants_for_spectrogram(
+        analysis,
+        start_time=start_time,
+        end_time=end_time,
+        engine=engine,
+    )
 
-    return calculate_sound_formants_for_spectrogram(sound)
 
+async def spectrogram_matrix_mode(
+    database: DatabaseType,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> dict[str, Any] | None:
+    """
+    Calculate the spectrogram of a signal.
 
-def waveform_mode(database: DatabaseType, file_state: FileStateType) -> dict[str, Any]:
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - file_state: A dictionary containing the state of the file, including its ID.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+
+    Returns
+    -------
+    - dict: The time step, window length, frequency step and start time of the spectrogram,
+      with the power spectral density of every frequency bin in every frame as "data".
+
+    """
+    return await analyse_file(
+        database, pool, "spectrogram-matrix", spectrogram_matrix_analysis, file_state
+    )
+
+
+def spectrogram_matrix_analysis(
+    file: FileStateType,
+    file_state: FileStateType,  # noqa: ARG001
+) -> dict[str, Any] | None:
+    """Run the spectrogram-matrix analysis on an already fetched file."""
+    spectrogram = calculate_sound_spectrogram(get_analysis_context(file))
+    if spectrogram is None:
+        return None
+    return {
+        "timeStep": spectrogram["time_step"],
+        "windowLength": spectrogram["window_length"],
+        "frequencyStep": spectrogram["frequency_step"],
+        "startTime": spectrogram["start_time"],
+        "data": spectrogram["data"],
+    }
+
+
+async def spectrogram_tile_mode(
+    database: DatabaseType,
+    file_id: str,
+    zoom: int,
+    index: int,
+    pool: ModePool | None = None,
+) -> dict[str, Any]:
+    """
+    Get a tile of the spectrogram pyramid of a signal.
+
+    The pyramid is built once per file and kept in its analysis context, so panning and zooming
+    only cost cutting the visible tiles out of it.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - file_id: The ID of the file.
+    - zoom: The zoom level, 0 fits the whole spectrogram into a single tile.
+    - index: The index of the tile within the zoom level.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+
+    Returns
+    -------
+    - dict: The tile, see `SpectrogramPyramid.tile`.
+
+    Raises
+    ------
+    - HTTPException: If the file or the tile does not exist.
+
+    """
+    return await analyse_file(
+        database,
+        pool,
+        "spectrogram-tile",
+        spectrogram_tile_analysis,
+        {"id": file_id, "zoom": zoom, "index": index},
+    )
+
+
+def spectrogram_tile_analysis(file: FileStateType, file_state: FileStateType) -> dict[str, Any]:
+    """Cut a tile out of the spectrogram pyramid of an already fetched file."""
+    pyramid = get_analysis_context(file).spectrogram_pyramid()
+    try:
+        return pyramid.tile(file_state["zoom"], file_state["index"])
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail="Tile not found") from e
+
+
+async def waveform_mode(
+    database: DatabaseType,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> dict[str, Any]:
     """
     Extract the pitch, f1 and f2 of multiple frames to show in waveform mode.
 
+    Only the frames in the time window from "startTime" to "endTime" in the file state are
+    analysed, if given. These are the same frames as when the whole file is analysed. The pitch
+    is calculated with the "pitchEngine" in the file state and the formants with the
+    "formantEngine", see `validate_engine`.
+
     Parameters
     ----------
     - database: The database object used to fetch the file.
     - file_state: A dictionary containing the state of the file, including frame indices.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
 
     Returns
     -------
-    - dict: A dictionary containing the found pitches and formants.
+    - dict: A dictionary containing the found pitches and formants, with the time step and the
+      time of the first frame of both.
 
     """
-    file = get_file(database, file_state)
-    audio = get_audio(file)
-    data = audio.get_array_of_samples()
-    sound = signal_to_sound(data, audio.frame_rate)
+    return await analyse_file(database, pool, "waveform", waveform_analysis, file_state)
+
+
+def waveform_analysis(file: FileStateType, file_state: FileStateType) -> dict[str, Any]:
+    """Run the waveform analysis on an already fetched file, see `waveform_mode`."""
+    analysis = get_analysis_context(file)
+    start_time, end_time = validate_time_window(file_state)
+    pitch_engine = validate_engine(file_state, "pitchEngine", PITCH_ENGINES)
+    formant_engine = validate_engine(file_state, "formantEngine", FORMANT_ENGINES)
 
-    pitch_dict = calculate_sound_pitch(sound)
-    pitch = []
+    result: dict[str, Any] = {"pitch": [], "formants": []}
+    pitch_dict = calculate_sound_pitch(
+        analysis, start_time=start_time, end_time=end_time, engine=pitch_engine
+    )
     if pitch_dict is not None:
-        pitch = pitch_dict["data"]
-    formants_dict = calculate_sound_f1_f2(sound)
-    formants = []
+        result["pitch"] = pitch_dict["data"]
+        result["pitchTimeStep"] = pitch_dict["time_step"]
+        result["pitchStartTime"] = pitch_dict["start_time"]
+    formants_dict = calculate_sound_f1_f2(
+        analysis, start_time=start_time, end_time=end_time, engine=formant_engine
+    )
     if formants_dict is not None:
-        formants = formants_dict["data"]
-    return {"pitch": pitch, "formants": formants}
+        result["formants"] = formants_dict["data"]
+        result["formantsTimeStep"] = formants_dict["time_step"]
+        result["formantsStartTime"] = formants_dict["start_time"]
+    return result
+
+
+# the amount of peaks returned by the peaks mode, if the file state does not specify it
+DEFAULT_PEAK_COUNT = 2048
 
 
-def vowel_space_mode(
+async def peaks_mode(
     database: DatabaseType,
     file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> dict[str, Any]:
+    """
+    Get the min/max/RMS envelopes of a signal, to draw its waveform without its samples.
+
+    The envelopes come from a peak pyramid that is computed once per file, see `PeakPyramid`.
+    The finest level with at most "peakCount" peaks (from the file state) is returned.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - file_state: A dictionary containing the state of the file, including its ID.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+
+    Returns
+    -------
+    - dict: The envelopes of the signal, see `PeakPyramid.peaks`.
+
+    """
+    return await analyse_file(database, pool, "peaks", peaks_analysis, file_state)
+
+
+def peaks_analysis(file: FileStateType, file_state: FileStateType) -> dict[str, Any]:
+    """Run the peaks analysis on an already fetched file, see `peaks_mode`."""
+    peak_count = file_state.get("peakCount", DEFAULT_PEAK_COUNT)
+    if not isinstance(peak_count, int) or isinstance(peak_count, bool) or peak_count <= 0:
+        raise HTTPException(status_code=400, detail="peakCount should be a positive integer")
+
+    return get_analysis_context(file).peak_pyramid().peaks(peak_count)
+
+
+async def vowel_space_mode(
+    database: DatabaseType,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
 ) -> dict[str, float] | None:
     """
     Extract and return the first and second formants of a specified frame.
 
     This function calculates the first (f1) and second (f2) formants of a segment within the
-    audio signal.
+    audio signal, with the "frameEngine" in the file state, see `validate_engine`.
 
     Parameters
     ----------
     - database: The database object used to fetch the file.
     - file_state: A dictionary containing the state of the file, including frame indices.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
 
     Returns
     -------
@@ -145,23 +520,176 @@ def vowel_space_mode(
 
     Example:
     ```python
-    result = vowel_space_mode(database, file_state)
+    result = await vowel_space_mode(database, file_state)
     ```
 
     """
-    file = get_file(database, file_state)
+    return await analyse_file(database, pool, "vowel-space", vowel_space_analysis, file_state)
+
+
+def vowel_space_analysis(
+    file: FileStateType,
+    file_state: FileStateType,
+) -> dict[str, float] | None:
+    """Run the vowel-space analysis on an already fetched file, see `vowel_space_mode`."""
     audio = get_audio(file)
-    data = audio.get_array_of_samples()
+    data = audio.samples
     frame_index = validate_frame_index(data, file_state)
 
     if frame_index is None:
         return None
 
+    if validate_engine(file_state, "frameEngine", FRAME_ENGINES) == "tracks":
+        info = track_frame_info(
+            get_analysis_context(file),
+            frame_index,
+            formant_engine=validate_engine(file_state, "formantEngine", FORMANT_ENGINES),
+        )
+        if info is None:
+            return None
+        return {"f1": info["f1"], "f2": info["f2"]}
+
     frame_data = data[frame_index["startIndex"] : frame_index["endIndex"]]
     formants = calculate_frame_f1_f2(frame_data, audio.frame_rate)
     return {"f1": formants[0], "f2": formants[1]}
 
 
+async def frames_mode(
+    database: DatabaseType,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> dict[str, Any]:
+    """
+    Extract the basic information of many frames of a signal at once.
+
+    Like the frame of the simple-info mode, but for every frame in the "frames" list of the file
+    state. The file is fetched and decoded once. With the "exact" "frameEngine", the frames are
+    spread over the worker processes of the `analysis_pool`, if enabled, with "tracks" they are
+    taken from the tracks of the whole file, see `track_frame_info`.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - file_state: A dictionary containing the state of the file, including a list of "frames",
+      each with a 'startIndex' and 'endIndex'.
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+
+    Returns
+    -------
+    - dict: The duration, pitch, f1 and f2 of every frame as "frames", in the order of the file
+      state.
+
+    Example:
+    ```python
+    file_state["frames"] = [{"startIndex": 0, "endIndex": 640}]
+    result = await frames_mode(database, file_state)
+    ```
+
+    """
+    return await analyse_file(database, pool, "frames", frames_analysis, file_state)
+
+
+def frames_analysis(file: FileStateType, file_state: FileStateType) -> dict[str, Any]:
+    """Run the frames analysis on an already fetched file, see `frames_mode`."""
+    audio = get_audio(file)
+    frames = validate_frames(audio.samples, file_state)
+    if validate_engine(file_state, "frameEngine", FRAME_ENGINES) == "tracks":
+        analysis = get_analysis_context(file)
+        pitch_engine = validate_engine(file_state, "pitchEngine", PITCH_ENGINES)
+        formant_engine = validate_engine(file_state, "formantEngine", FORMANT_ENGINES)
+        return {
+            "frames": [
+                track_frame_info(analysis, frame, pitch_engine, formant_engine) for frame in frames
+            ],
+        }
+    return {
+        "frames": batch_frame_info(audio.samples, audio.frame_rate, frames, analysis_pool()),
+    }
+
+
+# the analyses that can be run on an already fetched file, by mode
+FILE_ANALYSES: dict[str, Callable[[FileStateType, FileStateType], Any]] = {
+    "simple-info": simple_info_analysis,
+    "spectrogram": spectrogram_analysis,
+    "waveform": waveform_analysis,
+    "peaks": peaks_analysis,
+    "vowel-space": vowel_space_analysis,
+}
+
+
+async def session_mode(
+    database: DatabaseType,
+    session_id: str,
+    mode: str,
+    file_state: FileStateType,
+    pool: ModePool | None = None,
+) -> dict[str, Any]:
+    """
+    Run the analysis of a mode over every file in a session.
+
+    The files in the `wav_cache` are fetched like by `get_file`, so only their metadata is
+    fetched when they are unchanged. The others are fetched in bulk and streamed from the
+    database, so only a few of them are in memory at once, and they are cached as well.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the files.
+    - session_id: The ID of the session.
+    - mode: The analysis mode, one of the keys of `FILE_ANALYSES`.
+    - file_state: The state that is used for every file, with the id of each file filled in.
+    - pool: Runs the analyses in a worker process, or None to run them in the event loop.
+
+    Returns
+    -------
+    - dict: Maps the ID of every file in the session to the result of the analysis, ordered by
+            the creation time of the files.
+
+    Raises
+    ------
+    - HTTPException: If the mode can not be run on a session.
+
+    Example:
+    ```python
+    result = await session_mode(database, session_id, "simple-info", {})
+    ```
+
+    """
+    if mode not in FILE_ANALYSES:
+        raise HTTPException(status_code=404, detail="Mode was not found")
+    analysis = FILE_ANALYSES[mode]
+
+    file_ids = await database.fetch_session_file_ids(  # pyright: ignore[reportAttributeAccessIssue]
+        session_id,
+    )
+    results: dict[str, Any] = {}
+    for file_id in [file_id for file_id in file_ids if file_id in wav_cache]:
+        try:
+            file = await get_file(database, {"id": file_id})
+        except HTTPException as e:
+            # like by `fetch_files`, files that were removed meanwhile are left out
+            if e.status_code != 404:  # noqa: PLR2004
+                raise
+            continue
+        results[file_id] = await cached_analysis(
+            pool, mode, analysis, file, {**file_state, "id": file_id}
+        )
+    uncached_ids = [file_id for file_id in file_ids if file_id not in results]
+    if uncached_ids:
+        # closes the named cursor of the files as well when an analysis raises
+        async with contextlib.aclosing(
+            database.fetch_files(  # pyright: ignore[reportAttributeAccessIssue]
+                uncached_ids,
+                columns=FILE_COLUMNS,
+            )
+        ) as files:
+            async for file in files:
+                await convert_file(file["id"], file)
+                results[file["id"]] = await cached_analysis(
+                    pool, mode, analysis, file, {**file_state, "id": file["id"]}
+                )
+    return {file_id: results[file_id] for file_id in file_ids if file_id in results}
+
+
 def transcription_mode(database: DatabaseType, file_state: FileStateType) -> Any:  # noqa: ARG001
     """TBD."""
     return None
@@ -208,10 +736,14 @@ def error_rate_mode(
     )
 
 
-def get_file(database: DatabaseType, file_state: FileStateType) -> FileStateType:
+async def get_file(database: DatabaseType, file_state: FileStateType) -> FileStateType:
     """
     Fetch a file from the database using the file_state information.
 
+    If a version of the file is in the `wav_cache`, only the metadata of the file is fetched,
+    and if it is still the same version, the cached wav is used without fetching or converting
+    the audio data. Otherwise, the audio data is fetched together with the metadata.
+
     Parameters
     ----------
     - database: The database object used to fetch the file.
@@ -219,7 +751,8 @@ def get_file(database: DatabaseType, file_state: FileStateType) -> FileStateType
 
     Returns
     -------
-    - The file object fetched from the database.
+    - The file object fetched from the database: its "id", "fileSize", "creationTime",
+      "modifiedTime" and its wav "data".
 
     Raises
     ------
@@ -227,43 +760,203 @@ def get_file(database: DatabaseType, file_state: FileStateType) -> FileStateType
 
     Example:
     ```python
-    file = get_file(database, file_state)
+    file = await get_file(database, file_state)
     ```
 
     """
     if "id" not in file_state:
         raise HTTPException(status_code=404, detail="file_state did not include id")
+    cached = wav_cache.get(file_state["id"])
+    if cached is not None:
+        metadata = await get_file_metadata(database, file_state)
+        modified_time, wav = cached
+        if metadata["modifiedTime"] == modified_time:
+            return {**metadata, "data": wav}
+
     try:
-        file = database.fetch_file(file_state["id"])  # pyright: ignore[reportAttributeAccessIssue]
+        file = await database.fetch_file(  # pyright: ignore[reportAttributeAccessIssue]
+            file_state["id"],
+            columns=FILE_COLUMNS,
+        )
     except Exception as e:
         raise HTTPException(status_code=404, detail="File not found") from e
 
-    file["data"] = convert_to_wav(file["data"])
+    return await convert_file(file_state["id"], file)
+
+
+async def convert_file(file_id: str, file: FileStateType) -> FileStateType:
+    """
+    Convert the data of a file that was fetched with `FILE_COLUMNS` to wav, and cache it.
+
+    Parameters
+    ----------
+    - file_id: The ID of the file, the key of the file in the `wav_cache`.
+    - file: The fetched file, its "data" is replaced by the wav and its "fileSize" is set.
+
+    Returns
+    -------
+    - The file.
 
+    """
+    file["fileSize"] = len(file["data"])
+    # ffmpeg runs in a thread, so other requests are served meanwhile
+    file["data"] = await asyncio.to_thread(convert_to_wav, file["data"])
+    if audio_cache_key(file) is not None:
+        wav_cache.put(file_id, (file["modifiedTime"], file["data"]))
     return file
 
 
+async def get_file_metadata(database: DatabaseType, file_state: FileStateType) -> dict[str, Any]:
+    """
+    Fetch the metadata of a file from the database, without fetching the audio itself.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the metadata.
+    - file_state: A dictionary containing the state of the file, including its ID.
+
+    Returns
+    -------
+    - A dictionary with the "id", "fileSize", "creationTime" and "modifiedTime" of the file.
+
+    Raises
+    ------
+    - HTTPException: If the 'id' is not in file_state or if the file is not found.
+
+    Example:
+    ```python
+    metadata = await get_file_metadata(database, file_state)
+    ```
+
+    """
+    if "id" not in file_state:
+        raise HTTPException(status_code=404, detail="file_state did not include id")
+    try:
+        return await database.fetch_file_metadata(  # pyright: ignore[reportAttributeAccessIssue]
+            file_state["id"],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=404, detail="File not found") from e
+
+
 def convert_to_wav(data: bytes) -> bytes:
-    """Convert an arbitrary format recording into wav format."""
-    with tempfile.NamedTemporaryFile(delete=False) as temp_input:
-        temp_input.write(data)
-        temp_input.flush()  # Ensure data is written to disk
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_output:
-            command = [
-                "ffmpeg",
-                "-y",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-i",
-                temp_input.name,
-                temp_output.name,
-            ]
-            subprocess.run(
-                command,  # noqa: S603
-                stdout=subprocess.DEVNULL,
-                stdin=subprocess.DEVNULL,
-                check=False,
-            )
-            temp_output.seek(0)  # Rewind to the beginning of the file
-            return temp_output.read()
+    """
+    Convert an arbitrary format recording into 16-bit PCM wav format.
+
+    Recordings that already are 16-bit PCM wav files are returned untouched. Others are piped
+    through ffmpeg, so nothing is written to disk. Only containers that can not be read from a
+    stream (e.g. mp4 with its index at the end) are passed to ffmpeg as a temporary file, which
+    is removed right after.
+
+    Parameters
+    ----------
+    - data: The bytes of the recording, in any format ffmpeg can decode.
+
+    Returns
+    -------
+    - The bytes of the recording as a 16-bit PCM wav file.
+
+    Raises
+    ------
+    - HTTPException: If ffmpeg fails to convert the recording.
+
+    """
+    if is_canonical_wav(data):
+        return data
+
+    result = _run_ffmpeg("pipe:0", data)
+    if result.returncode != 0 or not result.stdout:
+        with tempfile.NamedTemporaryFile() as temp_input:
+            temp_input.write(data)
+            temp_input.flush()
+            result = _run_ffmpeg(temp_input.name, None)
+
+    if result.returncode != 0 or not result.stdout:
+        error = result.stderr.decode(errors="replace").strip().splitlines()
+        raise HTTPException(
+            status_code=422,
+            detail="Could not convert the file to wav" + (f": {error[-1]}" if error else ""),
+        )
+
+    return fix_wav_header(result.stdout)
+
+
+def _run_ffmpeg(source: str, data: bytes | None) -> subprocess.CompletedProcess[bytes]:
+    """Run ffmpeg on the source (a path or pipe:0 with the data), writing wav to stdout."""
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        source,
+        "-f",
+        "wav",
+        "-acodec",
+        "pcm_s16le",
+        "pipe:1",
+    ]
+    return subprocess.run(
+        command,  # noqa: S603
+        input=data if data is not None else b"",
+        capture_output=True,
+        check=False,
+    )
+
+
+def fix_wav_header(wav: bytes) -> bytes:
+    """
+    Fill in the RIFF and data chunk sizes of a wav file that was written to a stream.
+
+    When writing to a pipe, ffmpeg can not seek back to the header, so it leaves the sizes
+    at their maximum value. Some readers (e.g. the `wave` module) rely on them being correct.
+
+    Parameters
+    ----------
+    - wav: The bytes of a complete wav file.
+
+    Returns
+    -------
+    - The same wav file, with the sizes in its header matching its length.
+
+    """
+    for chunk_id, offset, _ in wav_chunks(wav):
+        if chunk_id == b"data":
+            fixed = bytearray(wav)
+            fixed[4:8] = (len(wav) - 8).to_bytes(4, "little")
+            fixed[offset + 4 : offset + 8] = (len(wav) - offset - 8).to_bytes(4, "little")
+            return bytes(fixed)
+    return wav
+
+
+def is_canonical_wav(data: bytes) -> bool:
+    """
+    Check whether a recording already is a 16-bit PCM wav file, by sniffing its header.
+
+    Parameters
+    ----------
+    - data: The bytes of the recording.
+
+    Returns
+    -------
+    - True if the recording is a RIFF/WAVE file with a 16-bit integer PCM fmt chunk, followed by
+      a data chunk that fits in the file, False otherwise.
+
+    Example:
+    ```python
+    if not is_canonical_wav(data):
+        data = convert_to_wav(data)
+    ```
+
+    """
+    if int.from_bytes(data[4:8], "little") != len(data) - 8:
+        return False
+    fmt_found = False
+    for chunk_id, offset, chunk_size in wav_chunks(data):
+        if chunk_id == b"fmt ":
+            format_tag = int.from_bytes(data[offset + 8 : offset + 10], "little")
+            bits_per_sample = int.from_bytes(data[offset + 22 : offset + 24], "little")
+            fmt_found = chunk_size >= 16 and format_tag == WAVE_FORMAT_PCM and bits_per_sample == 16  # noqa: PLR2004
+        elif chunk_id == b"data":
+            return fmt_found and offset + 8 + chunk_size <= len(data)
+    return False
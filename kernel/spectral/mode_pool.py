@@ -0,0 +1,347 @@
+"""Running the analyses of the modes in worker processes, so they do not block the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing.util
+import os
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from fastapi import HTTPException
+
+from . import signal_analysis
+from .types import FileStateType
+
+
+def parse_mode_limits(limits: str) -> dict[str, int]:
+    """
+    Parse the concurrency limits of modes.
+
+    Parameters
+    ----------
+    - limits: Comma separated "mode=limit" pairs.
+
+    Returns
+    -------
+    - dict: The limit of every mode in `limits`.
+
+    Example:
+    ```python
+    parse_mode_limits("spectrogram=1, waveform=2")  # {"spectrogram": 1, "waveform": 2}
+    ```
+
+    """
+    result = {}
+    for pair in limits.split(","):
+        if pair.strip():
+            mode, _, limit = pair.partition("=")
+            result[mode.strip()] = int(limit)
+    return result
+
+
+# the amount of worker processes that run the analyses of the modes, 0 runs them in the event loop
+MODE_PROCESSES = int(os.getenv("MODE_PROCESSES", str(os.cpu_count() or 1)))
+
+# the maximum amount of concurrent analyses per mode, e.g. "spectrogram-matrix=1,peaks=4", modes
+# without a limit can use every process
+MODE_CONCURRENCY = parse_mode_limits(os.getenv("MODE_CONCURRENCY", ""))
+
+# lists of numbers of at least this length are sent back from the workers as arrays
+PACK_MIN_LENGTH = 256
+
+
+@dataclass(frozen=True)
+class PackedArray:
+    """A list of numbers (or nested lists of them) sent between processes as an array."""
+
+    array: np.ndarray
+    none_as_nan: bool
+
+
+@dataclass(frozen=True)
+class AnalysisError:
+    """An HTTPException of an analysis in a worker, which can not be sent back as is."""
+
+    status_code: int
+    detail: Any
+
+
+def pack_payload(value: Any) -> Any:
+    """
+    Replace the long lists of numbers in a result by `PackedArray`s.
+
+    A list of floats pickles as a separate object for every float, an array as a single buffer.
+    Lists with None (undefined values) are packed with NaN instead, lists of anything else than
+    numbers are left as they are.
+    """
+    if isinstance(value, dict):
+        return {key: pack_payload(item) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+    if len(value) >= PACK_MIN_LENGTH:
+        try:
+            values = np.array(value)
+        except ValueError:  # nested lists of different lengths
+            values = None
+        if values is not None and values.dtype.kind in "iuf":
+            return PackedArray(values, none_as_nan=False)
+        if values is not None and values.dtype == object:
+            flat = values.ravel()
+            if all(item is None or isinstance(item, float) for item in flat):
+                return PackedArray(values.astype(np.float64), none_as_nan=True)
+    return [pack_payload(item) for item in value]
+
+
+def unpack_payload(value: Any) -> Any:
+    """Restore the lists of a result packed with `pack_payload`."""
+    if isinstance(value, PackedArray):
+        if value.none_as_nan:
+            return signal_analysis.nan_to_none(value.array)
+        return value.array.tolist()
+    if isinstance(value, dict):
+        return {key: unpack_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [unpack_payload(item) for item in value]
+    return value
+
+
+def worker_file(file: FileStateType) -> FileStateType:
+    """
+    Return the part of a fetched file that is sent to a worker.
+
+    The audio is only sent as its wav "data" with the metadata of the file, the worker decodes
+    it through its own `audio_cache`. Decoded audio and the analysis context are left out.
+    """
+    return {key: value for key, value in file.items() if key not in ("analysis", "audio")}
+
+
+def init_worker(processes: int, analysis_processes: int) -> None:
+    """
+    Set up a worker process of a `ModePool`.
+
+    Every file is analysed by the same worker, so the budgets of the caches are split between
+    the workers. Long sounds are analysed in chunks on a pool of the worker itself, which is
+    stopped when the worker exits.
+
+    Parameters
+    ----------
+    - processes: The amount of worker processes of the `ModePool`.
+    - analysis_processes: The amount of processes for chunked analyses of the worker, 1 or less
+      to analyse long sounds at once.
+
+    """
+    signal_analysis.audio_cache.max_size //= processes
+    signal_analysis.analysis_cache.max_size //= processes
+    signal_analysis.start_analysis_pool(analysis_processes)
+    multiprocessing.util.Finalize(None, signal_analysis.shutdown_analysis_pool, exitpriority=0)
+
+
+def cache_stats() -> dict[str, Any]:
+    """Return the stats of the audio and analysis caches of this process."""
+    return {
+        "audioCache": signal_analysis.audio_cache.stats(),
+        "analysisCache": signal_analysis.analysis_cache.stats(),
+    }
+
+
+def run_packed(
+    analysis: Callable[[FileStateType, FileStateType], Any],
+    file: FileStateType,
+    file_state: FileStateType,
+) -> Any:
+    """Run an analysis in a worker, with its result packed, see `pack_payload`."""
+    try:
+        return pack_payload(analysis(file, file_state))
+    except HTTPException as e:
+        return AnalysisError(e.status_code, e.detail)
+
+
+class ModePool:
+    """
+    Runs the analyses of the modes in a pool of worker processes.
+
+    The number of concurrent analyses of every mode is limited, so e.g. a few long spectrograms
+    can not take all the processes. Every worker keeps its own audio and analysis caches, and
+    the analyses of a file always run on the same worker, so the tracks and pyramids of a file
+    are computed and kept once, see `worker_index`.
+
+    Every worker analyses long sounds in chunks on its own pool, the `ANALYSIS_PROCESSES` are
+    split between the workers for this. So besides the `processes` workers themselves, at most
+    `ANALYSIS_PROCESSES` processes run chunks, and a worker analyses long sounds at once if its
+    share is a single process. A worker that exits, e.g. because it was killed when memory ran
+    out, is replaced by a new one.
+
+    Attributes
+    ----------
+        processes (int): The amount of worker processes.
+
+    """
+
+    def __init__(
+        self,
+        processes: int = MODE_PROCESSES,
+        limits: dict[str, int] | None = None,
+        analysis_processes: int | None = None,
+    ) -> None:
+        """
+        Start the worker processes.
+
+        Args:
+        ----
+            processes (int): The amount of worker processes.
+            limits (dict[str, int] | None): The maximum amount of concurrent analyses per mode,
+                                            `MODE_CONCURRENCY` if None.
+            analysis_processes (int | None): The amount of processes for chunked analyses of
+                                             every worker, if None an equal share of the
+                                             `ANALYSIS_PROCESSES`.
+
+        """
+        self.processes = processes
+        self._limits = MODE_CONCURRENCY if limits is None else limits
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        if analysis_processes is None:
+            analysis_processes = signal_analysis.ANALYSIS_PROCESSES // processes
+        self._analysis_processes = analysis_processes
+        # a single process per executor, so every file can be sent to its own worker
+        self._executors = [self._start_executor() for _ in range(processes)]
+        self._running = [0] * processes
+        # the workers are forked on the first job, which is best done before other threads start
+        for executor in self._executors:
+            executor.submit(int).result()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            initializer=init_worker,
+            initargs=(self.processes, self._analysis_processes),
+        )
+
+    async def _submit(
+        self,
+        index: int,
+        analysis: Callable[[FileStateType, FileStateType], Any],
+        file: FileStateType,
+        file_state: FileStateType,
+    ) -> Any:
+        """Run an analysis on a worker, which is replaced if it exits during the analysis."""
+        executor = self._executors[index]
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, run_packed, analysis, file, file_state
+            )
+        except BrokenProcessPool:
+            # concurrent analyses on the same worker only replace it once
+            if self._executors[index] is executor:
+                executor.shutdown(wait=False)
+                self._executors[index] = self._start_executor()
+            raise
+
+    def worker_index(self, file: FileStateType) -> int:
+        """
+        Return the index of the worker that analyses a file.
+
+        A file with an "id" is always analysed by the same worker, whose caches then hold its
+        audio and analyses, other files by the worker with the least running analyses.
+        """
+        if file.get("id") is None:
+            return self._running.index(min(self._running))
+        return zlib.crc32(str(file["id"]).encode()) % self.processes
+
+    async def run(
+        self,
+        mode: str,
+        analysis: Callable[[FileStateType, FileStateType], Any],
+        file: FileStateType,
+        file_state: FileStateType,
+    ) -> Any:
+        """
+        Run the analysis of a mode on a fetched file in a worker, once the mode is below its limit.
+
+        If the worker exits during the analysis, it is replaced and the analysis is run once
+        more on the new worker.
+
+        Parameters
+        ----------
+        - mode: The mode, for its concurrency limit.
+        - analysis: The analysis of the mode, a function of the fetched file and the file state.
+        - file: The fetched file.
+        - file_state: The state of the file.
+
+        Returns
+        -------
+        - The result of the analysis.
+
+        Raises
+        ------
+        - HTTPException: If the analysis raised one, or with status 503 if the worker exited
+                         during both runs of the analysis.
+
+        """
+        if mode not in self._semaphores:
+            self._semaphores[mode] = asyncio.Semaphore(self._limits.get(mode, self.processes))
+        async with self._semaphores[mode]:
+            index = self.worker_index(file)
+            self._running[index] += 1
+            try:
+                try:
+                    result = await self._submit(index, analysis, worker_file(file), file_state)
+                except BrokenProcessPool:
+                    result = await self._submit(index, analysis, worker_file(file), file_state)
+            except BrokenProcessPool as e:
+                raise HTTPException(status_code=503, detail="Analysis worker stopped") from e
+            finally:
+                self._running[index] -= 1
+        if isinstance(result, AnalysisError):
+            raise HTTPException(status_code=result.status_code, detail=result.detail)
+        return unpack_payload(result)
+
+    async def cache_stats(self) -> dict[str, Any]:
+        """
+        Gather the stats of the audio and analysis caches of the workers.
+
+        Returns
+        -------
+        - dict: The counters and sizes of every cache summed over the workers, and the stats of
+          every worker as "workers", None for a worker that exited.
+
+        """
+        loop = asyncio.get_running_loop()
+
+        async def worker_stats(executor: ProcessPoolExecutor) -> dict[str, Any] | None:
+            try:
+                return await loop.run_in_executor(executor, cache_stats)
+            except BrokenProcessPool:  # replaced by the next analysis of the worker
+                return None
+
+        workers = await asyncio.gather(*(worker_stats(e) for e in self._executors))
+        totals: dict[str, Any] = {}
+        for stats in filter(None, workers):
+            for cache, counters in stats.items():
+                total = totals.setdefault(cache, dict.fromkeys(counters, 0))
+                for name, value in counters.items():
+                    total[name] += value
+        return {**totals, "workers": workers}
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        for executor in self._executors:
+            executor.shutdown(cancel_futures=True)
+
+
+async def run_analysis(
+    pool: ModePool | None,
+    mode: str,
+    analysis: Callable[[FileStateType, FileStateType], Any],
+    file: FileStateType,
+    file_state: FileStateType,
+) -> Any:
+    """Run the analysis of a mode on a fetched file, in the pool if there is one."""
+    if pool is None:
+        return analysis(file, file_state)
+    return await pool.run(mode, analysis, file, file_state)
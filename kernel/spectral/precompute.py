@@ -0,0 +1,202 @@
+"""Precomputing the analyses of files in the background, from a job queue in the database."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .database import AsyncDatabase
+from .mode_handler import (
+    get_file,
+    peaks_analysis,
+    spectrogram_analysis,
+    spectrogram_tile_analysis,
+    waveform_analysis,
+)
+from .mode_pool import ModePool
+from .result_cache import cached_analysis
+from .types import FileStateType
+
+logger = logging.getLogger(__name__)
+
+# the amount of jobs that are run at the same time, 0 disables the precomputing, the analyses
+# themselves run in the `ModePool`
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "1"))
+
+# the time (in seconds) a worker waits before it looks for new jobs again, when there were none
+PRECOMPUTE_POLL_INTERVAL = float(os.getenv("PRECOMPUTE_POLL_INTERVAL", "5"))
+
+# the time (in seconds) after which a running job is taken over by another worker
+PRECOMPUTE_JOB_TIMEOUT = float(os.getenv("PRECOMPUTE_JOB_TIMEOUT", "600"))
+
+# the amount of times a job is taken over before it is given up
+PRECOMPUTE_MAX_ATTEMPTS = 3
+
+# the time (in seconds) within which uploaded or modified files are queued when there are no
+# jobs yet, older files are only precomputed on request
+PRECOMPUTE_NEW_FILES_AGE = float(os.getenv("PRECOMPUTE_NEW_FILES_AGE", "86400"))
+
+# the analyses that are run ahead of time, with the file state they are run with, by mode. These
+# decode the audio and compute the pitch and formant tracks and the peak and spectrogram
+# pyramids, and their results are kept in the `result_cache` for the default file state.
+PRECOMPUTE_ANALYSES: tuple[
+    tuple[str, Callable[[FileStateType, FileStateType], Any], FileStateType], ...
+] = (
+    ("waveform", waveform_analysis, {}),
+    ("spectrogram", spectrogram_analysis, {}),
+    ("peaks", peaks_analysis, {}),
+    ("spectrogram-tile", spectrogram_tile_analysis, {"zoom": 0, "index": 0}),
+)
+
+
+async def precompute_file(
+    database: AsyncDatabase, file_id: str, pool: ModePool | None = None
+) -> None:
+    """
+    Run the `PRECOMPUTE_ANALYSES` on a file, so the caches are warm when the file is opened.
+
+    Parameters
+    ----------
+    - database: The database object used to fetch the file.
+    - file_id: The ID of the file.
+    - pool: Runs the analyses in a worker process, or None to run them in the event loop.
+
+    Raises
+    ------
+    - HTTPException: If the file is not found or can not be analysed.
+
+    Example:
+    ```python
+    await precompute_file(database, file_id)
+    ```
+
+    """
+    file = await get_file(database, {"id": file_id})
+    await precompute_analyses(file, pool)
+
+
+async def precompute_analyses(file: FileStateType, pool: ModePool | None = None) -> None:
+    """
+    Run the `PRECOMPUTE_ANALYSES` on a fetched file, see `precompute_file`.
+
+    Parameters
+    ----------
+    - file: The fetched file.
+    - pool: Runs the analyses in a worker process, or None to run them in the event loop.
+
+    Raises
+    ------
+    - HTTPException: If the file can not be analysed.
+
+    """
+    for mode, analysis, file_state in PRECOMPUTE_ANALYSES:
+        await cached_analysis(pool, mode, analysis, file, {**file_state, "id": file["id"]})
+
+
+class PrecomputeWorker:
+    """
+    Runs the precompute jobs in the database, on a few concurrent tasks.
+
+    The jobs are claimed with `FOR UPDATE SKIP LOCKED`, so several kernels can share the queue
+    without running a job twice. When the queue is empty, jobs are added for the files that were
+    uploaded or modified since the newest job, see `AsyncDatabase.enqueue_new_files`.
+
+    Attributes
+    ----------
+        workers (int): The amount of jobs that are run at the same time.
+        poll_interval (float): The time (in seconds) to wait when there are no jobs.
+
+    """
+
+    def __init__(
+        self,
+        open_database: Callable[[], Awaitable[AsyncDatabase]],
+        pool: ModePool | None = None,
+        workers: int = PRECOMPUTE_WORKERS,
+        poll_interval: float = PRECOMPUTE_POLL_INTERVAL,
+    ) -> None:
+        """
+        Initialize the worker, the tasks are started with `start`.
+
+        Args:
+        ----
+            open_database (Callable): Returns a connected database object, which is closed
+                                      after every job.
+            pool (ModePool | None): Runs the analyses in a worker process, or None to run them
+                                    in the event loop.
+            workers (int): The amount of jobs that are run at the same time.
+            poll_interval (float): The time (in seconds) to wait when there are no jobs.
+
+        """
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._open_database = open_database
+        self._pool = pool
+        self._tasks: list[asyncio.Task] = []
+
+    async def run_job(self) -> bool:
+        """
+        Claim the next job and run it, or look for new files if there is none.
+
+        A job that raises is marked as failed with its error, and retried when it is enqueued
+        again. The connection to the database is only held to claim the job, to fetch the file
+        and to finish the job, not while the analyses run.
+
+        Returns
+        -------
+        - bool: Whether a job was run.
+
+        """
+        database = await self._open_database()
+        try:
+            job = await database.claim_precompute_job(
+                PRECOMPUTE_MAX_ATTEMPTS, PRECOMPUTE_JOB_TIMEOUT
+            )
+            if job is None:
+                await database.enqueue_new_files(PRECOMPUTE_NEW_FILES_AGE)
+        finally:
+            await database.close()
+        if job is None:
+            return False
+
+        error = None
+        try:
+            database = await self._open_database()
+            try:
+                file = await get_file(database, {"id": job["file"]})
+            finally:
+                await database.close(commit=False)  # nothing was written
+            await precompute_analyses(file, self._pool)
+        except Exception as e:
+            error = str(e)
+
+        database = await self._open_database()
+        try:
+            await database.finish_precompute_job(job["file"], job["modifiedTime"], error)
+        finally:
+            await database.close()
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                ran = await self.run_job()
+            except Exception:  # e.g. the database is not reachable
+                logger.exception("Precompute job could not be run")
+                ran = False
+            if not ran:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Start the tasks in the running event loop."""
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the tasks, their jobs are taken over after `PRECOMPUTE_JOB_TIMEOUT`."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
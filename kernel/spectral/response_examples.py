@@ -29,10 +29,31 @@ signal_modes_response_examples: dict[int | str, dict[str, Any]] = {
                         "summary": "Example for spectrogram mode",
                         "value": "null (actual null value, fastapi currently doesn't support examples with just null)",
                     },
+                    "spectrogram-matrix": {
+                        "summary": "Example for spectrogram-matrix mode",
+                        "value": {
+                            "timeStep": 0.002,
+                            "windowLength": 0.005,
+                            "frequencyStep": 20.0,
+                            "startTime": 0.0035,
+                            "data": [[1.2e-7, 3.4e-8], [5.6e-9, 7.8e-10]],
+                        },
+                    },
                     "waveform": {
                         "summary": "Example for waveform mode",
                         "value": "null (actual null value, fastapi currently doesn't support examples with just null)",
                     },
+                    "peaks": {
+                        "summary": "Example for peaks mode",
+                        "value": {
+                            "frameRate": 16000,
+                            "levels": [32, 64, 128],
+                            "samplesPerPeak": 64,
+                            "min": [-120, -3400],
+                            "max": [98, 2900],
+                            "rms": [35.2, 1210.7],
+                        },
+                    },
                     "vowel-space": {
                         "summary": "Example for vowel-space mode",
                         "value": {"f1": 400.56, "f2": 800.98},
@@ -41,6 +62,15 @@ signal_modes_response_examples: dict[int | str, dict[str, Any]] = {
                         "summary": "Example for vowel-space mode if no frame is provided",
                         "value": None,
                     },
+                    "frames": {
+                        "summary": "Example for frames mode",
+                        "value": {
+                            "frames": [
+                                {"duration": 0.04, "pitch": 200.2, "f1": 400.56, "f2": 800.98},
+                                {"duration": 0.05, "pitch": 180.4, "f1": 650.12, "f2": 1100.43},
+                            ],
+                        },
+                    },
                     "transcription": {
                         "summary": "Example for transcription mode",
                         "value": [
@@ -209,12 +239,49 @@ signal_modes_response_examples: dict[int | str, dict[str, Any]] = {
                     },
                 },
             },
+            "application/vnd.spectral.spectrogram+float32": {
+                "schema": {"type": "string", "format": "binary"},
+                "example": "spectrogram-matrix mode: header length (uint32), JSON header, float32 values",
+            },
+            "application/vnd.spectral.spectrogram+uint8": {
+                "schema": {"type": "string", "format": "binary"},
+                "example": "spectrogram-matrix mode: header length (uint32), JSON header, uint8 dB values",
+            },
         },
     },
     400: {"content": {"application/json": {"example": {"detail": "error message"}}}},
     404: {"content": {"application/json": {"example": {"detail": "error message"}}}},
 }
 
+spectrogram_tile_response_examples: dict[int | str, dict[str, Any]] = {
+    200: {
+        "content": {
+            "application/json": {
+                "example": {
+                    "zoom": 1,
+                    "index": 0,
+                    "maxZoom": 4,
+                    "tiles": 2,
+                    "timeStep": 0.016,
+                    "windowLength": 0.005,
+                    "frequencyStep": 31.25,
+                    "startTime": 0.0125,
+                    "data": [[1.2e-7, 3.4e-8], [5.6e-9, 7.8e-10]],
+                },
+            },
+            "application/vnd.spectral.spectrogram+float32": {
+                "schema": {"type": "string", "format": "binary"},
+                "example": "header length (uint32), JSON header, float32 values",
+            },
+            "application/vnd.spectral.spectrogram+uint8": {
+                "schema": {"type": "string", "format": "binary"},
+                "example": "header length (uint32), JSON header, uint8 dB values",
+            },
+        },
+    },
+    404: {"content": {"application/json": {"example": {"detail": "error message"}}}},
+}
+
 transcription_response_examples: dict[int | str, dict[str, Any]] = {
     200: {
         "content": {
@@ -0,0 +1,507 @@
+"""Cache of the results of the modes, in memory and on disk, keyed by the content of the audio."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import orjson
+import parselmouth
+
+from .caching import LRUCache, SingleFlight
+from .mode_pool import ModePool, PackedArray, pack_payload, run_analysis
+from .signal_analysis import audio_cache_key, nan_to_none
+from .types import FileStateType
+
+# the version of the analyses, increase it when a change to them changes their results, so the
+# results of the old version are not used anymore
+ANALYSIS_VERSION = f"1-praat-{parselmouth.PRAAT_VERSION}"
+
+# the keys of the file state that the result of every mode depends on, results of modes that
+# are not listed are not cached
+MODE_PARAMETERS: dict[str, tuple[str, ...]] = {
+    "simple-info": ("frame", "pitchEngine", "formantEngine", "frameEngine"),
+    "spectrogram": ("startTime", "endTime", "formantEngine"),
+    "spectrogram-matrix": (),
+    "spectrogram-tile": ("zoom", "index"),
+    "waveform": ("startTime", "endTime", "pitchEngine", "formantEngine"),
+    "peaks": ("peakCount",),
+    "vowel-space": ("frame", "frameEngine", "formantEngine"),
+    "frames": ("frames", "frameEngine", "pitchEngine", "formantEngine"),
+}
+
+# the metadata of the fetched file that the result of a mode depends on, besides its audio
+MODE_FILE_FIELDS: dict[str, tuple[str, ...]] = {
+    "simple-info": ("fileSize", "creationTime"),
+}
+
+# the start of every encoded result, followed by the length of its header
+RESULT_MAGIC = b"SPRC"
+
+# the buffers of the arrays in an encoded result are aligned to this amount of bytes
+RESULT_ALIGNMENT = 8
+
+
+def encode_result(result: Any) -> bytes:
+    """
+    Encode the result of a mode into compact bytes.
+
+    The long lists of numbers in the result (see `pack_payload`) and its arrays are stored as
+    raw buffers after a JSON header with the rest of the result, in which they are replaced by
+    {"$array": index}. Floats that JSON can not represent (NaN and infinity) are replaced by
+    {"$float": "nan"} and the like.
+
+    Parameters
+    ----------
+    - result: The result of a mode, of JSON types, datetimes and numpy arrays.
+
+    Returns
+    -------
+    - bytes: The encoded result, see `decode_result`.
+
+    Raises
+    ------
+    - TypeError: If the result contains anything else.
+
+    Example:
+    ```python
+    decode_result(encode_result({"pitch": [100.0, None]}))  # {"pitch": [100.0, None]}
+    ```
+
+    """
+    arrays: list[tuple[np.ndarray, str]] = []
+
+    def replace_arrays(value: Any) -> Any:
+        if isinstance(value, PackedArray | np.ndarray):
+            if isinstance(value, np.ndarray):
+                arrays.append((value, "array"))
+            else:
+                arrays.append((value.array, "none-as-nan" if value.none_as_nan else "list"))
+            return {"$array": len(arrays) - 1}
+        if isinstance(value, float) and not math.isfinite(value):
+            return {"$float": str(value)}
+        if isinstance(value, dict):
+            return {key: replace_arrays(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [replace_arrays(item) for item in value]
+        return value
+
+    structure = replace_arrays(pack_payload(result))
+    buffers = []
+    descriptions = []
+    offset = 0
+    for array, kind in arrays:
+        buffer = np.ascontiguousarray(array).tobytes()
+        descriptions.append([array.dtype.str, list(array.shape), offset, kind])
+        buffers.append(buffer + bytes(-len(buffer) % RESULT_ALIGNMENT))
+        offset += len(buffers[-1])
+    header = orjson.dumps(
+        {"result": structure, "arrays": descriptions}, option=orjson.OPT_SERIALIZE_NUMPY
+    )
+    header += b" " * (-(len(header) + len(RESULT_MAGIC) + 4) % RESULT_ALIGNMENT)
+    return b"".join([RESULT_MAGIC, struct.pack("<I", len(header)), header, *buffers])
+
+
+def decode_result(data: bytes) -> Any:
+    """
+    Decode a result encoded with `encode_result`.
+
+    Arrays are read-only views on the data, lists of numbers are restored as lists.
+
+    Parameters
+    ----------
+    - data: The encoded result.
+
+    Returns
+    -------
+    - The result of the mode.
+
+    Raises
+    ------
+    - ValueError: If the data is not an encoded result, or a truncated or damaged one.
+
+    """
+    if data[: len(RESULT_MAGIC)] != RESULT_MAGIC:
+        raise ValueError("Not an encoded result")
+    try:
+        (header_length,) = struct.unpack_from("<I", data, len(RESULT_MAGIC))
+        start = len(RESULT_MAGIC) + 4
+        header = orjson.loads(data[start : start + header_length])
+        start += header_length
+        arrays = [decode_array(data, start, description) for description in header["arrays"]]
+        return restore_arrays(header["result"], arrays)
+    except (struct.error, KeyError, TypeError, IndexError) as e:
+        raise ValueError("Damaged encoded result") from e
+
+
+def decode_array(data: bytes, start: int, description: list) -> Any:
+    """Decode an array of an encoded result, described by its dtype, shape, offset and kind."""
+    dtype, shape, offset, kind = description
+    count = int(np.prod(shape))
+    array = np.frombuffer(data, np.dtype(dtype), count, start + offset).reshape(shape)
+    if kind == "none-as-nan":
+        return nan_to_none(array)
+    if kind == "list":
+        return array.tolist()
+    return array
+
+
+def restore_arrays(value: Any, arrays: list) -> Any:
+    """Replace the {"$array": index} and {"$float": value} of an encoded result by their values."""
+    if isinstance(value, dict):
+        if len(value) == 1 and "$array" in value:
+            return arrays[value["$array"]]
+        if len(value) == 1 and "$float" in value:
+            return float(value["$float"])
+        return {key: restore_arrays(item, arrays) for key, item in value.items()}
+    if isinstance(value, list):
+        return [restore_arrays(item, arrays) for item in value]
+    return value
+
+
+class DiskCache:
+    """
+    Directory of cached bytes with a budget on their total size.
+
+    Every entry is a file named after its key. When storing an entry would exceed the budget,
+    the least recently used files are removed first, the recency of a file is its modification
+    time, which is updated on every hit. Files are written to a temporary file and renamed, so
+    processes can share the directory, each with its own bookkeeping of its size.
+
+    Attributes
+    ----------
+        directory (str): The directory of the entries.
+        max_size (int): The budget for the total size of the entries in bytes.
+        hits (int): The amount of lookups that found an entry.
+        misses (int): The amount of lookups that did not find an entry.
+        evictions (int): The amount of entries that were removed to make room for others.
+
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        """
+        Open the directory, creating it if needed, and take stock of the entries in it.
+
+        Args:
+        ----
+            directory (str): The directory of the entries.
+            max_size (int): The budget for the total size of the entries in bytes.
+
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in Path(directory).glob("*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # evicted by another process meanwhile
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        self._entries: OrderedDict[str, int] = OrderedDict((key, size) for _, key, size in entries)
+        self._size = sum(self._entries.values())
+        self._evict(0)
+
+    def _path(self, key: str) -> Path:
+        return Path(self.directory) / f"{key}.bin"
+
+    def _evict(self, size: int) -> None:
+        """Remove the least recently used entries until `size` more bytes fit, with the lock."""
+        while self._entries and self._size + size > self.max_size:
+            key, evicted_size = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+            # the file may have been removed by another process already
+            self._path(key).unlink(missing_ok=True)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the entry stored under the key and mark it as recently used, or None."""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # unlike touch, this does not create the file again if it was evicted meanwhile
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._size -= size
+            return None
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:  # stored by another process
+                self._evict(len(data))
+                self._entries[key] = len(data)
+                self._size += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store an entry under the key, removing the least recently used entries if needed.
+
+        Entries that can not be written, e.g. because the disk is full, are left out.
+        """
+        if len(data) > self.max_size:
+            return
+        descriptor, temporary_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        temporary_path = Path(temporary_name)
+        try:
+            with os.fdopen(descriptor, mode="wb") as f:
+                f.write(data)
+            temporary_path.replace(self._path(key))
+        except OSError:
+            temporary_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            old_size = self._entries.pop(key, None)
+            if old_size is not None:
+                self._size -= old_size
+            self._evict(len(data))
+            self._entries[key] = len(data)
+            self._size += len(data)
+
+    def delete(self, key: str) -> None:
+        """Remove the entry stored under the key, if any."""
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._size -= size
+            self._path(key).unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        """Return the amount of entries."""
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            for key in self._entries:
+                self._path(key).unlink(missing_ok=True)
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self._size,
+                "maxSize": self.max_size,
+            }
+
+
+class ResultCache:
+    """
+    Two tiered cache of encoded results: in memory, and optionally on disk.
+
+    Lookups try the memory first, results found on disk are put back in memory. New results
+    are stored in both tiers.
+
+    Attributes
+    ----------
+        memory (LRUCache): The memory tier, with a budget in bytes.
+        disk (DiskCache | None): The disk tier, None if disabled.
+
+    """
+
+    def __init__(self, max_size: int, directory: str | None = None, disk_size: int = 0) -> None:
+        """
+        Initialize the tiers.
+
+        Args:
+        ----
+            max_size (int): The budget of the memory tier in bytes.
+            directory (str | None): The directory of the disk tier, None to disable it.
+            disk_size (int): The budget of the disk tier in bytes.
+
+        """
+        self.memory: LRUCache[str, bytes] = LRUCache(max_size, size_of=len)
+        self.disk = DiskCache(directory, disk_size) if directory else None
+
+    def get(self, key: str) -> bytes | None:
+        """Return the encoded result stored under the key, or None."""
+        data = self.memory.get(key)
+        if data is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an encoded result under the key in both tiers."""
+        self.memory.put(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def delete(self, key: str) -> None:
+        """Remove the encoded result stored under the key from both tiers."""
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        """Remove all the results from both tiers and reset the counters."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters and the current size of both tiers, None for a disabled tier."""
+        return {
+            "memory": self.memory.stats(),
+            "disk": None if self.disk is None else self.disk.stats(),
+        }
+
+
+# the results of the modes, the memory tier has a budget of RESULT_CACHE_SIZE bytes, the disk
+# tier is only used when RESULT_CACHE_DIR is set and has a budget of RESULT_CACHE_DISK_SIZE bytes
+result_cache = ResultCache(
+    max_size=int(os.getenv("RESULT_CACHE_SIZE", str(128 * 2**20))),
+    directory=os.getenv("RESULT_CACHE_DIR") or None,
+    disk_size=int(os.getenv("RESULT_CACHE_DISK_SIZE", str(2**30))),
+)
+
+# the analyses that are running, by the key of their result, so identical concurrent requests
+# share a single analysis
+running_analyses: SingleFlight[str, Any] = SingleFlight()
+
+# the SHA-256 of the audio of the files, keyed like the `audio_cache`, so it is only computed
+# once per version of a file
+audio_digest_cache: LRUCache[Hashable, str] = LRUCache(max_size=4096)
+
+
+def audio_digest(file: FileStateType) -> str | None:
+    """
+    Return the SHA-256 of the wav data of a fetched file.
+
+    The wav is hashed as it is, so the audio does not have to be decoded in this process.
+
+    Parameters
+    ----------
+    - file: The fetched file, with its wav "data".
+
+    Returns
+    -------
+    - str: The hexadecimal digest, or None if the file has no wav data.
+
+    """
+    if "data" not in file:
+        return None
+    key = audio_cache_key(file)
+    digest = audio_digest_cache.get(key) if key is not None else None
+    if digest is None:
+        digest = hashlib.sha256(file["data"]).hexdigest()
+        if key is not None:
+            audio_digest_cache.put(key, digest)
+    return digest
+
+
+def result_cache_key(mode: str, file: FileStateType, file_state: FileStateType) -> str | None:
+    """
+    Return the key of the result of a mode in the `result_cache`.
+
+    The key is the SHA-256 of the `ANALYSIS_VERSION`, the `audio_digest` of the file, the mode,
+    the `MODE_PARAMETERS` of the file state and the `MODE_FILE_FIELDS` of the file.
+
+    Parameters
+    ----------
+    - mode: The mode.
+    - file: The fetched file.
+    - file_state: The state of the file.
+
+    Returns
+    -------
+    - str: The hexadecimal key, or None if the result can not be cached.
+
+    """
+    if mode not in MODE_PARAMETERS:
+        return None
+    digest = audio_digest(file)
+    if digest is None:
+        return None
+    parameters = {name: file_state[name] for name in MODE_PARAMETERS[mode] if name in file_state}
+    fields = {name: file.get(name) for name in MODE_FILE_FIELDS.get(mode, ())}
+    try:
+        key = orjson.dumps(
+            [ANALYSIS_VERSION, digest, mode, parameters, fields],
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    except TypeError:
+        return None
+    return hashlib.sha256(key).hexdigest()
+
+
+async def cached_analysis(
+    pool: ModePool | None,
+    mode: str,
+    analysis: Callable[[FileStateType, FileStateType], Any],
+    file: FileStateType,
+    file_state: FileStateType,
+) -> Any:
+    """
+    Return the result of a mode from the `result_cache`, or run its analysis and store it.
+
+    Requests for a result that is being computed already await that analysis instead of
+    running it again, see `running_analyses`.
+
+    Parameters
+    ----------
+    - pool: Runs the analysis in a worker process, or None to run it in the event loop.
+    - mode: The mode, see `MODE_PARAMETERS`.
+    - analysis: The analysis of the mode, a function of the fetched file and the file state.
+    - file: The fetched file.
+    - file_state: The state of the file.
+
+    Returns
+    -------
+    - The result of the analysis.
+
+    Raises
+    ------
+    - HTTPException: If the analysis raised one, these are not cached.
+
+    """
+    # hashing the wav of a file that was not seen before takes a while
+    key = await asyncio.to_thread(result_cache_key, mode, file, file_state)
+    if key is None:
+        return await run_analysis(pool, mode, analysis, file, file_state)
+    data = result_cache.get(key)
+    if data is not None:
+        try:
+            return decode_result(data)
+        except ValueError:  # e.g. a file on disk that was cut short, the result is computed again
+            result_cache.delete(key)
+
+    async def analyse() -> Any:
+        result = await run_analysis(pool, mode, analysis, file, file_state)
+        with contextlib.suppress(TypeError):  # results that can not be encoded are not cached
+            result_cache.put(key, encode_result(result))
+        return result
+
+    return await running_analyses.run(key, analyse)
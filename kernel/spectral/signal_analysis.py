@@ -2,29 +2,630 @@
 
 from __future__ import annotations
 
-import io
 import math
+import os
+import threading
 from array import array
-from typing import Any
+from collections.abc import Callable, Hashable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import cached_property
+from typing import Any, TypeVar
 
 import numpy as np
 import parselmouth
-from pydub import AudioSegment
 
-from .types import AudioType, SoundType
+from .caching import LRUCache
+from .fast_formants import lpc_formants
+from .fast_pitch import yin_pitch
+from .types import AudioType, PCMAudio, SoundType
+
+# fmt chunk format tags
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# the sample types that can be decoded, by format tag and bits per sample
+WAVE_SAMPLE_TYPES = {
+    (WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+# decoded audio by (file id, modified time), so edited files are never served from the cache
+audio_cache: LRUCache[Hashable, AudioType] = LRUCache(
+    max_size=int(os.getenv("AUDIO_CACHE_SIZE", str(512 * 2**20))),
+    size_of=lambda audio: audio.nbytes,
+)
+
+
+T = TypeVar("T")
+
+# marks an analysis that is not computed yet
+_MISSING = object()
+
+# the amount of frames in a tile of a spectrogram pyramid, at every zoom level
+SPECTROGRAM_TILE_FRAMES = 256
+
+
+class SpectrogramPyramid:
+    """
+    A spectrogram at multiple time resolutions, cut into tiles of a fixed amount of frames.
+
+    Zoom level 0 fits the whole spectrogram into a single tile, every next level doubles the
+    time resolution, up to `max_zoom` at the resolution of the spectrogram itself. A frame of a
+    coarser level is the mean power of the frames of the spectrogram it covers, of which there
+    are fewer for the last frame when the amount of frames is not a power of two.
+
+    Attributes
+    ----------
+        max_zoom (int): The zoom level at the full resolution of the spectrogram.
+        time_step (float): Time between the center of the frames at full resolution.
+        window_length (float): Duration of the analysis window.
+        frequency_step (float): Frequency resolution.
+        start_time (float): Time of center of the first frame at full resolution.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        values: np.ndarray,
+        time_step: float,
+        window_length: float,
+        frequency_step: float,
+        start_time: float,
+    ) -> None:
+        """
+        Build all the levels of the pyramid from the full resolution spectrogram.
+
+        Args:
+        ----
+            values (np.ndarray): 2D array with the power of every frequency bin (rows) in every
+                                 frame (columns).
+            time_step (float): Time between the center of the frames.
+            window_length (float): Duration of the analysis window.
+            frequency_step (float): Frequency resolution.
+            start_time (float): Time of center of the first frame.
+
+        """
+        level = np.asarray(values, dtype=np.float32)
+        levels = [level]
+        # the amount of frames of the spectrogram covered by a frame of the level, and by its
+        # last frame, which can be less
+        frames = last_frames = 1
+        while level.shape[1] > SPECTROGRAM_TILE_FRAMES:
+            even = level.shape[1] - level.shape[1] % 2
+            coarser = (level[:, 0:even:2] + level[:, 1:even:2]) / 2
+            if even < level.shape[1]:
+                # an odd last frame is the only frame left to average
+                coarser = np.concatenate([coarser, level[:, even:]], axis=1)
+            else:
+                coarser[:, -1] = (level[:, -2] * frames + level[:, -1] * last_frames) / (
+                    frames + last_frames
+                )
+                last_frames += frames
+            frames *= 2
+            level = coarser
+            levels.append(level)
+        self._levels = levels[::-1]
+        self.max_zoom = len(levels) - 1
+        self.time_step = time_step
+        self.window_length = window_length
+        self.frequency_step = frequency_step
+        self.start_time = start_time
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the values of all the levels."""
+        return sum(level.nbytes for level in self._levels)
+
+    def tile_count(self, zoom: int) -> int:
+        """Return the amount of tiles at a zoom level."""
+        return -(-self._levels[zoom].shape[1] // SPECTROGRAM_TILE_FRAMES)
+
+    def tile(self, zoom: int, index: int) -> dict[str, Any]:
+        """
+        Return a tile of the pyramid.
+
+        Parameters
+        ----------
+        - zoom: The zoom level, between 0 and `max_zoom`.
+        - index: The index of the tile within the zoom level, between 0 and `tile_count(zoom)`.
+
+        Returns
+        -------
+        - dict: The zoom level, tile index, amount of tiles and zoom levels, the time step and
+          start time of the frames in the tile, and their power as a 2D "data" array.
+
+        Raises
+        ------
+        - IndexError: If there is no such tile.
+
+        Example:
+        ```python
+        tile = pyramid.tile(0, 0)  # the whole spectrogram
+        ```
+
+        """
+        if not 0 <= zoom <= self.max_zoom or not 0 <= index < self.tile_count(zoom):
+            msg = f"No tile {index} at zoom level {zoom}"
+            raise IndexError(msg)
+        frames_per_frame = 2 ** (self.max_zoom - zoom)
+        first_frame = index * SPECTROGRAM_TILE_FRAMES
+        return {
+            "zoom": zoom,
+            "index": index,
+            "maxZoom": self.max_zoom,
+            "tiles": self.tile_count(zoom),
+            "timeStep": self.time_step * frames_per_frame,
+            "windowLength": self.window_length,
+            "frequencyStep": self.frequency_step,
+            # the center of the frames covered by a coarser frame
+            "startTime": self.start_time
+            + (first_frame * frames_per_frame + (frames_per_frame - 1) / 2) * self.time_step,
+            # a copy of the columns, as a slice of them is not contiguous
+            "data": np.ascontiguousarray(
+                self._levels[zoom][:, first_frame : first_frame + SPECTROGRAM_TILE_FRAMES]
+            ),
+        }
+
+
+# the amount of samples summarized by a peak at the finest level of a peak pyramid
+PEAK_BASE_SAMPLES = 64
+
+
+def _combine_peaks(values: np.ndarray, reduce: Callable[..., np.ndarray]) -> np.ndarray:
+    """Reduce every pair of consecutive values to one, keeping an odd last value as is."""
+    even = len(values) - len(values) % 2
+    combined = reduce(values[0:even:2], values[1:even:2])
+    return np.concatenate([combined, values[even:]])
+
+
+class PeakPyramid:
+    """
+    Min/max/RMS envelopes of a signal at multiple decimation levels, for drawing waveforms.
+
+    Every peak at the finest level summarizes `PEAK_BASE_SAMPLES` samples, every next level
+    summarizes twice as many samples per peak, until the whole signal is a single peak.
+
+    Attributes
+    ----------
+        frame_rate (int): The sample frequency of the signal.
+
+    """
+
+    def __init__(self, samples: np.ndarray, frame_rate: int) -> None:
+        """
+        Compute all the levels of the pyramid in a single pass over the samples.
+
+        Args:
+        ----
+            samples (np.ndarray): 1D array with the samples of the signal.
+            frame_rate (int): The sample frequency of the signal.
+
+        """
+        samples = np.asarray(samples)
+        full = len(samples) - len(samples) % PEAK_BASE_SAMPLES
+        buckets = samples[:full].reshape(-1, PEAK_BASE_SAMPLES)
+        tail = samples[full:]
+        minima = buckets.min(axis=1)
+        maxima = buckets.max(axis=1)
+        squares = np.square(buckets, dtype=np.float64).sum(axis=1)
+        if len(tail) > 0:
+            minima = np.append(minima, tail.min())
+            maxima = np.append(maxima, tail.max())
+            squares = np.append(squares, np.square(tail, dtype=np.float64).sum())
+
+        self._levels = [(minima, maxima, squares)]
+        while len(minima) > 1:
+            minima = _combine_peaks(minima, np.minimum)
+            maxima = _combine_peaks(maxima, np.maximum)
+            squares = _combine_peaks(squares, np.add)
+            self._levels.append((minima, maxima, squares))
+        self._length = len(samples)
+        self.frame_rate = frame_rate
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the envelopes of all the levels."""
+        return sum(array.nbytes for level in self._levels for array in level)
+
+    @property
+    def samples_per_peak(self) -> list[int]:
+        """The amount of samples summarized by a peak, for every level from fine to coarse."""
+        return [PEAK_BASE_SAMPLES * 2**level for level in range(len(self._levels))]
+
+    def peaks(self, max_count: int) -> dict[str, Any]:
+        """
+        Return the envelopes of the finest level with at most the given amount of peaks.
+
+        Parameters
+        ----------
+        - max_count: The maximum amount of peaks, e.g. the width in pixels of the waveform.
+
+        Returns
+        -------
+        - dict: The sample frequency, the amount of samples per peak at every level and at the
+          returned level, and the "min", "max" and "rms" of the samples of every peak.
+
+        Example:
+        ```python
+        peaks = pyramid.peaks(1920)
+        ```
+
+        """
+        level = next(
+            (level for level, (minima, *_) in enumerate(self._levels) if len(minima) <= max_count),
+            len(self._levels) - 1,
+        )
+        minima, maxima, squares = self._levels[level]
+        samples_per_peak = self.samples_per_peak[level]
+        # only the last peak can cover less samples
+        counts = np.minimum(
+            samples_per_peak, self._length - np.arange(len(squares)) * samples_per_peak
+        )
+        return {
+            "frameRate": self.frame_rate,
+            "levels": self.samples_per_peak,
+            "samplesPerPeak": samples_per_peak,
+            "min": minima.tolist(),
+            "max": maxima.tolist(),
+            "rms": np.sqrt(squares / counts).tolist(),
+        }
+
+
+class AnalysisContext:
+    """
+    The Praat analyses of a single sound, each computed once per set of parameters.
+
+    Every mode that needs e.g. the pitch of a file asks its context for it, so the pitch is
+    only computed by the first one. Different analyses are computed at the same time, only
+    requests for the same analysis wait for each other. Contexts of files are kept in the
+    `analysis_cache`, so the analyses are also shared between requests, see
+    `get_analysis_context`.
+
+    Attributes
+    ----------
+        sound (parselmouth.Sound): Sound object of the audio, built on first access.
+
+    """
+
+    def __init__(
+        self,
+        source: AudioType | SoundType,
+        on_change: Callable[[AnalysisContext], None] | None = None,
+    ) -> None:
+        """
+        Initialize a context without any analyses.
+
+        Args:
+        ----
+            source (PCMAudio | parselmouth.Sound): The audio or the sound to analyse.
+            on_change (Callable | None): Called with the context after every new analysis, e.g.
+                                         to measure its size again.
+
+        """
+        self._source = source
+        self._on_change = on_change
+        self._analyses: dict[tuple, Any] = {}
+        # the locks of the analyses that are being computed, guarded by `_lock`
+        self._computing: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @cached_property
+    def sound(self) -> SoundType:
+        """Sound object of the audio, built once and reused afterwards."""
+        if isinstance(self._source, parselmouth.Sound):
+            return self._source
+        return self._source.sound
+
+    @property
+    def nbytes(self) -> int:
+        """An estimate of the memory used by the audio and the analyses, see `analysis_nbytes`."""
+        # the size of decoded audio includes the sound object built from it
+        size = analysis_nbytes(self._source)
+        return size + sum(analysis_nbytes(value) for value in list(self._analyses.values()))
+
+    def _memoize(self, key: tuple, compute: Callable[[], T]) -> T:
+        value = self._analyses.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._computing.setdefault(key, threading.Lock())
+        # analyses are built on top of other analyses, which have locks of their own
+        with key_lock:
+            value = self._analyses.get(key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                self._analyses[key] = value
+                with self._lock:
+                    self._computing.pop(key, None)
+                if self._on_change is not None:
+                    self._on_change(self)
+        return value
+
+    def resampled(self, sampling_frequency: float) -> SoundType:
+        """Return the sound resampled to the given sampling frequency."""
+        return self._memoize(
+            ("resampled", sampling_frequency),
+            lambda: self.sound.resample(sampling_frequency),
+        )
+
+    def pitch(self, time_step: float | None = None) -> parselmouth.Pitch:
+        """Return the pitch analysis of the sound, see `parselmouth.Sound.to_pitch`."""
+        return self._memoize(
+            ("pitch", time_step),
+            lambda: self.sound.to_pitch(time_step=time_step),
+        )
+
+    def formant(
+        self,
+        time_step: float | None = None,
+        window_length: float = 0.025,
+    ) -> parselmouth.Formant:
+        """Return the formant analysis of the sound, see `parselmouth.Sound.to_formant_burg`."""
+        return self._memoize(
+            ("formant", time_step, window_length),
+            lambda: self.sound.to_formant_burg(time_step=time_step, window_length=window_length),
+        )
+
+    def pitch_track(
+        self,
+        time_step: float | None = None,
+        engine: str = "praat",
+    ) -> tuple[np.ndarray, float, float]:
+        """
+        Return the pitch of every frame, the time step and the time of the first frame.
+
+        Long sounds are analysed in chunks in parallel, see `chunk_executor`, which gives the
+        frames of `pitch` without building the Pitch object. With the "yin" engine, the pitch
+        is estimated with `yin_frames` on the same frames instead.
+        """
+
+        def compute() -> tuple[np.ndarray, float, float]:
+            if engine == "yin":
+                step = time_step or 0.75 / PITCH_FLOOR
+                n_frames, first_frame_time = frame_grid(
+                    self.sound, PITCH_PERIODS_PER_WINDOW / PITCH_FLOOR, step
+                )
+                return (
+                    yin_frames(self.sound, range(n_frames), first_frame_time, step),
+                    step,
+                    first_frame_time,
+                )
+            executor = chunk_executor(self.sound)
+            if executor is None:
+                pitch = self.pitch(time_step=time_step)
+                return (
+                    pitch.selected_array["frequency"],
+                    pitch.time_step,
+                    pitch.get_time_from_frame_number(1),
+                )
+            step = time_step or 0.75 / PITCH_FLOOR
+            values, first_frame_time = analyse_time_window(
+                self.sound,
+                None,
+                None,
+                window_duration=PITCH_PERIODS_PER_WINDOW / PITCH_FLOOR,
+                time_step=step,
+                analysis="pitch",
+                parameters={"peak": global_peak(self.sound)},
+                executor=executor,
+            )
+            return values, step, first_frame_time
+
+        return self._memoize(("pitch_track", time_step, engine), compute)
+
+    def formant_tracks(
+        self,
+        time_step: float | None = None,
+        window_length: float = 0.025,
+        engine: str = "praat",
+    ) -> tuple[np.ndarray, float, float]:
+        """
+        Return the `MAX_FORMANTS` formant tracks, the time step and the time of the first frame.
+
+        Long sounds are analysed in chunks in parallel, like `pitch_track`. With the "lpc"
+        engine, the formants are estimated with `lpc_frames` on the same frames instead.
+        """
+
+        def compute() -> tuple[np.ndarray, float, float]:
+            if engine == "lpc":
+                step = time_step or window_length / 4
+                n_frames, first_frame_time = frame_grid(
+                    self.sound, 2 * window_length, step, 2 * FORMANT_CEILING
+                )
+                return (
+                    lpc_frames(
+                        self.sound,
+                        range(n_frames),
+                        first_frame_time,
+                        step,
+                        window_length,
+                        MAX_FORMANTS,
+                    ),
+                    step,
+                    first_frame_time,
+                )
+            executor = chunk_executor(self.sound)
+            if executor is None:
+                formants = self.formant(time_step=time_step, window_length=window_length)
+                return (
+                    formant_tracks(formants, MAX_FORMANTS),
+                    formants.time_step,
+                    formants.get_time_from_frame_number(1),
+                )
+            step = time_step or window_length / 4
+            # resampled once like in `sound_formant_tracks`, so all chunks use the same samples
+            tracks, first_frame_time = analyse_time_window(
+                self.resampled(2 * FORMANT_CEILING),
+                None,
+                None,
+                window_duration=2 * window_length,
+                time_step=step,
+                analysis="formant",
+                parameters={"window_length": window_length, "n_formants": MAX_FORMANTS},
+                executor=executor,
+            )
+            return tracks.reshape(-1, MAX_FORMANTS), step, first_frame_time
+
+        return self._memoize(("formant_tracks", time_step, window_length, engine), compute)
+
+    def spectrogram(
+        self,
+        time_step: float = 0.002,
+        window_length: float = 0.005,
+        frequency_step: float = 20.0,
+    ) -> parselmouth.Spectrogram:
+        """Return the spectrogram of the sound, see `parselmouth.Sound.to_spectrogram`."""
+        return self._memoize(
+            ("spectrogram", time_step, window_length, frequency_step),
+            lambda: self._compute_spectrogram(time_step, window_length, frequency_step),
+        )
+
+    def _compute_spectrogram(
+        self,
+        time_step: float,
+        window_length: float,
+        frequency_step: float,
+    ) -> parselmouth.Spectrogram:
+        return self.sound.to_spectrogram(
+            time_step=time_step,
+            window_length=window_length,
+            frequency_step=frequency_step,
+        )
+
+    def peak_pyramid(self) -> PeakPyramid:
+        """Return the min/max/RMS peak pyramid of the samples, see `PeakPyramid`."""
+
+        def compute() -> PeakPyramid:
+            if isinstance(self._source, parselmouth.Sound):
+                return PeakPyramid(self._source.as_array()[0], int(self._source.sampling_frequency))
+            return PeakPyramid(self._source.samples, self._source.frame_rate)
+
+        return self._memoize(("peak_pyramid",), compute)
+
+    def spectrogram_pyramid(
+        self,
+        time_step: float = 0.002,
+        window_length: float = 0.005,
+        frequency_step: float = 20.0,
+    ) -> SpectrogramPyramid:
+        """
+        Return the tile pyramid of the spectrogram of the sound, see `SpectrogramPyramid`.
+
+        The pyramid holds the frames of the spectrogram at single precision, so the spectrogram
+        itself is not kept (it is computed again if it is asked for).
+        """
+
+        def compute() -> SpectrogramPyramid:
+            spectrogram = self._analyses.pop(
+                ("spectrogram", time_step, window_length, frequency_step), None
+            ) or self._compute_spectrogram(time_step, window_length, frequency_step)
+            return SpectrogramPyramid(
+                spectrogram.as_array(),
+                time_step=spectrogram.time_step,
+                window_length=window_length,
+                frequency_step=spectrogram.dy,
+                start_time=spectrogram.get_time_from_frame_number(1),
+            )
+
+        return self._memoize(
+            ("spectrogram_pyramid", time_step, window_length, frequency_step),
+            compute,
+        )
+
+
+def analysis_nbytes(value: Any) -> int:
+    """
+    Estimate the memory used by an analysis, e.g. an array, a pyramid or a Praat object.
+
+    Parameters
+    ----------
+    - value: The analysis, or a tuple like the tracks of `AnalysisContext.pitch_track`.
+
+    Returns
+    -------
+    - int: The size of the values of the analysis in bytes, 0 for e.g. numbers.
+
+    Example:
+    ```python
+    size = analysis_nbytes(context.pitch())
+    ```
+
+    """
+    if isinstance(value, tuple):
+        return sum(analysis_nbytes(item) for item in value)
+    if isinstance(value, np.ndarray | PCMAudio | SpectrogramPyramid | PeakPyramid):
+        return value.nbytes
+    if isinstance(value, parselmouth.Matrix):  # e.g. a Sound or a Spectrogram
+        return value.nx * value.ny * 8
+    if isinstance(value, parselmouth.Pitch):  # a frequency and strength per candidate
+        return value.nx * value.max_n_candidates * 16
+    if isinstance(value, parselmouth.Sampled):  # e.g. a Formant, a few values per frame
+        return value.nx * 128
+    return 0
+
+
+# analysis contexts by (file id, modified time), with a budget (in bytes) on the estimated
+# memory of their audio and analyses, which are measured again after every new analysis
+analysis_cache: LRUCache[Hashable, AnalysisContext] = LRUCache(
+    max_size=int(os.getenv("ANALYSIS_CACHE_SIZE", str(2**30))),
+    size_of=lambda context: context.nbytes,
+)
+
+
+def audio_cache_key(file: dict[str, Any]) -> Hashable | None:
+    """Return the key of a file in the `audio_cache`, or None if it can not be cached."""
+    if file.get("id") is None or file.get("modifiedTime") is None:
+        return None
+    return (file["id"], file["modifiedTime"])
+
+
+def wav_chunks(wav: bytes) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Iterate over the chunks of a RIFF/WAVE file.
+
+    Parameters
+    ----------
+    - wav: The bytes of the wav file.
+
+    Returns
+    -------
+    - An iterator of (chunk id, offset of the chunk header, chunk size) tuples. Nothing is
+      yielded if the bytes are not a RIFF/WAVE file.
+
+    Example:
+    ```python
+    chunk_ids = [chunk_id for chunk_id, _, _ in wav_chunks(wav)]
+    ```
+
+    """
+    if wav[:4] != b"RIFF" or wav[8:12] != b"WAVE":
+        return
+    offset = 12
+    while offset + 8 <= len(wav):
+        chunk_id = wav[offset : offset + 4]
+        chunk_size = int.from_bytes(wav[offset + 4 : offset + 8], "little")
+        yield chunk_id, offset, chunk_size
+        offset += 8 + chunk_size + (chunk_size & 1)  # chunks are padded to an even size
 
 
 def get_audio(file: dict[str, Any]) -> AudioType:
     """
     Extract audio data and sampling rate from the given file.
 
+    If the file was already decoded, in this request or in an earlier one through the
+    `audio_cache`, it is not decoded again. Otherwise, the decoded audio is stored in the
+    `audio_cache` when the file has an "id" and "modifiedTime".
+
     Parameters
     ----------
-    - file: A dictionary containing the file data, including audio bytes.
+    - file: A dictionary containing the file data, including audio bytes or decoded "audio".
 
     Returns
     -------
-    - A list, that contains audio data
+    - The decoded audio, see `load_wav`.
 
     Example:
     ```python
@@ -32,10 +633,120 @@ def get_audio(file: dict[str, Any]) -> AudioType:
     ```
 
     """
-    return AudioSegment.from_file(io.BytesIO(file["data"]))
+    if "audio" in file:
+        return file["audio"]
+    key = audio_cache_key(file)
+    audio = audio_cache.get(key) if key is not None else None
+    if audio is None:
+        audio = load_wav(file["data"])
+        if key is not None:
+            audio_cache.put(key, audio)
+    file["audio"] = audio
+    return audio
 
 
-def simple_signal_info(audio: AudioType) -> dict[str, Any]:
+def get_analysis_context(file: dict[str, Any]) -> AnalysisContext:
+    """
+    Return the analysis context of the given file.
+
+    The context is shared by every analysis of the file within a request, and between requests
+    through the `analysis_cache` when the file has an "id" and "modifiedTime".
+
+    Parameters
+    ----------
+    - file: A dictionary containing the file data, including audio bytes or decoded "audio".
+
+    Returns
+    -------
+    - The analysis context of the file.
+
+    Example:
+    ```python
+    pitch = get_analysis_context(file).pitch()
+    ```
+
+    """
+    if "analysis" in file:
+        return file["analysis"]
+    key = audio_cache_key(file)
+    context = analysis_cache.get(key) if key is not None else None
+    if context is None:
+        if key is None:
+            context = AnalysisContext(get_audio(file))
+        else:
+            # stored again with its new size (and as recently used) after every new analysis
+            context = AnalysisContext(
+                get_audio(file), on_change=lambda context: analysis_cache.put(key, context)
+            )
+            analysis_cache.put(key, context)
+    file["analysis"] = context
+    return context
+
+
+def as_analysis_context(sound: SoundType | AnalysisContext) -> AnalysisContext:
+    """Return the given analysis context, or a new context for the given sound."""
+    return sound if isinstance(sound, AnalysisContext) else AnalysisContext(sound)
+
+
+def load_wav(wav: bytes) -> AudioType:
+    """
+    Decode a wav file straight into a NumPy array, without copying the samples.
+
+    Parameters
+    ----------
+    - wav: The bytes of a wav file with 16 or 32-bit integer or 32 or 64-bit float samples.
+           Data chunk sizes that run past the end of the file (e.g. from a stream) are clamped.
+
+    Returns
+    -------
+    - The decoded audio. For mono files, the samples are a read-only view on `wav`; files
+      with multiple channels are mixed down to mono.
+
+    Raises
+    ------
+    - ValueError: If the bytes are not a wav file with a supported sample type.
+
+    Example:
+    ```python
+    audio = load_wav(wav)
+    ```
+
+    """
+    sample_type = None
+    channels = 1
+    frame_rate = 0
+    for chunk_id, offset, chunk_size in wav_chunks(wav):
+        if chunk_id == b"fmt ":
+            fmt = wav[offset + 8 : offset + 8 + chunk_size]
+            format_tag = int.from_bytes(fmt[0:2], "little")
+            channels = int.from_bytes(fmt[2:4], "little")
+            frame_rate = int.from_bytes(fmt[4:8], "little")
+            bits_per_sample = int.from_bytes(fmt[14:16], "little")
+            if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                format_tag = int.from_bytes(fmt[24:26], "little")
+            sample_type = WAVE_SAMPLE_TYPES.get((format_tag, bits_per_sample))
+        elif chunk_id == b"data":
+            if sample_type is None or channels < 1 or frame_rate < 1:
+                break
+            frame_size = sample_type.itemsize * channels
+            data_size = min(chunk_size, len(wav) - offset - 8)
+            samples = np.frombuffer(
+                wav,
+                dtype=sample_type,
+                count=data_size // frame_size * channels,
+                offset=offset + 8,
+            )
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            return PCMAudio(samples=samples, frame_rate=frame_rate)
+    raise ValueError("Not a wav file with a supported sample type")
+
+
+def simple_signal_info(
+    audio: AudioType,
+    analysis: AnalysisContext | None = None,
+    pitch_engine: str = "praat",
+) -> dict[str, Any]:
     """
     Extract and return basic information from a given audio signal.
 
@@ -43,7 +754,9 @@ def simple_signal_info(audio: AudioType) -> dict[str, Any]:
 
     Parameters
     ----------
-    - signal (list of int): The audio signal data.
+    - audio (PCMAudio): The audio signal.
+    - analysis (AnalysisContext | None): The analysis context of the audio, to reuse its pitch.
+    - pitch_engine (str): The engine to calculate the pitch with, one of `PITCH_ENGINES`.
 
     Returns
     -------
@@ -57,14 +770,12 @@ def simple_signal_info(audio: AudioType) -> dict[str, Any]:
     """
     duration: float = calculate_signal_duration(audio)
     avg_pitch: float = np.mean(
-        calculate_sound_pitch(
-            signal_to_sound(signal=audio.get_array_of_samples(), fs=audio.frame_rate),
-        )["data"],  # type: ignore
+        calculate_sound_pitch(analysis or audio.sound, engine=pitch_engine)["data"],  # type: ignore
     ).item()
     return {"duration": duration, "averagePitch": avg_pitch}
 
 
-def signal_to_sound(signal: array, fs: float | int) -> SoundType:
+def signal_to_sound(signal: np.ndarray | array, fs: float | int) -> SoundType:
     """
     Convert a signal to a parselmouth sound object.
 
@@ -84,7 +795,7 @@ def signal_to_sound(signal: array, fs: float | int) -> SoundType:
 
     """
     return parselmouth.Sound(
-        values=np.array(signal).astype("float64"),
+        values=np.asarray(signal, dtype=np.float64),
         sampling_frequency=fs,
     )
 
@@ -111,17 +822,439 @@ def calculate_signal_duration(audio: AudioType) -> float:
     return audio.duration_seconds
 
 
-def calculate_sound_pitch(
+# the defaults of the pitch and formant analyses of Praat, needed to know their frame grids
+PITCH_FLOOR = 75.0
+PITCH_PERIODS_PER_WINDOW = 3.0
+FORMANT_CEILING = 5500.0
+
+# the pitch engines: the pitch analysis of Praat, or the faster but less accurate `yin_pitch`
+PITCH_ENGINES = ("praat", "yin")
+
+# the formant engines: the Burg analysis of Praat, or the faster but less accurate `lpc_formants`
+FORMANT_ENGINES = ("praat", "lpc")
+
+# the amount of formants the Burg analysis finds with its default of 5.5 formants
+MAX_FORMANTS = 5
+
+# the extra context (in seconds) analysed around a time window, e.g. for the pitch path finder
+WINDOW_PADDING = 0.1
+
+# sounds of at least two chunks of this duration (in seconds) are analysed in parallel
+ANALYSIS_CHUNK_DURATION = float(os.getenv("ANALYSIS_CHUNK_DURATION", "30"))
+
+# the amount of worker processes for chunked analyses, 1 or less to never run them in parallel
+ANALYSIS_PROCESSES = int(os.getenv("ANALYSIS_PROCESSES", str(os.cpu_count() or 1)))
+
+
+# the process pool for chunked analyses, see `start_analysis_pool`
+_analysis_pool: Executor | None = None
+
+
+def start_analysis_pool(processes: int | None = None) -> None:
+    """
+    Start the process pool for chunked analyses, if enabled, until `shutdown_analysis_pool`.
+
+    The worker processes are forked from this process when they are first needed. A pool that
+    was started before is replaced without stopping it, as it can be the pool of the parent of
+    a forked process, see `mode_pool.init_worker`.
+
+    Parameters
+    ----------
+    - processes: The amount of worker processes, `ANALYSIS_PROCESSES` if None. With 1 or less,
+                 long sounds are analysed at once instead.
+
+    """
+    global _analysis_pool  # noqa: PLW0603
+    processes = ANALYSIS_PROCESSES if processes is None else processes
+    _analysis_pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+
+
+def shutdown_analysis_pool() -> None:
+    """Stop the worker processes of the pool for chunked analyses, if it was started."""
+    global _analysis_pool  # noqa: PLW0603
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown(cancel_futures=True)
+        _analysis_pool = None
+
+
+def analysis_pool() -> Executor | None:
+    """Return the process pool for chunked analyses, or None if it is not started."""
+    return _analysis_pool
+
+
+def chunk_executor(sound: SoundType) -> Executor | None:
+    """Return the executor to analyse a sound in chunks with, or None if it is too short."""
+    if sound.duration < 2 * ANALYSIS_CHUNK_DURATION:
+        return None
+    return analysis_pool()
+
+
+def frame_grid(
+    sound: SoundType,
+    window_duration: float,
+    time_step: float,
+    sampling_frequency: float | None = None,
+) -> tuple[int, float]:
+    """
+    Calculate the frames a short-term analysis of Praat (pitch, formants, ...) has on a sound.
+
+    The frames are centered on the samples, as many as fit with the (physical) analysis window,
+    like `Sampled_shortTermAnalysis` of Praat.
+
+    Parameters
+    ----------
+    - sound: The analysed sound.
+    - window_duration: The physical duration of the analysis window.
+    - time_step: Time between the center of the frames.
+    - sampling_frequency: The frequency the sound is resampled to for the analysis, if any.
+
+    Returns
+    -------
+    - tuple: The amount of frames and the time of the center of the first frame.
+
+    """
+    duration = sound.nx * sound.dx
+    if sampling_frequency is not None:
+        # resampling keeps the center of the sound, but rounds its duration to whole samples
+        duration = round(duration * sampling_frequency) / sampling_frequency
+    if window_duration > duration:
+        return 0, sound.xmin
+    n_frames = math.floor((duration - window_duration) / time_step) + 1
+    mid_time = sound.x1 - 0.5 * sound.dx + 0.5 * sound.nx * sound.dx
+    return n_frames, mid_time - 0.5 * n_frames * time_step + 0.5 * time_step
+
+
+def frames_in_window(
+    n_frames: int,
+    first_frame_time: float,
+    time_step: float,
+    start_time: float | None,
+    end_time: float | None,
+) -> range:
+    """
+    Return the frames of a frame grid with their center in a time window.
+
+    Parameters
+    ----------
+    - n_frames, first_frame_time, time_step: The frame grid, see `frame_grid`.
+    - start_time: The start of the time window, or None for the start of the sound.
+    - end_time: The end of the time window, or None for the end of the sound.
+
+    Returns
+    -------
+    - range: The indices of the frames in the frame grid.
+
+    """
+    start_frame = (
+        0 if start_time is None else math.ceil((start_time - first_frame_time) / time_step)
+    )
+    end_frame = (
+        n_frames if end_time is None else math.floor((end_time - first_frame_time) / time_step) + 1
+    )
+    return range(max(start_frame, 0), min(end_frame, n_frames))
+
+
+def extract_frames(
+    sound: SoundType,
+    frames: range,
+    window_duration: float,
+    time_step: float,
+    first_frame_time: float,
+) -> SoundType:
+    """
+    Extract the part of a sound that an analysis needs for some of the frames of its frame grid.
+
+    The part is centered on the frames, and just long enough to fit them with the analysis
+    window, so the analysis of the part has exactly these frames at (up to a fraction of a
+    sample) the same times as in the analysis of the whole sound.
+
+    Parameters
+    ----------
+    - sound: The analysed sound.
+    - frames: The indices of the frames in the frame grid of the whole sound.
+    - window_duration: The physical duration of the analysis window.
+    - time_step: Time between the center of the frames.
+    - first_frame_time: Time of the center of the first frame of the whole sound.
+
+    Returns
+    -------
+    - parselmouth.Sound: The part of the sound, with the times of the whole sound.
+
+    """
+    center_time = first_frame_time + (frames.start + frames.stop - 1) / 2 * time_step
+    # twice the center, in samples from the start of the first sample
+    double_center = round(2 * (center_time - sound.x1 + 0.5 * sound.dx) / sound.dx)
+    # half a frame more than the minimum, so rounding can not add or remove a frame
+    n_samples = math.ceil(((len(frames) - 0.5) * time_step + window_duration) / sound.dx)
+    n_samples += (double_center + n_samples) % 2
+    start = (double_center - n_samples) // 2
+    end = (double_center + n_samples) // 2
+    # the windows of the frames are within the sound, so the part only crosses the ends of the
+    # sound by less than a frame, which is filled with silence to keep the part centered
+    samples = np.pad(
+        sound.as_array()[0, max(start, 0) : min(end, sound.nx)],
+        (max(-start, 0), max(end - sound.nx, 0)),
+    )
+    return parselmouth.Sound(
+        samples,
+        sampling_frequency=1 / sound.dx,
+        start_time=sound.x1 - 0.5 * sound.dx + start * sound.dx,
+    )
+
+
+def global_peak(sound: SoundType) -> float:
+    """Return the largest deviation of a sound from its mean, as used by the pitch analysis."""
+    samples = sound.as_array()[0]
+    return float(np.abs(samples - samples.mean()).max()) if samples.size else 0.0
+
+
+def pitch_frames(
+    part: SoundType,
+    time_step: float,
+    peak: float | None = None,
+) -> tuple[np.ndarray, float]:
+    """
+    Return the pitch of every frame of a sound and the time of the center of the first.
+
+    The voicing of a frame depends on its peak relative to the `global_peak` of the sound, so
+    for a part of a sound, the peak of the whole sound is put in a sample at the end of the part
+    that is outside of the windows of all frames.
+    """
+    if peak is not None:
+        window_duration = PITCH_PERIODS_PER_WINDOW / PITCH_FLOOR
+        n_frames, first_frame_time = frame_grid(part, window_duration, time_step)
+        windows_start = first_frame_time - window_duration / 2
+        windows_end = windows_start + (n_frames - 1) * time_step + window_duration
+        samples = part.as_array()[0].copy()
+        sample = 0 if windows_start - part.xmin > part.xmax - windows_end else len(samples) - 1
+        # the deviation from the mean, including the sample itself, is the peak
+        samples[sample] = 0
+        samples[sample] = (samples.sum() + len(samples) * peak) / (len(samples) - 1)
+        part = parselmouth.Sound(samples, sampling_frequency=1 / part.dx, start_time=part.xmin)
+    pitch = part.to_pitch(time_step=time_step)
+    return pitch.selected_array["frequency"], pitch.get_time_from_frame_number(1)
+
+
+def yin_frames(
+    sound: SoundType, frames: range, first_frame_time: float, time_step: float
+) -> np.ndarray:
+    """
+    Estimate the pitch of some frames of the frame grid of the pitch analysis with `yin_pitch`.
+
+    Parameters
+    ----------
+    - sound: The analysed sound.
+    - frames: The indices of the frames in the frame grid of the whole sound.
+    - first_frame_time: Time of the center of the first frame of the whole sound.
+    - time_step: Time between the center of the frames.
+
+    Returns
+    -------
+    - numpy.ndarray: The pitch of every frame, 0 where it is unvoiced.
+
+    """
+    centers = (first_frame_time + np.array(frames) * time_step - sound.x1) / sound.dx
+    return yin_pitch(
+        sound.as_array()[0], 1 / sound.dx, centers, PITCH_FLOOR, peak=global_peak(sound)
+    )
+
+
+def lpc_frames(  # noqa: PLR0913
+    sound: SoundType,
+    frames: range,
+    first_frame_time: float,
+    time_step: float,
+    window_length: float,
+    n_formants: int,
+) -> np.ndarray:
+    """
+    Estimate the formants of some frames of the frame grid of the Burg analysis with LPC.
+
+    Parameters
+    ----------
+    - sound: The analysed sound.
+    - frames: The indices of the frames in the frame grid of the whole (resampled) sound.
+    - first_frame_time: Time of the center of the first frame of the whole sound.
+    - time_step: Time between the center of the frames.
+    - window_length: Effective duration of the analysis window.
+    - n_formants: The amount of formants to estimate.
+
+    Returns
+    -------
+    - numpy.ndarray: The formant tracks, see `lpc_formants`.
+
+    """
+    centers = (first_frame_time + np.array(frames) * time_step - sound.x1) / sound.dx
+    return lpc_formants(
+        sound.as_array()[0],
+        1 / sound.dx,
+        centers,
+        window_length,
+        n_formants,
+        maximum_formant=FORMANT_CEILING,
+    )
+
+
+def formant_frames(
+    part: SoundType,
+    time_step: float,
+    window_length: float,
+    n_formants: int,
+) -> tuple[np.ndarray, float]:
+    """Return the formant tracks of a sound and the time of the center of the first frame."""
+    formants = part.to_formant_burg(
+        time_step=time_step,
+        window_length=window_length,
+        maximum_formant=FORMANT_CEILING,
+    )
+    return formant_tracks(formants, n_formants), formants.get_time_from_frame_number(1)
+
+
+# the analyses that can run on parts of a sound, by name, so they can be sent to other processes
+FRAME_ANALYSES: dict[str, Callable[..., tuple[np.ndarray, float]]] = {
+    "pitch": pitch_frames,
+    "formant": formant_frames,
+}
+
+
+def analyse_part(  # noqa: PLR0913
+    samples: np.ndarray,
+    sampling_frequency: float,
+    start_time: float,
+    analysis: str,
+    parameters: dict[str, Any],
+    frames: range,
+    first_frame_time: float,
+    time_step: float,
+) -> np.ndarray:
+    """
+    Run an analysis on a part of a sound, and return the values of some frames of the whole sound.
+
+    Only takes picklable arguments, so the part can be analysed in another process.
+
+    Parameters
+    ----------
+    - samples, sampling_frequency, start_time: The samples of the part and where they start.
+    - analysis: The name of the analysis in `FRAME_ANALYSES`.
+    - parameters: The parameters of the analysis, other than the time step.
+    - frames: The frames to return, as indices in the frame grid of the whole sound.
+    - first_frame_time: Time of the center of the first frame of the whole sound.
+    - time_step: Time between the center of the frames.
+
+    Returns
+    -------
+    - numpy.ndarray: The values of the frames, frames along the first axis.
+
+    """
+    part = parselmouth.Sound(samples, sampling_frequency=sampling_frequency, start_time=start_time)
+    values, part_first_frame_time = FRAME_ANALYSES[analysis](
+        part, time_step=time_step, **parameters
+    )
+    # the frame of the whole sound that the first frame of the part corresponds to
+    part_start = round((part_first_frame_time - first_frame_time) / time_step)
+    offset = frames.start - part_start
+    return values[offset : offset + len(frames)]
+
+
+def analyse_time_window(  # noqa: PLR0913
     sound: SoundType,
+    start_time: float | None,
+    end_time: float | None,
+    window_duration: float,
+    time_step: float,
+    analysis: str,
+    parameters: dict[str, Any],
+    executor: Executor | None = None,
+    chunk_duration: float | None = None,
+) -> tuple[np.ndarray, float]:
+    """
+    Run a short-term analysis on the frames of a sound with their center in a time window.
+
+    Only the part of the sound that the frames need is analysed, padded with `WINDOW_PADDING`
+    on both sides. The frames are the same as those of an analysis of the whole sound, so the
+    results of neighbouring windows can be stitched together. With an executor, the frames are
+    split into chunks of `chunk_duration`, which are analysed in parallel and stitched.
+
+    The values of the frames are those of the analysis of the whole sound, except for frames
+    whose center falls exactly on a sample: Praat rounds such a center down to a sample, which
+    depends on the rounding error of the times, so their analysis window can be one sample
+    off. Padding does not change this. For the formants (at a time step that is not a whole
+    amount of samples) this changes weak formants of such frames by up to a few hundred Hz.
+
+    Parameters
+    ----------
+    - sound: The analysed sound.
+    - start_time: The start of the time window, or None for the start of the sound.
+    - end_time: The end of the time window, or None for the end of the sound.
+    - window_duration: The physical duration of the analysis window.
+    - time_step: Time between the center of the frames.
+    - analysis: The name of the analysis in `FRAME_ANALYSES`.
+    - parameters: The parameters of the analysis, other than the time step.
+    - executor: Analyses the chunks, e.g. the `analysis_pool`, or None to analyse the window at
+      once in this process.
+    - chunk_duration: The duration of the chunks, `ANALYSIS_CHUNK_DURATION` if None.
+
+    Returns
+    -------
+    - tuple: The values of the frames in the window, and the time of the center of the first.
+
+    Example:
+    ```python
+    pitch, start_time = analyse_time_window(sound, 1.0, 2.0, 0.04, 0.01, "pitch", {})
+    ```
+
+    """
+    n_frames, first_frame_time = frame_grid(sound, window_duration, time_step)
+    frames = frames_in_window(n_frames, first_frame_time, time_step, start_time, end_time)
+    window_start_time = first_frame_time + frames.start * time_step
+    if len(frames) == 0:
+        return np.empty(0), window_start_time
+
+    chunk_duration = chunk_duration or ANALYSIS_CHUNK_DURATION
+    chunk_frames = len(frames) if executor is None else max(round(chunk_duration / time_step), 1)
+    padding = math.ceil(WINDOW_PADDING / time_step)
+    jobs = []
+    for chunk_start in range(frames.start, frames.stop, chunk_frames):
+        chunk = range(chunk_start, min(chunk_start + chunk_frames, frames.stop))
+        padded_chunk = range(max(chunk.start - padding, 0), min(chunk.stop + padding, n_frames))
+        part = extract_frames(sound, padded_chunk, window_duration, time_step, first_frame_time)
+        jobs.append(
+            (
+                part.as_array()[0],
+                1 / part.dx,
+                part.xmin,
+                analysis,
+                parameters,
+                chunk,
+                first_frame_time,
+                time_step,
+            )
+        )
+    if executor is None:
+        results = [analyse_part(*job) for job in jobs]
+    else:
+        results = list(executor.map(analyse_part, *zip(*jobs)))
+    return np.concatenate(results), window_start_time
+
+
+def calculate_sound_pitch(
+    sound: SoundType | AnalysisContext,
     time_step: float | None = None,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    engine: str = "praat",
 ) -> dict[str, Any] | None:  # pragma: no cover
     """
     Calculate the pitches present in a sound object.
 
     Parameters
     ----------
-    - sound (parselmouth.Sound): Sound object representing a speech fragment.
+    - sound (parselmouth.Sound | AnalysisContext): Sound object representing a speech fragment,
+      or its analysis context.
     - time_step (float): Time between pitch samples.
+    - start_time, end_time (float | None): Only calculate the pitch samples in this time window,
+      see `analyse_time_window`.
+    - engine (str): One of `PITCH_ENGINES`, Praat by default.
 
     Returns
     -------
@@ -136,28 +1269,46 @@ def calculate_sound_pitch(
 
     """
     try:
-        pitch = sound.to_pitch(time_step=time_step)
-        return {
-            "time_step": pitch.time_step,
-            "start_time": pitch.get_time_from_frame_number(1),
-            "data": pitch.selected_array["frequency"].tolist(),
-        }
+        context = as_analysis_context(sound)
+        if start_time is None and end_time is None:
+            data, time_step, first_frame_time = context.pitch_track(time_step, engine)
+        elif engine == "yin":
+            time_step = time_step or 0.75 / PITCH_FLOOR
+            n_frames, first_frame_time = frame_grid(
+                context.sound, PITCH_PERIODS_PER_WINDOW / PITCH_FLOOR, time_step
+            )
+            frames = frames_in_window(n_frames, first_frame_time, time_step, start_time, end_time)
+            data = yin_frames(context.sound, frames, first_frame_time, time_step)
+            first_frame_time += frames.start * time_step
+        else:
+            time_step = time_step or 0.75 / PITCH_FLOOR
+            data, first_frame_time = analyse_time_window(
+                context.sound,
+                start_time,
+                end_time,
+                window_duration=PITCH_PERIODS_PER_WINDOW / PITCH_FLOOR,
+                time_step=time_step,
+                analysis="pitch",
+                parameters={"peak": global_peak(context.sound)},
+            )
+        return {"time_step": time_step, "start_time": first_frame_time, "data": data.tolist()}
     except Exception as _:
         return None
 
 
 def calculate_sound_spectrogram(
-    sound: SoundType,
+    sound: SoundType | AnalysisContext,
     time_step: float = 0.002,
     window_length: float = 0.005,
     frequency_step: float = 20.0,
-) -> dict[str, Any] | None:  # pragma: no cover
+) -> dict[str, Any] | None:
     """
     Calculate the spectrogram of a sound fragment.
 
     Parameters
     ----------
-    - sound (parselmouth.Sound): Sound object representing a speech fragment.
+    - sound (parselmouth.Sound | AnalysisContext): Sound object representing a speech fragment,
+      or its analysis context.
     - time_step (float): Time between the center of the frames.
     - window_length (float): Duration of the analysis window.
     - frequency_step (float): Frequency resolution.
@@ -166,9 +1317,10 @@ def calculate_sound_spectrogram(
     -------
     - time_step (float): Time between spectrogram samples.
     - window_length (float): Duration of the analysis window.
-    - frequency_step (float): Frequency resolution.
+    - frequency_step (float): Frequency resolution, at least the resolution of the window.
     - start_time (float): Time of center of the frame.
-    - data (numpy.ndarray): 2D array representing the spectrogram.
+    - data (numpy.ndarray): 2D array with the power spectral density of every frequency bin
+      (rows) in every frame (columns).
 
     Example:
     ```python
@@ -177,7 +1329,7 @@ def calculate_sound_spectrogram(
 
     """
     try:
-        spectrogram = sound.to_spectrogram(
+        spectrogram = as_analysis_context(sound).spectrogram(
             time_step=time_step,
             window_length=window_length,
             frequency_step=frequency_step,
@@ -185,27 +1337,143 @@ def calculate_sound_spectrogram(
         return {
             "time_step": spectrogram.time_step,
             "window_length": window_length,
-            "frequency_step": frequency_step,
+            # Praat widens the frequency step if it is too small for the window length
+            "frequency_step": spectrogram.dy,
             "start_time": spectrogram.get_time_from_frame_number(1),
-            "data": spectrogram.to_numpy().tolist(),
+            "data": spectrogram.as_array(),
         }
     except Exception:
         return None
 
 
-def calculate_sound_f1_f2(
-    sound: SoundType,
+def formant_tracks(formants: parselmouth.Formant, n_formants: int) -> np.ndarray:
+    """
+    Extract the frequencies of the first formants in every frame of a formant analysis at once.
+
+    Parameters
+    ----------
+    - formants (parselmouth.Formant): The formant analysis of a sound.
+    - n_formants (int): The amount of formants to extract.
+
+    Returns
+    -------
+    - numpy.ndarray: Array of shape (n_frames, n_formants), with NaN where a formant is undefined.
+
+    Example:
+    ```python
+    tracks = formant_tracks(sound.to_formant_burg(), 2)
+    ```
+
+    """
+    if n_formants == 0 or len(formants) == 0:
+        return np.empty((len(formants), n_formants))
+    # Praat writes the formant frequencies of all frames to a matrix, with 0 if undefined
+    tracks = np.stack(
+        [
+            parselmouth.praat.call(formants, "To Matrix", formant_number).as_array()[0]
+            for formant_number in range(1, n_formants + 1)
+        ],
+        axis=1,
+    )
+    tracks[tracks == 0] = np.nan
+    return tracks
+
+
+def nan_to_none(values: np.ndarray) -> list:
+    """
+    Convert an array to (nested) lists of floats, with None instead of NaN.
+
+    Parameters
+    ----------
+    - values (numpy.ndarray): The array to convert.
+
+    Returns
+    -------
+    - list: The values of the array, with None where the array is NaN.
+
+    Example:
+    ```python
+    nan_to_none(np.array([[1.0, np.nan]]))  # [[1.0, None]]
+    ```
+
+    """
+    result = np.asarray(values, dtype=np.float64).astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+def sound_formant_tracks(  # noqa: PLR0913
+    sound: SoundType | AnalysisContext,
+    n_formants: int,
     time_step: float | None = None,
     window_length: float = 0.025,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    engine: str = "praat",
+) -> tuple[np.ndarray, float, float]:
+    """
+    Calculate the formant tracks of a sound, or of the frames in a time window of it.
+
+    For a time window, the sound is resampled like Praat does before the formant analysis, once
+    for the whole sound, so the analysis of the window uses the same samples. The "lpc" engine
+    estimates the formants of the same frames with `lpc_frames`.
+
+    Returns
+    -------
+    - tuple: The formant tracks, see `formant_tracks`, the time step between the frames and the
+      time of the center of the first frame.
+
+    """
+    context = as_analysis_context(sound)
+    if start_time is None and end_time is None:
+        tracks, time_step, first_frame_time = context.formant_tracks(
+            time_step, window_length, engine
+        )
+        return tracks[:, :n_formants], time_step, first_frame_time
+
+    time_step = time_step or window_length / 4
+    if engine == "lpc":
+        n_frames, first_frame_time = frame_grid(
+            context.sound, 2 * window_length, time_step, 2 * FORMANT_CEILING
+        )
+        frames = frames_in_window(n_frames, first_frame_time, time_step, start_time, end_time)
+        tracks = lpc_frames(
+            context.sound, frames, first_frame_time, time_step, window_length, n_formants
+        )
+        return tracks, time_step, first_frame_time + frames.start * time_step
+
+    tracks, window_start_time = analyse_time_window(
+        context.resampled(2 * FORMANT_CEILING),
+        start_time,
+        end_time,
+        window_duration=2 * window_length,
+        time_step=time_step,
+        analysis="formant",
+        parameters={"window_length": window_length, "n_formants": n_formants},
+    )
+    return tracks.reshape(-1, n_formants), time_step, window_start_time
+
+
+def calculate_sound_f1_f2(  # noqa: PLR0913
+    sound: SoundType | AnalysisContext,
+    time_step: float | None = None,
+    window_length: float = 0.025,
+    start_time: float | None = None,
+    end_time: float | None = None,
+    engine: str = "praat",
 ):
     """
     Calculate the first and second formant of a sound fragment.
 
     Parameters
     ----------
-    - sound (parselmouth.Sound): Sound object representing a speech fragment.
+    - sound (parselmouth.Sound | AnalysisContext): Sound object representing a speech fragment,
+      or its analysis context.
     - time_step (float): Time between the center of the frames.
     - window_length (float): Effective duration of the analysis window.
+    - start_time, end_time (float | None): Only calculate the frames in this time window, see
+      `analyse_time_window`.
+    - engine (str): One of `FORMANT_ENGINES`, Praat by default.
 
     Returns
     -------
@@ -221,52 +1489,45 @@ def calculate_sound_f1_f2(
 
     """
     try:
-        formants = sound.to_formant_burg(
-            time_step=time_step,
-            window_length=window_length,
+        tracks, time_step, first_frame_time = sound_formant_tracks(
+            sound, 2, time_step, window_length, start_time, end_time, engine
         )
-        data: list = []
-        for frame in np.arange(1, len(formants) + 1):
-            frame_formant_data: list = []
-            for x in range(1, 3):
-                cur = formants.get_value_at_time(
-                    formant_number=x,
-                    time=formants.frame_number_to_time(frame),
-                )
-                if math.isnan(cur):
-                    cur = None
-                frame_formant_data.append(cur)
-            data.append(frame_formant_data)
         return {
-            "time_step": formants.time_step,
+            "time_step": time_step,
             "window_length": window_length,
-            "start_time": formants.get_time_from_frame_number(1),
-            "data": data,
+            "start_time": first_frame_time,
+            "data": nan_to_none(tracks),
         }
     except Exception:
         return None
 
 
-def calculate_sound_formants_for_spectrogram(
-    sound: SoundType,
+def calculate_sound_formants_for_spectrogram(  # noqa: PLR0913
+    sound: SoundType | AnalysisContext,
     time_step: float | None = None,
     window_length: float = 0.025,
-):  # pragma: no cover
+    start_time: float | None = None,
+    end_time: float | None = None,
+    engine: str = "praat",
+):
     """
     calculate the first five formants of a sound fragment.
 
     Parameters
     ----------
-    - sound (parselmouth.Sound): Sound object representing a speech fragment.
+    - sound (parselmouth.Sound | AnalysisContext): Sound object representing a speech fragment,
+      or its analysis context.
     - time_step (float): Time between the center of the frames.
     - window_length (float): Effective duration of the analysis window.
+    - start_time, end_time (float | None): Only calculate the frames in this time window, see
+      `analyse_time_window`.
+    - engine (str): One of `FORMANT_ENGINES`, Praat by default.
 
     Returns
     -------
-    - time_step (float): Time between the center of the frames.
-    - window_length (float): Effective duration of the analysis window.
-    - start_time (float): Time of center of the first frame.
-    - data (numpy.ndarray): 2D array with the f1 - f5 found in each frame.
+    - formants (list): 2D list with the f1 - f5 found in each frame.
+    - timeStep (float): Time between the center of the frames.
+    - startTime (float): Time of center of the first frame.
 
     Example:
     ```python
@@ -275,25 +1536,14 @@ def calculate_sound_formants_for_spectrogram(
 
     """
     try:
-        formants = sound.to_formant_burg(
-            time_step=time_step,
-            window_length=window_length,
+        tracks, time_step, first_frame_time = sound_formant_tracks(
+            sound, 5, time_step, window_length, start_time, end_time, engine
         )
-        data: list = []
-        for frame in np.arange(1, len(formants) + 1):
-            frame_formant_data: list = []
-            for x in range(1, 6):
-                cur = formants.get_value_at_time(
-                    formant_number=x,
-                    time=formants.frame_number_to_time(frame),
-                )
-                if math.isnan(cur):
-                    cur = None
-                frame_formant_data.append(cur)
-            data.append(frame_formant_data)
     except Exception as _:
         return None
     else:
         return {
-            "formants": data,
+            "formants": nan_to_none(tracks),
+            "timeStep": time_step,
+            "startTime": first_frame_time,
         }
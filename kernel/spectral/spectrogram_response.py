@@ -0,0 +1,169 @@
+"""Negotiation and encoding of the binary responses for spectrogram data."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi import Response
+
+# binary media types, with the encoding of the spectrogram values they stand for
+SPECTROGRAM_FLOAT32_MEDIA_TYPE = "application/vnd.spectral.spectrogram+float32"
+SPECTROGRAM_UINT8_MEDIA_TYPE = "application/vnd.spectral.spectrogram+uint8"
+SPECTROGRAM_MEDIA_TYPES = {
+    SPECTROGRAM_FLOAT32_MEDIA_TYPE: "float32",
+    SPECTROGRAM_UINT8_MEDIA_TYPE: "uint8",
+    "application/octet-stream": "float32",
+}
+
+# the power that corresponds to 0 dB, as used by Praat (the square of 2e-5 Pa)
+REFERENCE_POWER = 4e-10
+
+# the range (in dB) below the maximum of a spectrogram that is kept when quantizing to uint8
+DEFAULT_DYNAMIC_RANGE = 70.0
+
+
+def negotiate_spectrogram_encoding(accept: str | None) -> str | None:
+    """
+    Choose the encoding of a spectrogram response based on the Accept header.
+
+    Parameters
+    ----------
+    - accept: The value of the Accept header of the request, if any.
+
+    Returns
+    -------
+    - str | None: "float32" or "uint8" for one of the binary media types, or None for JSON,
+      which is also the fallback when nothing in the header is supported.
+
+    Example:
+    ```python
+    negotiate_spectrogram_encoding("application/vnd.spectral.spectrogram+uint8")  # "uint8"
+    ```
+
+    """
+    best_encoding = None
+    best_quality = 0.0
+    for media_range in (accept or "").split(","):
+        media_type, *parameters = (part.strip() for part in media_range.split(";"))
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # JSON wins ties, so clients that accept anything keep getting JSON
+        if media_type in SPECTROGRAM_MEDIA_TYPES and quality > best_quality:
+            best_encoding, best_quality = SPECTROGRAM_MEDIA_TYPES[media_type], quality
+        elif media_type in ("application/json", "application/*", "*/*") and quality >= best_quality:
+            best_encoding, best_quality = None, quality
+    return best_encoding
+
+
+def quantize_spectrogram(
+    values: np.ndarray,
+    dynamic_range: float = DEFAULT_DYNAMIC_RANGE,
+) -> tuple[np.ndarray, float, float]:
+    """
+    Quantize the power values of a spectrogram to dB in the range of an unsigned byte.
+
+    The values are converted to dB relative to `REFERENCE_POWER`, and everything more than
+    `dynamic_range` dB below the maximum is clipped, like Praat does when drawing spectrograms.
+
+    Parameters
+    ----------
+    - values: The power spectral density values of the spectrogram.
+    - dynamic_range: The range (in dB) below the maximum to keep.
+
+    Returns
+    -------
+    - tuple: The quantized values, and the dB values corresponding to 0 and 255.
+
+    Example:
+    ```python
+    quantized, db_min, db_max = quantize_spectrogram(spectrogram.values)
+    db = db_min + quantized / 255 * (db_max - db_min)
+    ```
+
+    """
+    with np.errstate(divide="ignore"):
+        db = 10 * np.log10(np.asarray(values, dtype=np.float64) / REFERENCE_POWER)
+    finite = db[np.isfinite(db)]
+    db_max = float(finite.max()) if finite.size else 0.0
+    db_min = db_max - dynamic_range
+    scaled = (np.nan_to_num(db, nan=db_min, neginf=db_min) - db_min) * (255 / dynamic_range)
+    quantized = np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+    return quantized, db_min, db_max
+
+
+def encode_spectrogram(spectrogram: dict[str, Any], encoding: str) -> bytes:
+    """
+    Encode a spectrogram into a binary payload with a small JSON header.
+
+    The payload starts with the length of the header as a little-endian uint32, followed by the
+    UTF-8 JSON header, padded with spaces to a multiple of 4 bytes so the values are aligned. The
+    values follow as a row-major (frequency, frame) matrix, of little-endian float32 power values
+    or of uint8 quantized dB values, see `quantize_spectrogram`.
+
+    Parameters
+    ----------
+    - spectrogram: The spectrogram, with the matrix of power values as "data".
+    - encoding: Either "float32" or "uint8".
+
+    Returns
+    -------
+    - bytes: The encoded spectrogram.
+
+    Example:
+    ```python
+    payload = encode_spectrogram(spectrogram, "float32")
+    ```
+
+    """
+    values = np.asarray(spectrogram["data"])
+    header = {key: value for key, value in spectrogram.items() if key != "data"}
+    header["dtype"] = encoding
+    header["shape"] = list(values.shape)
+    if encoding == "uint8":
+        data, header["dbMin"], header["dbMax"] = quantize_spectrogram(values)
+    else:
+        data = values.astype("<f4")
+
+    header_bytes = orjson.dumps(header)
+    header_bytes += b" " * (-len(header_bytes) % 4)
+    header_length = len(header_bytes).to_bytes(4, "little")
+    return header_length + header_bytes + np.ascontiguousarray(data).tobytes()
+
+
+def spectrogram_response(spectrogram: dict[str, Any] | None, accept: str | None) -> Response:
+    """
+    Respond with a spectrogram in the encoding negotiated with the Accept header.
+
+    Parameters
+    ----------
+    - spectrogram: The spectrogram, with the matrix of power values as "data", or None.
+    - accept: The value of the Accept header of the request, if any.
+
+    Returns
+    -------
+    - Response: The binary encoded spectrogram, or JSON if no binary encoding was accepted.
+
+    """
+    encoding = negotiate_spectrogram_encoding(accept)
+    headers = {"Vary": "Accept"}
+    if spectrogram is None or encoding is None:
+        return Response(
+            orjson.dumps(spectrogram, option=orjson.OPT_SERIALIZE_NUMPY),
+            media_type="application/json",
+            headers=headers,
+        )
+    return Response(
+        encode_spectrogram(spectrogram, encoding),
+        media_type=(
+            SPECTROGRAM_UINT8_MEDIA_TYPE if encoding == "uint8" else SPECTROGRAM_FLOAT32_MEDIA_TYPE
+        ),
+        headers=headers,
+    )
@@ -63,7 +63,7 @@ def get_transcribe_fn(model_name: str) -> Callable[[bytes], str]:
     def transcribe_fn(data: bytes) -> str:
         audio = signal_analysis.get_audio({"data": data})
         # trick from https://github.com/openai/whisper/discussions/983
-        data = np.frombuffer(audio.raw_data, np.int16).flatten().astype(np.float32) / 32768.0  # type: ignore
+        data = audio.samples.astype(np.float32) / 32768.0  # type: ignore
         input_features = processor(
             data, sampling_rate=required_sr, return_tensors="pt"
         ).input_features  # type: ignore
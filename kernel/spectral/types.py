@@ -1,15 +1,54 @@
 """All the types, that are reused throughout the Spectral."""
 
-from collections.abc import Iterator
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from functools import cached_property
 
+import numpy as np
 import parselmouth
-from pydub import AudioSegment
 
-from .database import Database
+from .database import AsyncDatabase
+
+
+@dataclass(frozen=True, eq=False)
+class PCMAudio:
+    """
+    Decoded audio signal.
+
+    Attributes
+    ----------
+        samples (np.ndarray): 1D array with the samples of the signal. When decoded from a mono
+                              wav file, this is a read-only view on the bytes of the file.
+        frame_rate (int): The sample frequency of the signal.
+        sound (parselmouth.Sound): Sound object of the signal, built on first access.
+
+    """
+
+    samples: np.ndarray
+    frame_rate: int
+
+    @property
+    def duration_seconds(self) -> float:
+        """The duration of the signal in seconds."""
+        return len(self.samples) / self.frame_rate
+
+    @cached_property
+    def sound(self) -> parselmouth.Sound:
+        """Sound object of the signal, built once and reused afterwards."""
+        return parselmouth.Sound(
+            values=np.asarray(self.samples, dtype=np.float64),
+            sampling_frequency=self.frame_rate,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """The (expected) memory used by the samples together with the sound object."""
+        return self.samples.nbytes + len(self.samples) * np.dtype(np.float64).itemsize
+
 
 # type definitions
-AudioType = AudioSegment
+AudioType = PCMAudio
 SoundType = parselmouth.Sound
 FileStateType = dict
-DatabaseType = Database | Iterator[Database]
+DatabaseType = AsyncDatabase | AsyncIterator[AsyncDatabase]
 TranscriptionType = dict[str, str | list[dict] | None]
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from spectral.caching import LRUCache, SingleFlight
+
+
+def test_lru_cache_get_and_put():
+    cache = LRUCache(max_size=2)
+    assert cache.get("a") is None, "Expected a missing entry to be None"
+    cache.put("a", 1)
+    assert cache.get("a") == 1, "Expected the stored entry to be returned"
+    assert "a" in cache, "Expected the stored entry to be in the cache"
+    assert len(cache) == 1, "Expected one entry in the cache"
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "a" in cache, "Expected the recently used entry to be kept"
+    assert "b" not in cache, "Expected the least recently used entry to be evicted"
+    assert "c" in cache, "Expected the new entry to be stored"
+    assert cache.evictions == 1, "Expected one eviction"
+
+
+def test_lru_cache_size_budget():
+    cache = LRUCache(max_size=10, size_of=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+    assert "a" not in cache, "Expected the oldest entry to be evicted to stay within the budget"
+    assert cache.stats()["size"] == 8, "Expected the size of the remaining entries"
+
+
+def test_lru_cache_replaces_entry():
+    cache = LRUCache(max_size=10, size_of=len)
+    cache.put("a", "xxxx")
+    cache.put("a", "xx")
+    assert cache.get("a") == "xx", "Expected the entry to be replaced"
+    assert cache.stats()["size"] == 2, "Expected the size of the replaced entry not to be counted"
+
+
+def test_lru_cache_skips_oversized_entry():
+    cache = LRUCache(max_size=3, size_of=len)
+    cache.put("a", "xx")
+    cache.put("b", "xxxx")
+    assert "b" not in cache, "Expected an entry larger than the budget not to be stored"
+    assert "a" in cache, "Expected the other entries to be kept"
+
+
+def test_lru_cache_stats_and_clear():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "entries": 1,
+        "size": 1,
+        "maxSize": 2,
+    }
+    cache.clear()
+    assert cache.stats()["hits"] == 0, "Expected the counters to be reset"
+    assert len(cache) == 0, "Expected the entries to be removed"
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"result": len(calls)}
+
+    async def run():
+        return await asyncio.gather(flight.run("a", compute), flight.run("a", compute), flight.run("b", compute))
+
+    first, second, other = asyncio.run(run())
+    assert first is second, "Expected the concurrent calls with the same key to share the result"
+    assert len(calls) == 2, "Expected one computation per key"
+    assert flight.stats() == {"calls": 2, "coalesced": 1, "inFlight": 0}, "Expected the counters"
+    asyncio.run(run())
+    assert len(calls) == 4, "Expected finished computations not to be shared"
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def run():
+        return await asyncio.gather(flight.run("a", compute), flight.run("a", compute), return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, ValueError), "Expected the error of the computation"
+    assert second is first, "Expected the same error for the coalesced call"
+    assert len(flight) == 0, "Expected no running computations"
+
+
+def test_single_flight_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return 1
+
+    async def run():
+        first = asyncio.ensure_future(flight.run("a", compute))
+        second = asyncio.ensure_future(flight.run("a", compute))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 1, "Expected the computation to finish for the other caller"
+    flight.clear()
+    assert flight.stats() == {"calls": 0, "coalesced": 0, "inFlight": 0}, "Expected the counters to be reset"
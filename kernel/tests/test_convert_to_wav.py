@@ -0,0 +1,99 @@
+import io
+import os
+import subprocess
+import wave
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from spectral.mode_handler import _run_ffmpeg, convert_to_wav, fix_wav_header, is_canonical_wav
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+
+with open(os.path.join(data_dir, "torgo-dataset/MC02_control_head_sentence1.wav"), mode="rb") as f:
+    control_sentence = f.read()
+
+# the same recording, but as written to a stream: the sizes in the header are unknown
+streamed_sentence = bytearray(control_sentence)
+streamed_sentence[4:8] = b"\xff\xff\xff\xff"
+streamed_sentence[40:44] = b"\xff\xff\xff\xff"
+streamed_sentence = bytes(streamed_sentence)
+
+
+def test_convert_to_wav_header_sizes():
+    result = convert_to_wav(streamed_sentence)
+    assert result[:4] == b"RIFF", "Expected the result to be a RIFF file"
+    assert int.from_bytes(result[4:8], "little") == len(result) - 8, "Expected the RIFF size to match"
+    with wave.open(io.BytesIO(result)) as wav:
+        assert wav.getsampwidth() == 2, "Expected 16-bit samples"
+        assert wav.getframerate() == 16000, "Expected the sample rate to be kept"
+        assert wav.getnframes() == 73040, "Expected all the samples to be kept"
+
+
+def test_convert_to_wav_does_not_use_temporary_files():
+    with patch("spectral.mode_handler.tempfile.NamedTemporaryFile") as mock_temp_file:
+        convert_to_wav(streamed_sentence)
+        mock_temp_file.assert_not_called()
+
+
+def test_convert_to_wav_unstreamable_input_falls_back_to_file():
+    def run_ffmpeg(source, data):
+        if source == "pipe:0":
+            return subprocess.CompletedProcess([], 1, b"", b"moov atom not found")
+        return _run_ffmpeg(source, data)
+
+    with patch("spectral.mode_handler._run_ffmpeg", side_effect=run_ffmpeg) as mock_run_ffmpeg:
+        result = convert_to_wav(streamed_sentence)
+    assert mock_run_ffmpeg.call_count == 2, "Expected ffmpeg to be retried with a file"
+    assert result[:4] == b"RIFF", "Expected the result to be a RIFF file"
+    assert not os.path.exists(mock_run_ffmpeg.call_args.args[0]), "Expected the temporary file to be removed"
+
+
+def test_convert_to_wav_invalid_data():
+    with pytest.raises(HTTPException) as e:
+        convert_to_wav(b"definitely not audio" * 100)
+    assert e.value.status_code == 422, "Expected status code 422 when the file can not be converted"
+    assert e.value.detail.startswith("Could not convert the file to wav"), "Expected a conversion error"
+
+
+def test_fix_wav_header():
+    assert fix_wav_header(streamed_sentence) == control_sentence, "Expected the original header back"
+
+
+def test_fix_wav_header_not_wav():
+    assert fix_wav_header(b"not a wav file") == b"not a wav file", "Expected non-wav data to be untouched"
+
+
+def test_convert_to_wav_skips_canonical_wav():
+    with patch("spectral.mode_handler._run_ffmpeg") as mock_run_ffmpeg:
+        assert convert_to_wav(control_sentence) is control_sentence, "Expected the wav to be untouched"
+        mock_run_ffmpeg.assert_not_called()
+
+
+@pytest.mark.parametrize("file_name", sorted(os.listdir(os.path.join(data_dir, "torgo-dataset"))))
+def test_is_canonical_wav_torgo(file_name):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        assert is_canonical_wav(f.read()), "Expected the torgo recordings to be canonical wav files"
+
+
+def test_is_canonical_wav_converted():
+    assert is_canonical_wav(convert_to_wav(streamed_sentence)), "Expected the ffmpeg output to be canonical"
+
+
+def test_is_canonical_wav_streamed():
+    assert not is_canonical_wav(streamed_sentence), "Expected unknown sizes not to be canonical"
+
+
+def test_is_canonical_wav_truncated():
+    assert not is_canonical_wav(control_sentence[:1000]), "Expected a truncated file not to be canonical"
+
+
+def test_is_canonical_wav_float():
+    float_wav = bytearray(control_sentence)
+    float_wav[20:22] = (3).to_bytes(2, "little")  # WAVE_FORMAT_IEEE_FLOAT
+    float_wav[34:36] = (32).to_bytes(2, "little")
+    assert not is_canonical_wav(bytes(float_wav)), "Expected float samples not to be canonical"
+
+
+def test_is_canonical_wav_not_wav():
+    assert not is_canonical_wav(b"OggS" + b"\x00" * 100), "Expected other formats not to be canonical"
@@ -1,11 +1,29 @@
+import asyncio
+import psycopg
 import pytest
-from unittest.mock import Mock, patch
-from spectral.database import Database
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+from spectral.database import (
+    AsyncDatabase,
+    SchemaCache,
+    create_async_connection_pool,
+    schema_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_schema_cache():
+    schema_cache.invalidate()
+    yield
+
+
+def describe(*columns):
+    return [SimpleNamespace(name=column) for column in columns]
 
 
 @pytest.fixture
-def db():
-    return Database(
+def async_db():
+    return AsyncDatabase(
         user="test_user",
         password="test_pass",
         host="test_host",
@@ -14,10 +32,16 @@ def db():
     )
 
 
-@patch("spectral.database.psycopg.connect")
-def test_connection(mock_connect, db):
-    db.connection()
-    mock_connect.assert_called_once_with(
+@patch("spectral.database.AsyncConnectionPool")
+def test_create_async_connection_pool(mock_pool):
+    create_async_connection_pool("test_user", "test_pass", "test_host", "5432", "test_db", max_size=4)
+    assert mock_pool.call_args.kwargs == {"min_size": 1, "max_size": 4, "open": False}
+
+
+@patch("spectral.database.psycopg.AsyncConnection.connect", new_callable=AsyncMock)
+def test_async_connection(mock_connect, async_db):
+    asyncio.run(async_db.connection())
+    mock_connect.assert_awaited_once_with(
         dbname="test_db",
         user="test_user",
         password="test_pass",
@@ -26,64 +50,316 @@ def test_connection(mock_connect, db):
     )
 
 
-def test_fetch_file(db):
-    mock_cursor = Mock()
-    db.conn = Mock()
-    db.cursor = mock_cursor
+def test_async_connection_from_pool():
+    conn = Mock()
+    conn.cursor.return_value = AsyncMock()
+    conn.commit = AsyncMock()
+    conn.close = AsyncMock()
+    pool = Mock()
+    pool.getconn = AsyncMock(return_value=conn)
+    pool.putconn = AsyncMock()
+    db = AsyncDatabase("test_user", "test_pass", "test_host", "5432", "test_db", pool=pool)
 
-    mock_cursor.fetchall.return_value = [
-        ("id", 1),
-        ("name", 2),
-        ("data", 3),
-        ("creation_time", 4),
-        ("modified_time", 5),
-        ("uploader", 6),
-        ("session", 7),
-        ("emphemeral", 8),
-    ]
+    asyncio.run(db.connection())
+    asyncio.run(db.close())
+    pool.getconn.assert_awaited_once()
+    conn.commit.assert_awaited_once()
+    conn.close.assert_not_awaited()
+    pool.putconn.assert_awaited_once_with(conn)
 
-    mock_cursor.fetchone.return_value = [
-        "1",
-        "test_name",
-        b"test_data",
-        "creation_time",
-        "modified_time",
-        "uploader",
-        "session",
-        False,
-    ]
 
-    result = db.fetch_file("1")
+def test_async_fetch_file(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.description = describe("id", "data", "creation_time")
+    mock_cursor.fetchone.return_value = ["1", b"test_data", "creation_time"]
+
+    result = asyncio.run(async_db.fetch_file("1"))
+    assert result == {"id": "1", "data": b"test_data", "creationTime": "creation_time"}
+    mock_cursor.execute.assert_awaited_once_with("SELECT * FROM files WHERE id = %s", ["1"])
+    assert schema_cache.columns("files") == ("id", "data", "creation_time")
+
+
+def test_async_fetch_file_not_found(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.fetchone.return_value = None
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(async_db.fetch_file("1"))
+
+
+def test_async_fetch_file_columns(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.description = describe("id", "creation_time")
+    mock_cursor.fetchone.return_value = ["1", "creation_time"]
+
+    result = asyncio.run(async_db.fetch_file("1", columns=["id", "creation_time"]))
+    assert result == {"id": "1", "creationTime": "creation_time"}
+    query = mock_cursor.execute.call_args.args[0]
+    assert query.as_string(None) == 'SELECT "id", "creation_time" FROM files WHERE id = %s'
+    assert schema_cache.columns("files") is None
+
+
+def test_async_fetch_file_unknown_column(async_db):
+    async_db.conn = Mock()
+    async_db.cursor = AsyncMock()
+    schema_cache.update("files", ("id", "data"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(async_db.fetch_file("1", columns=["id", "data; DROP TABLE files"]))
+    async_db.cursor.execute.assert_not_awaited()
+
+
+def test_async_fetch_file_metadata(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.description = describe("id", "file_size", "creation_time", "modified_time")
+    mock_cursor.fetchone.return_value = ["1", 1024, "creation_time", "modified_time"]
+
+    result = asyncio.run(async_db.fetch_file_metadata("1"))
     assert result == {
         "id": "1",
-        "name": "test_name",
-        "data": b"test_data",
+        "fileSize": 1024,
         "creationTime": "creation_time",
         "modifiedTime": "modified_time",
-        "uploader": "uploader",
-        "session": "session",
-        "emphemeral": False,
     }
-    mock_cursor.execute.assert_called_with("SELECT * FROM files WHERE id = %s", ["1"])
+    query = mock_cursor.execute.call_args.args[0]
+    assert "octet_length(data)" in query
+    assert "SELECT *" not in query
+
+
+def test_async_fetch_file_metadata_not_found(async_db):
+    async_db.conn = Mock()
+    async_db.cursor = AsyncMock()
+    async_db.cursor.fetchone.return_value = None
 
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(async_db.fetch_file_metadata("1"))
 
-def test_get_transcriptions(db):
-    mock_cursor = Mock()
-    db.conn = Mock()
-    db.cursor = mock_cursor
 
-    mock_cursor.fetchall.side_effect = [[("1",)], [(0.0, 1.0, "hello")]]
+def test_async_fetch_session_file_ids(async_db):
+    async_db.conn = Mock()
+    async_db.cursor = AsyncMock()
+    async_db.cursor.fetchall.return_value = [("1",), ("2",)]
 
-    result = db.get_transcriptions("1")
+    assert asyncio.run(async_db.fetch_session_file_ids("session")) == ["1", "2"]
+    assert async_db.cursor.execute.call_args.args[1] == ["session"]
+
+
+def test_async_get_transcriptions(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.fetchall.return_value = [("1", "a", 0.0, 1.0, "hello")]
+
+    result = asyncio.run(async_db.get_transcriptions("1"))
     assert result == [[{"start": 0.0, "end": 1.0, "value": "hello"}]]
-    mock_cursor.execute.assert_called()
+    mock_cursor.execute.assert_awaited_once()
+
+
+def test_async_get_transcriptions_no_transcriptions(async_db):
+    async_db.conn = Mock()
+    async_db.cursor = AsyncMock()
+    async_db.cursor.fetchall.return_value = []
+
+    assert asyncio.run(async_db.get_transcriptions("1")) == []
+
+
+def test_async_get_transcriptions_bulk(async_db):
+    mock_cursor = AsyncMock()
+    async_db.conn = Mock()
+    async_db.cursor = mock_cursor
+
+    mock_cursor.fetchall.return_value = [
+        ("1", "a", 0.0, 1.0, "hello"),
+        ("1", "a", 1.0, 2.0, "world"),
+        ("1", "b", None, None, None),
+        ("1", "c", 0.0, 2.0, "hi"),
+        ("2", "d", 0.5, 1.0, "bye"),
+    ]
+
+    result = asyncio.run(async_db.get_transcriptions_bulk(["1", "2", "3"]))
+    assert result == {
+        "1": [
+            [{"start": 0.0, "end": 1.0, "value": "hello"}, {"start": 1.0, "end": 2.0, "value": "world"}],
+            [],
+            [{"start": 0.0, "end": 2.0, "value": "hi"}],
+        ],
+        "2": [[{"start": 0.5, "end": 1.0, "value": "bye"}]],
+    }
+    mock_cursor.execute.assert_awaited_once()
+    assert mock_cursor.execute.call_args.args[1] == [["1", "2", "3"]]
+
+
+def test_async_fetch_files(async_db):
+    class ServerCursor:
+        description = describe("id", "data")
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            return None
+
+        async def execute(self, query, params):
+            self.params = params
+
+        async def __aiter__(self):
+            for row in [("1", b"one"), ("2", b"two")]:
+                yield row
+
+    server_cursor = ServerCursor()
+    async_db.conn = Mock()
+    async_db.conn.cursor.return_value = server_cursor
+
+    async def collect():
+        return [file async for file in async_db.fetch_files(["1", "2"])]
+
+    result = asyncio.run(collect())
+    assert result == [{"id": "1", "data": b"one"}, {"id": "2", "data": b"two"}]
+    assert server_cursor.params == [["1", "2"]]
+    assert schema_cache.columns("files") == ("id", "data")
+
+
+def test_schema_cache_parse_row():
+    cache = SchemaCache()
+    result = cache.parse_row(describe("id", "ground_truth"), ("1", "hello"), table="files")
+    assert result == {"id": "1", "groundTruth": "hello"}
+    assert cache.columns("files") == ("id", "ground_truth")
+    assert cache.version == 1
+
+
+def test_schema_cache_detects_layout_change():
+    cache = SchemaCache()
+    cache.parse_row(describe("id"), ("1",), table="files")
+    cache.parse_row(describe("id"), ("2",), table="files")
+    assert cache.version == 1, "Expected an unchanged layout to keep the version"
+
+    cache.parse_row(describe("id", "note"), ("1", ""), table="files")
+    assert cache.columns("files") == ("id", "note")
+    assert cache.version == 2, "Expected a changed layout to bump the version"
+
+
+def test_schema_cache_invalidate():
+    cache = SchemaCache()
+    cache.parse_row(describe("id"), ("1",), table="files")
+    cache.invalidate("files")
+    assert cache.columns("files") is None
+    assert cache.version == 2
+
+
+def test_schema_cache_projection_does_not_update_layout():
+    cache = SchemaCache()
+    assert cache.parse_row(describe("creation_time"), (1,)) == {"creationTime": 1}
+    assert cache.columns("files") is None
+
+
+@pytest.fixture
+def job_db(async_db):
+    async_db.conn = Mock()
+    async_db.conn.commit = AsyncMock()
+    async_db.cursor = AsyncMock()
+    return async_db
+
+
+def test_async_enqueue_precompute_jobs(job_db):
+    asyncio.run(job_db.enqueue_precompute_jobs(iter(["1", "2"])))
+    assert job_db.cursor.execute.call_args.args[1] == [["1", "2"]]
+    job_db.conn.commit.assert_awaited_once()
+
+
+def test_async_claim_precompute_job(job_db):
+    job_db.cursor.description = describe("file", "modified_time")
+    job_db.cursor.fetchone.return_value = ("1", "modified_time")
+
+    assert asyncio.run(job_db.claim_precompute_job(3, 600)) == {"file": "1", "modifiedTime": "modified_time"}
+    fail_stale, claim = job_db.cursor.execute.call_args_list
+    assert "status = 'failed'" in fail_stale.args[0] and fail_stale.args[1] == [3, 600]
+    assert "FOR UPDATE SKIP LOCKED" in claim.args[0]
+    assert job_db.cursor.execute.call_args.args[1] == [3, 600]
+    job_db.conn.commit.assert_awaited_once()
+
+
+def test_async_enqueue_new_files(job_db):
+    asyncio.run(job_db.enqueue_new_files(3600))
+    assert "max(modified_time)" in job_db.cursor.execute.call_args.args[0]
+    assert job_db.cursor.execute.call_args.args[1] == [3600]
+    job_db.conn.commit.assert_awaited_once()
+
+
+def test_async_claim_precompute_job_empty_queue(job_db):
+    job_db.cursor.fetchone.return_value = None
+
+    assert asyncio.run(job_db.claim_precompute_job(3, 600)) is None
+    job_db.conn.commit.assert_awaited_once()
+
+
+@pytest.mark.parametrize(("error", "status"), [(None, "done"), ("404: File not found", "failed")])
+def test_async_finish_precompute_job(job_db, error, status):
+    asyncio.run(job_db.finish_precompute_job("1", "modified_time", error))
+    assert job_db.cursor.execute.call_args.args[1] == [status, error, "1", "modified_time"]
+    job_db.conn.commit.assert_awaited_once()
+
+
+def test_async_fetch_precompute_job_not_found(job_db):
+    job_db.cursor.fetchone.return_value = None
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(job_db.fetch_precompute_job("1"))
+
+
+def test_async_close_returns_connection_to_pool_when_commit_fails():
+    conn = Mock()
+    conn.cursor.return_value = AsyncMock()
+    conn.commit = AsyncMock(side_effect=psycopg.OperationalError("connection lost"))
+    conn.rollback = AsyncMock(side_effect=psycopg.OperationalError("connection lost"))
+    pool = Mock()
+    pool.getconn = AsyncMock(return_value=conn)
+    pool.putconn = AsyncMock()
+    db = AsyncDatabase("test_user", "test_pass", "test_host", "5432", "test_db", pool=pool)
+
+    asyncio.run(db.connection())
+    with pytest.raises(psycopg.OperationalError):
+        asyncio.run(db.close())
+    conn.rollback.assert_awaited_once()
+    pool.putconn.assert_awaited_once_with(conn)
+
+
+def test_async_close_rolls_back_without_commit(async_db):
+    async_db.conn = Mock()
+    async_db.conn.commit = AsyncMock()
+    async_db.conn.rollback = AsyncMock()
+    async_db.conn.close = AsyncMock()
+    async_db.cursor = AsyncMock()
+
+    asyncio.run(async_db.close(commit=False))
+    async_db.conn.commit.assert_not_awaited()
+    async_db.conn.rollback.assert_awaited_once()
+    async_db.conn.close.assert_awaited_once()
+
+
+def test_async_close(async_db):
+    async_db.conn = Mock()
+    async_db.conn.commit = AsyncMock()
+    async_db.conn.close = AsyncMock()
+    async_db.cursor = AsyncMock()
 
+    asyncio.run(async_db.close())
+    async_db.cursor.close.assert_awaited_once()
+    async_db.conn.commit.assert_awaited_once()
+    async_db.conn.close.assert_awaited_once()
 
-def test_close(db):
-    mock_cursor = Mock()
-    db.conn = Mock()
-    db.cursor = mock_cursor
 
-    db.close()
-    mock_cursor.close.assert_called_once()
-    db.conn.close.assert_called_once()
+def test_async_close_without_connection(async_db):
+    asyncio.run(async_db.close())
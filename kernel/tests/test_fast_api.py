@@ -1,13 +1,22 @@
 import pytest
-from spectral.database import Database
+from spectral.database import AsyncDatabase
 from spectral.main import app, get_db
+from spectral import mode_handler
+from spectral.mode_handler import running_requests, wav_cache
+from spectral.mode_pool import ModePool
+from spectral.result_cache import audio_digest_cache, result_cache, running_analyses
+from spectral.signal_analysis import analysis_cache, audio_cache
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
+import asyncio
 import json
 from scipy.io import wavfile as wv
 import os
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from concurrent.futures import ProcessPoolExecutor
 import mytextgrid
+import numpy as np
+import parselmouth
 
 client = TestClient(app)
 
@@ -40,13 +49,24 @@ def file_state():
 @pytest.fixture
 def db_mock():
     mock = Mock()
-    mock.fetch_file.return_value = {
-        "data": control_sentence,
-        "creationTime": 1,
-        "groundTruth": "hai test",
-    }
-    mock.get_transcriptions.return_value = [[{"value": "hi", "start": 0, "end": 1}]]
-    mock.__class__ = Database
+    mock.fetch_file = AsyncMock(
+        return_value={
+            "id": 1,
+            "data": control_sentence,
+            "creationTime": 1,
+            "modifiedTime": 1,
+        }
+    )
+    mock.fetch_file_metadata = AsyncMock(
+        return_value={
+            "id": 1,
+            "fileSize": len(control_sentence),
+            "creationTime": 1,
+            "modifiedTime": 1,
+        }
+    )
+    mock.get_transcriptions = AsyncMock(return_value=[[{"value": "hi", "start": 0, "end": 1}]])
+    mock.__class__ = AsyncDatabase
 
     yield mock
 
@@ -58,6 +78,25 @@ def override_dependency(db_mock):
     app.dependency_overrides = {}
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    audio_cache.clear()
+    wav_cache.clear()
+    analysis_cache.clear()
+    result_cache.clear()
+    audio_digest_cache.clear()
+    running_analyses.clear()
+    running_requests.clear()
+    yield
+    audio_cache.clear()
+    wav_cache.clear()
+    analysis_cache.clear()
+    result_cache.clear()
+    audio_digest_cache.clear()
+    running_analyses.clear()
+    running_requests.clear()
+
+
 def test_signal_correct_mode_file_not_found(db_mock, file_state):
     db_mock.fetch_file.side_effect = HTTPException(status_code=500, detail="database error")
     response = client.post("/signals/modes/simple-info", json={"fileState": file_state})
@@ -70,12 +109,139 @@ def test_signal_correct_simple_info(db_mock, file_state):
     response = client.post("/signals/modes/simple-info", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for simple info mode"
     result = response.json()
-    assert result["fileSize"] == 146158, "Expected file size to be 146158"
+    assert result["fileSize"] == 146124, "Expected file size to be the size of the stored file"
     assert result["fileCreationDate"] == "1970-01-01T00:00:01Z", "Expected creation date to be '1970-01-01T00:00:01Z'"
     assert result["frame"] is None, "Expected frame to be None"
     assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
+def test_signal_cached_file_metadata_not_found(db_mock, file_state):
+    client.post("/signals/modes/waveform", json={"fileState": file_state})
+    db_mock.fetch_file_metadata.side_effect = FileNotFoundError
+    response = client.post("/signals/modes/simple-info", json={"fileState": file_state})
+    assert response.status_code == 404, "Expected status code 404 when a cached file is removed"
+    assert response.json()["detail"] == "File not found", "Expected detail message 'File not found'"
+    assert db_mock.fetch_file.call_count == 1, "Expected fetch_file not to be called again"
+
+
+def test_signal_fetches_file_in_one_query(db_mock, file_state):
+    response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for waveform mode"
+    db_mock.fetch_file.assert_called_once_with(1, columns=("id", "data", "creation_time", "modified_time"))
+    assert db_mock.fetch_file_metadata.call_count == 0, "Expected the metadata to be fetched with the audio"
+
+
+def test_signal_reuses_cached_audio(db_mock, file_state):
+    first = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    second = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert second.status_code == 200, "Expected status code 200 for waveform mode"
+    assert second.json() == first.json(), "Expected the cached audio to give the same result"
+    assert db_mock.fetch_file.call_count == 1, "Expected the audio to be fetched only once"
+    assert db_mock.fetch_file_metadata.call_count == 1, "Expected only the metadata of the cached file to be fetched"
+
+
+def test_signal_modified_file_is_not_cached(db_mock, file_state):
+    client.post("/signals/modes/waveform", json={"fileState": file_state})
+    db_mock.fetch_file_metadata.return_value = {**db_mock.fetch_file_metadata.return_value, "modifiedTime": 2}
+    response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for waveform mode"
+    assert db_mock.fetch_file.call_count == 2, "Expected a modified file to be fetched again"
+
+
+def test_stats_reports_audio_cache(db_mock, file_state):
+    file_state["frame"] = None
+    client.post("/signals/modes/waveform", json={"fileState": file_state})
+    client.post("/signals/modes/simple-info", json={"fileState": file_state})
+    response = client.get("/stats")
+    assert response.status_code == 200, "Expected status code 200 for the stats"
+    stats = response.json()["audioCache"]
+    assert stats["hits"] == 1, "Expected the second analysis to hit the audio cache"
+    assert stats["misses"] == 1, "Expected the first analysis to miss the audio cache"
+    assert stats["entries"] == 1, "Expected the decoded audio to be cached"
+    assert stats["size"] > len(control_sentence), "Expected the size of the decoded audio to be counted"
+
+
+def test_modes_share_analysis_context(db_mock, file_state, monkeypatch):
+    original = parselmouth.Sound.to_formant_burg
+    to_formant_burg = Mock()
+
+    def spy(self, *args, **kwargs):
+        to_formant_burg(*args, **kwargs)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(parselmouth.Sound, "to_formant_burg", spy)
+    waveform = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    spectrogram = client.post("/signals/modes/spectrogram", json={"fileState": file_state})
+    assert waveform.status_code == 200, "Expected status code 200 for waveform mode"
+    assert spectrogram.status_code == 200, "Expected status code 200 for spectrogram mode"
+    assert len(waveform.json()["formants"]) > 0, "Expected the formants of the file"
+    assert to_formant_burg.call_count == 1, "Expected the formants to be computed once for both modes"
+    stats = client.get("/stats").json()["analysisCache"]
+    assert stats["hits"] == 1, "Expected the second mode to reuse the analysis context"
+    assert stats["entries"] == 1, "Expected one analysis context to be cached"
+
+
+def test_signal_results_are_cached(db_mock, file_state, monkeypatch):
+    original = parselmouth.Sound.to_formant_burg
+    to_formant_burg = Mock()
+
+    def spy(self, *args, **kwargs):
+        to_formant_burg(*args, **kwargs)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(parselmouth.Sound, "to_formant_burg", spy)
+    first = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    analysis_cache.clear()
+    second = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert second.content == first.content, "Expected the cached result"
+    assert to_formant_burg.call_count == 1, "Expected the cached result to be used instead of analysing again"
+    stats = client.get("/stats").json()["resultCache"]
+    assert stats["memory"]["hits"] == 1, "Expected the second request to hit the result cache"
+    assert stats["memory"]["entries"] == 1, "Expected the result to be cached"
+    assert stats["disk"] is None, "Expected the disk tier to be disabled by default"
+    assert client.get("/stats").json()["runningAnalyses"] == {
+        "calls": 1,
+        "coalesced": 0,
+        "inFlight": 0,
+    }, "Expected a single analysis to be started"
+
+
+def test_signal_identical_requests_share_fetch(db_mock, file_state):
+    async def fetch_file(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return {"id": 1, "data": control_sentence, "creationTime": 1, "modifiedTime": 1}
+
+    db_mock.fetch_file.side_effect = fetch_file
+
+    async def requests():
+        return await asyncio.gather(
+            mode_handler.waveform_mode(db_mock, file_state),
+            mode_handler.waveform_mode(db_mock, {**file_state, "name": "renamed"}),
+            mode_handler.waveform_mode(db_mock, {**file_state, "formantEngine": "lpc"}),
+        )
+
+    first, second, other = asyncio.run(requests())
+    assert second == first, "Expected the shared result"
+    assert db_mock.fetch_file.await_count == 2, "Expected one fetch per mode and parameters"
+    assert running_requests.stats() == {
+        "calls": 2,
+        "coalesced": 1,
+        "inFlight": 0,
+    }, "Expected the identical request to be coalesced"
+
+
+def test_signal_result_cache_keys_parameters_and_audio(db_mock, file_state):
+    client.post("/signals/modes/waveform", json={"fileState": file_state})
+    client.post("/signals/modes/waveform", json={"fileState": {**file_state, "name": "renamed"}})
+    client.post("/signals/modes/waveform", json={"fileState": {**file_state, "formantEngine": "lpc"}})
+    client.post("/signals/modes/spectrogram", json={"fileState": file_state})
+    db_mock.fetch_file_metadata.return_value = {**db_mock.fetch_file_metadata.return_value, "id": 2}
+    client.post("/signals/modes/waveform", json={"fileState": {**file_state, "id": 2}})
+    stats = result_cache.stats()["memory"]
+    assert stats["entries"] == 3, "Expected a result per mode and parameters"
+    assert stats["hits"] == 2, "Expected other file state and another file with the same audio to hit"
+
+
 def test_signal_correct_spectrogram(db_mock, file_state):
     response = client.post("/signals/modes/spectrogram", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for spectrogram mode"
@@ -88,6 +254,108 @@ def test_signal_correct_spectrogram(db_mock, file_state):
     assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
+def test_signal_spectrogram_matrix_json(db_mock, file_state):
+    response = client.post("/signals/modes/spectrogram-matrix", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for spectrogram-matrix mode"
+    assert response.headers["content-type"] == "application/json", "Expected JSON without an Accept header"
+    result = response.json()
+    assert result["timeStep"] == pytest.approx(0.002), "Expected the time step of the spectrogram"
+    assert result["frequencyStep"] == pytest.approx(31.25), "Expected the frequency step of the window length"
+    assert len(result["data"]) == 160, "Expected a row for every frequency bin up to 5000 Hz"
+    assert len(result["data"][0]) > 2000, "Expected a column for every frame"
+
+
+def test_signal_spectrogram_matrix_binary(db_mock, file_state):
+    json_response = client.post("/signals/modes/spectrogram-matrix", json={"fileState": file_state})
+    response = client.post(
+        "/signals/modes/spectrogram-matrix",
+        json={"fileState": file_state},
+        headers={"Accept": "application/vnd.spectral.spectrogram+float32"},
+    )
+    assert response.status_code == 200, "Expected status code 200 for spectrogram-matrix mode"
+    assert response.headers["content-type"] == "application/vnd.spectral.spectrogram+float32"
+    header_length = int.from_bytes(response.content[:4], "little")
+    header = json.loads(response.content[4 : 4 + header_length])
+    values = np.frombuffer(response.content[4 + header_length :], dtype="<f4").reshape(header["shape"])
+    expected = np.array(json_response.json()["data"])
+    assert np.allclose(values, expected, rtol=1e-6, atol=0), "Expected the same values as the JSON response"
+    assert len(response.content) < len(json_response.content) / 3, "Expected a much smaller payload than JSON"
+
+
+def test_signal_peaks(db_mock, file_state):
+    file_state["peakCount"] = 100
+    response = client.post("/signals/modes/peaks", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for peaks mode"
+    peaks = response.json()
+    assert peaks["frameRate"] == typical_1_fs, "Expected the sample frequency of the file"
+    assert 50 < len(peaks["min"]) <= 100, "Expected the finest level with at most 100 peaks"
+    assert len(peaks["min"]) == len(peaks["max"]) == len(peaks["rms"]), "Expected an envelope value for every peak"
+    assert min(peaks["min"]) == min(typical_1_data), "Expected the minimum of the file"
+    assert max(peaks["max"]) == max(typical_1_data), "Expected the maximum of the file"
+    assert len(response.content) < 10_000, "Expected kilobytes instead of the samples"
+
+
+@pytest.mark.parametrize("peak_count", [0, -1, 1.5, "100", True])
+def test_signal_peaks_invalid_count(db_mock, file_state, peak_count):
+    file_state["peakCount"] = peak_count
+    response = client.post("/signals/modes/peaks", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for an invalid peak count"
+
+
+def test_spectrogram_tile(db_mock):
+    response = client.get("/signals/1/spectrogram/tiles/0/0")
+    assert response.status_code == 200, "Expected status code 200 for a spectrogram tile"
+    tile = response.json()
+    assert tile["maxZoom"] == 4, "Expected zoom levels until the whole file fits in a tile"
+    assert tile["tiles"] == 1, "Expected the whole file in one tile at zoom level 0"
+    assert len(tile["data"]) == 160, "Expected a row for every frequency bin"
+    assert 0 < len(tile["data"][0]) <= 256, "Expected at most a tile of frames"
+
+
+def test_spectrogram_tile_zoomed_in(db_mock):
+    response = client.get("/signals/1/spectrogram/tiles/2/1")
+    assert response.status_code == 200, "Expected status code 200 for a zoomed in spectrogram tile"
+    tile = response.json()
+    assert (tile["zoom"], tile["index"]) == (2, 1), "Expected the requested tile"
+    assert len(tile["data"]) == 160, "Expected a row for every frequency bin"
+
+    binary = client.get(
+        "/signals/1/spectrogram/tiles/2/1",
+        headers={"Accept": "application/vnd.spectral.spectrogram+float32"},
+    )
+    assert binary.status_code == 200, "Expected status code 200 for a zoomed in binary spectrogram tile"
+    header_length = int.from_bytes(binary.content[:4], "little")
+    header = json.loads(binary.content[4 : 4 + header_length])
+    values = np.frombuffer(binary.content[4 + header_length :], dtype="<f4").reshape(header["shape"])
+    assert np.allclose(values, np.array(tile["data"]), rtol=1e-6, atol=0), "Expected the same values as the JSON tile"
+
+
+def test_spectrogram_tiles_share_pyramid(db_mock, monkeypatch):
+    original = parselmouth.Sound.to_spectrogram
+    to_spectrogram = Mock()
+
+    def spy(self, *args, **kwargs):
+        to_spectrogram(*args, **kwargs)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(parselmouth.Sound, "to_spectrogram", spy)
+    for index in range(3):
+        response = client.get(
+            f"/signals/1/spectrogram/tiles/2/{index}",
+            headers={"Accept": "application/vnd.spectral.spectrogram+uint8"},
+        )
+        assert response.status_code == 200, "Expected status code 200 for a spectrogram tile"
+        assert response.headers["content-type"] == "application/vnd.spectral.spectrogram+uint8"
+    assert to_spectrogram.call_count == 1, "Expected the spectrogram to be computed once for all tiles"
+    assert db_mock.fetch_file.call_count == 1, "Expected the audio to be fetched once for all tiles"
+
+
+def test_spectrogram_tile_not_found(db_mock):
+    response = client.get("/signals/1/spectrogram/tiles/0/1")
+    assert response.status_code == 404, "Expected status code 404 for a tile outside of the file"
+    assert response.json()["detail"] == "Tile not found", "Expected detail message 'Tile not found'"
+
+
 def test_signal_correct_waveform(db_mock, file_state):
     response = client.post("/signals/modes/waveform", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for waveform mode"
@@ -97,6 +365,97 @@ def test_signal_correct_waveform(db_mock, file_state):
     assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
+def test_signal_waveform_time_window(db_mock, file_state):
+    whole = client.post("/signals/modes/waveform", json={"fileState": file_state}).json()
+    file_state.update({"startTime": 1.0, "endTime": 2.0})
+    response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for waveform mode with a time window"
+    window = response.json()
+    assert len(window["pitch"]) == 100, "Expected the pitch frames in the window"
+    assert len(window["formants"]) == 160, "Expected the formant frames in the window"
+    first_frame = round((window["pitchStartTime"] - whole["pitchStartTime"]) / whole["pitchTimeStep"])
+    assert window["pitch"] == whole["pitch"][first_frame : first_frame + 100], "Expected the pitch of the whole file"
+    assert (
+        1.0 <= window["formantsStartTime"] < 1.0 + window["formantsTimeStep"]
+    ), "Expected the first frame in the window"
+
+
+def test_signal_spectrogram_time_window(db_mock, file_state):
+    file_state.update({"startTime": 4.0})
+    response = client.post("/signals/modes/spectrogram", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for spectrogram mode with a time window"
+    result = response.json()
+    assert len(result["formants"]) == 87, "Expected the formant frames from the start time until the end"
+    assert result["startTime"] >= 4.0, "Expected the first frame in the window"
+
+
+@pytest.mark.parametrize(
+    "window",
+    [{"startTime": -1}, {"startTime": 2, "endTime": 1}, {"startTime": 1, "endTime": 1}, {"endTime": "2"}],
+)
+def test_signal_waveform_invalid_time_window(db_mock, file_state, window):
+    file_state.update(window)
+    response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for an invalid time window"
+
+
+def test_signal_waveform_yin_pitch_engine(db_mock, file_state):
+    praat = client.post("/signals/modes/waveform", json={"fileState": file_state}).json()
+    file_state.update({"pitchEngine": "yin"})
+    response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for waveform mode with the yin pitch engine"
+    yin = response.json()
+    assert len(yin["pitch"]) == len(praat["pitch"]), "Expected the frames of the praat pitch engine"
+    assert yin["pitchStartTime"] == praat["pitchStartTime"], "Expected the frames of the praat pitch engine"
+    assert yin["pitch"] != praat["pitch"], "Expected another pitch estimate"
+    assert yin["formants"] == praat["formants"], "Expected the formants not to depend on the pitch engine"
+
+    file_state.update({"startTime": 1.0, "endTime": 2.0})
+    window = client.post("/signals/modes/waveform", json={"fileState": file_state}).json()
+    first_frame = round((window["pitchStartTime"] - yin["pitchStartTime"]) / yin["pitchTimeStep"])
+    assert window["pitch"] == yin["pitch"][first_frame : first_frame + 100], "Expected the pitch of the whole file"
+
+
+def test_signal_simple_info_yin_pitch_engine(db_mock, file_state):
+    praat = client.post("/signals/modes/simple-info", json={"fileState": file_state}).json()
+    file_state.update({"pitchEngine": "yin"})
+    response = client.post("/signals/modes/simple-info", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for simple-info mode with the yin pitch engine"
+    assert 0 < response.json()["averagePitch"] != praat["averagePitch"], "Expected another average pitch"
+
+
+@pytest.mark.parametrize("mode", ["waveform", "simple-info"])
+def test_signal_invalid_pitch_engine(db_mock, file_state, mode):
+    file_state.update({"pitchEngine": "crepe"})
+    response = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for an unknown pitch engine"
+    assert response.json()["detail"] == "pitchEngine should be one of praat, yin", "Expected the known engines"
+
+
+@pytest.mark.parametrize("mode", ["waveform", "spectrogram"])
+def test_signal_lpc_formant_engine(db_mock, file_state, mode):
+    praat = client.post(f"/signals/modes/{mode}", json={"fileState": file_state}).json()
+    file_state.update({"formantEngine": "lpc"})
+    response = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 with the lpc formant engine"
+    lpc = response.json()
+    assert len(lpc["formants"]) == len(praat["formants"]), "Expected the frames of the praat formant engine"
+    assert lpc["formants"] != praat["formants"], "Expected other formant estimates"
+
+    file_state.update({"startTime": 1.0, "endTime": 2.0})
+    window = client.post(f"/signals/modes/{mode}", json={"fileState": file_state}).json()
+    assert len(window["formants"]) < len(lpc["formants"]), "Expected only the frames in the time window"
+    assert window["formants"][0] in lpc["formants"], "Expected the formants of the whole file"
+
+
+@pytest.mark.parametrize("mode", ["waveform", "spectrogram"])
+def test_signal_invalid_formant_engine(db_mock, file_state, mode):
+    file_state.update({"formantEngine": "burg"})
+    response = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for an unknown formant engine"
+    assert response.json()["detail"] == "formantEngine should be one of praat, lpc", "Expected the known engines"
+
+
 def test_signal_correct_vowel_space(db_mock, file_state):
     response = client.post("/signals/modes/vowel-space", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for vowel-space mode"
@@ -107,6 +466,176 @@ def test_signal_correct_vowel_space(db_mock, file_state):
     assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
+def test_signal_frames(db_mock, file_state):
+    frames = [{"startIndex": start, "endIndex": start + 640} for start in range(0, 64000, 3200)]
+    file_state["frames"] = frames
+    response = client.post("/signals/modes/frames", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for frames mode"
+    result = response.json()["frames"]
+    assert len(result) == len(frames), "Expected the info of every frame"
+    assert db_mock.fetch_file.call_count == 1, "Expected the file to be fetched once for all frames"
+    for frame, info in zip(frames[:3], result):
+        file_state["frame"] = frame
+        single = client.post("/signals/modes/simple-info", json={"fileState": file_state}).json()["frame"]
+        assert info == single, "Expected the same info as the frame of the simple-info mode"
+
+
+def test_signal_frames_in_worker_processes(db_mock, file_state, monkeypatch):
+    frames = [{"startIndex": start, "endIndex": start + 640} for start in range(0, 64000, 1600)]
+    file_state["frames"] = frames
+    expected = client.post("/signals/modes/frames", json={"fileState": file_state}).json()
+    result_cache.clear()
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        monkeypatch.setattr(mode_handler, "analysis_pool", lambda: pool)
+        response = client.post("/signals/modes/frames", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for frames mode"
+    assert response.json() == expected, "Expected the same info from the worker processes"
+
+
+@pytest.mark.parametrize(
+    ("frames", "detail"),
+    [
+        (None, "frames should be a list of frames"),
+        ([[0, 640]], "frames should be a list of frames"),
+        (
+            [{"startIndex": 0, "endIndex": 640}, {"startIndex": 0, "endIndex": 73041}],
+            "endIndex should be lower than the file length",
+        ),
+    ],
+)
+def test_signal_frames_invalid(db_mock, file_state, frames, detail):
+    file_state["frames"] = frames
+    response = client.post("/signals/modes/frames", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for invalid frames"
+    assert response.json()["detail"] == detail, "Expected the reason the frames are invalid"
+
+
+@pytest.mark.parametrize("formant_engine", ["praat", "lpc"])
+def test_signal_frames_from_tracks(db_mock, file_state, formant_engine):
+    file_state.update({"formantEngine": formant_engine})
+    waveform = client.post("/signals/modes/waveform", json={"fileState": file_state}).json()
+    frames = [{"startIndex": start, "endIndex": start + 1600} for start in range(0, 64000, 3200)]
+    file_state.update({"frames": frames, "frameEngine": "tracks"})
+    response = client.post("/signals/modes/frames", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for frames mode with the tracks frame engine"
+    result = response.json()["frames"]
+    for frame, info in zip(frames, result):
+        start_time, end_time = (frame["startIndex"] - 0.5) / 16000, (frame["endIndex"] - 0.5) / 16000
+        pitch_times = waveform["pitchStartTime"] + np.arange(len(waveform["pitch"])) * waveform["pitchTimeStep"]
+        pitch = np.array(waveform["pitch"])[(pitch_times >= start_time) & (pitch_times <= end_time)]
+        expected = np.median(pitch[pitch > 0]) if np.any(pitch > 0) else None
+        assert info["pitch"] == pytest.approx(expected), "Expected the median pitch of the frames of the waveform"
+        assert info["duration"] == pytest.approx(0.1), "Expected the duration of the frame"
+
+    file_state["frame"] = frames[5]
+    simple_info = client.post("/signals/modes/simple-info", json={"fileState": file_state}).json()
+    assert simple_info["frame"] == result[5], "Expected the frame of simple-info from the tracks"
+    vowel_space = client.post("/signals/modes/vowel-space", json={"fileState": file_state}).json()
+    assert vowel_space == {"f1": result[5]["f1"], "f2": result[5]["f2"]}, "Expected the formants from the tracks"
+
+
+@pytest.mark.parametrize("mode", ["simple-info", "vowel-space", "frames"])
+def test_signal_invalid_frame_engine(db_mock, file_state, mode):
+    file_state.update({"frameEngine": "fast", "frames": [{"startIndex": 0, "endIndex": 640}]})
+    response = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    assert response.status_code == 400, "Expected status code 400 for an unknown frame engine"
+    assert response.json()["detail"] == "frameEngine should be one of exact, tracks", "Expected the known engines"
+
+
+@pytest.fixture(scope="module")
+def mode_pool():
+    pool = ModePool(processes=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize(
+    ("mode", "state"),
+    [
+        ("simple-info", {}),
+        ("spectrogram", {"formantEngine": "lpc"}),
+        ("spectrogram-matrix", {}),
+        ("waveform", {"startTime": 1.0}),
+        ("peaks", {}),
+        ("vowel-space", {}),
+        ("frames", {"frames": [{"startIndex": start, "endIndex": start + 640} for start in range(0, 64000, 1600)]}),
+    ],
+)
+def test_signal_modes_in_mode_pool(db_mock, file_state, mode_pool, mode, state):
+    file_state.update(state)
+    expected = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    result_cache.clear()
+    app.state.mode_pool = mode_pool
+    try:
+        response = client.post(f"/signals/modes/{mode}", json={"fileState": file_state})
+    finally:
+        del app.state.mode_pool
+    assert response.status_code == 200, f"Expected status code 200 for {mode} mode in the mode pool"
+    assert response.content == expected.content, "Expected the same result as in the event loop"
+
+
+def test_signal_mode_pool_errors_and_tiles(db_mock, file_state, mode_pool):
+    expected = client.get("/signals/1/spectrogram/tiles/0/0")
+    result_cache.clear()
+    app.state.mode_pool = mode_pool
+    try:
+        tile = client.get("/signals/1/spectrogram/tiles/0/0")
+        missing = client.get("/signals/1/spectrogram/tiles/0/1")
+        file_state["pitchEngine"] = "crepe"
+        invalid = client.post("/signals/modes/waveform", json={"fileState": file_state})
+    finally:
+        del app.state.mode_pool
+    assert tile.content == expected.content, "Expected the same tile as in the event loop"
+    assert missing.status_code == 404, "Expected the HTTPException of the worker"
+    assert invalid.status_code == 400, "Expected the HTTPException of the worker"
+    assert invalid.json()["detail"] == "pitchEngine should be one of praat, yin", "Expected the detail of the worker"
+
+
+def test_stats_reports_worker_caches(db_mock, file_state, mode_pool):
+    app.state.mode_pool = mode_pool
+    try:
+        response = client.post("/signals/modes/waveform", json={"fileState": file_state})
+        stats = client.get("/stats").json()
+    finally:
+        del app.state.mode_pool
+    assert response.status_code == 200, "Expected status code 200 for waveform mode in the mode pool"
+    assert len(stats["workers"]) == 2, "Expected the stats of every worker"
+    assert stats["audioCache"]["entries"] >= 1, "Expected the audio decoded in a worker to be counted"
+    for cache in ("audioCache", "analysisCache"):
+        entries = sum(worker[cache]["entries"] for worker in stats["workers"])
+        assert stats[cache]["entries"] == entries, f"Expected the {cache} of the workers to be summed"
+    assert len(audio_cache) == 0, "Expected no audio decoded in the main process"
+    assert stats["wavCache"]["entries"] == 1, "Expected the wav of the file in the main process"
+
+
+def test_precompute_signal(db_mock):
+    job = {
+        "file": "1",
+        "status": "pending",
+        "attempts": 0,
+        "error": None,
+        "modifiedTime": "2024-05-21T09:58:42",
+        "updatedTime": "2024-05-21T09:58:43",
+    }
+    db_mock.enqueue_precompute_jobs = AsyncMock()
+    db_mock.fetch_precompute_job = AsyncMock(return_value=job)
+    response = client.post("/signals/1/precompute")
+    assert response.status_code == 202, "Expected status code 202 for a queued job"
+    assert response.json() == job, "Expected the job of the file"
+    db_mock.enqueue_precompute_jobs.assert_awaited_once_with(["1"])
+    assert client.get("/signals/1/precompute").json() == job, "Expected the state of the job"
+
+
+def test_precompute_signal_not_found(db_mock):
+    db_mock.enqueue_precompute_jobs = AsyncMock()
+    db_mock.fetch_precompute_job = AsyncMock(side_effect=FileNotFoundError)
+    response = client.post("/signals/1/precompute")
+    assert response.status_code == 404, "Expected status code 404 for an unknown file"
+    assert response.json()["detail"] == "File not found", "Expected detail message 'File not found'"
+    response = client.get("/signals/1/precompute")
+    assert response.status_code == 404, "Expected status code 404 without a job"
+
+
 def test_signal_correct_transcription(db_mock, file_state):
     response = client.post("/signals/modes/transcription", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for transcription mode"
@@ -187,7 +716,7 @@ def test_signal_mode_simple_info_with_frame(db_mock, file_state):
     response = client.post("/signals/modes/simple-info", json={"fileState": file_state})
     assert response.status_code == 200, "Expected status code 200 for simple info mode with frame"
     result = response.json()
-    assert result["fileSize"] == 146158, "Expected file size to be 146158"
+    assert result["fileSize"] == 146124, "Expected file size to be the size of the stored file"
     assert result["fileCreationDate"] == "1970-01-01T00:00:01Z", "Expected creation date to be '1970-01-01T00:00:01Z'"
     assert result["averagePitch"] == pytest.approx(34.38, 0.1), "Expected average pitch to be approximately 34.38"
     assert result["duration"] == pytest.approx(4.565, 0.01), "Expected duration to be approximately 4.565"
@@ -211,6 +740,92 @@ def test_signal_mode_vowel_space_mode_with_frame(db_mock, file_state):
     assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
+def session_files(*file_ids):
+    async def fetch_files(ids, columns=None):
+        for file_id in ids:
+            if file_id in file_ids:
+                yield {"id": file_id, "data": control_sentence, "creationTime": 1, "modifiedTime": 1}
+
+    return Mock(side_effect=fetch_files)
+
+
+def test_session_mode_simple_info(db_mock):
+    db_mock.fetch_session_file_ids = AsyncMock(return_value=["a", "b"])
+    db_mock.fetch_files = session_files("a", "b")
+    response = client.post("/sessions/session-1/modes/simple-info", json={"fileState": {"frame": None}})
+    assert response.status_code == 200, "Expected status code 200 for simple info mode on a session"
+    result = response.json()
+    assert list(result.keys()) == ["a", "b"], "Expected a result for every file in the session"
+    for file_result in result.values():
+        assert file_result["fileSize"] == 146124, "Expected file size to be the size of the stored file"
+        assert file_result["duration"] == pytest.approx(4.565, 0.01), "Expected duration to be approximately 4.565"
+    db_mock.fetch_session_file_ids.assert_called_once_with("session-1")
+    db_mock.fetch_files.assert_called_once_with(["a", "b"], columns=("id", "data", "creation_time", "modified_time"))
+    assert db_mock.fetch_file.call_count == 0, "Expected fetch_file not to be called"
+
+
+def test_session_mode_uses_cached_files(db_mock):
+    db_mock.fetch_session_file_ids = AsyncMock(return_value=["a", "b"])
+    db_mock.fetch_files = session_files("a", "b")
+    client.post("/signals/modes/waveform", json={"fileState": {"id": "a"}})
+    db_mock.fetch_file_metadata.return_value = {**db_mock.fetch_file_metadata.return_value, "id": "a"}
+    response = client.post("/sessions/session-1/modes/waveform", json={"fileState": {}})
+    assert response.status_code == 200, "Expected status code 200 for waveform mode on a session"
+    assert list(response.json().keys()) == ["a", "b"], "Expected a result for every file in the session"
+    db_mock.fetch_file_metadata.assert_called_once_with("a")
+    db_mock.fetch_files.assert_called_once_with(["b"], columns=("id", "data", "creation_time", "modified_time"))
+
+    response = client.post("/sessions/session-1/modes/waveform", json={"fileState": {}})
+    assert db_mock.fetch_files.call_count == 1, "Expected the files of the session to be cached"
+    assert db_mock.fetch_file.call_count == 1, "Expected only the metadata of the cached files"
+
+
+def test_session_mode_vowel_space(db_mock):
+    db_mock.fetch_session_file_ids = AsyncMock(return_value=["a"])
+    db_mock.fetch_files = session_files("a")
+    file_state = {"frame": {"startIndex": 22500, "endIndex": 23250}}
+    response = client.post("/sessions/session-1/modes/vowel-space", json={"fileState": file_state})
+    assert response.status_code == 200, "Expected status code 200 for vowel-space mode on a session"
+    result = response.json()
+    assert result["a"]["f1"] == pytest.approx(623.19, 0.1), "Expected frame f1 to be approximately 623.19"
+    assert result["a"]["f2"] == pytest.approx(1635.4, 0.1), "Expected frame f2 to be approximately 1635.4"
+
+
+def test_session_mode_skips_missing_files(db_mock):
+    db_mock.fetch_session_file_ids = AsyncMock(return_value=["a", "b"])
+    db_mock.fetch_files = session_files("b")
+    response = client.post("/sessions/session-1/modes/vowel-space", json={"fileState": {}})
+    assert response.status_code == 200, "Expected status code 200 for vowel-space mode on a session"
+    assert response.json() == {"b": None}, "Expected only the existing file to be analyzed"
+
+
+def test_session_mode_closes_files_on_error():
+    closed = []
+
+    async def fetch_files(ids, columns=None):
+        try:
+            for file_id in ids:
+                yield {"id": file_id, "data": b"not audio", "creationTime": 1}
+        finally:
+            closed.append(True)
+
+    async def run():
+        with pytest.raises(HTTPException):
+            await mode_handler.session_mode(database, "session-1", "simple-info", {})
+        # before the event loop finalizes the generator
+        assert closed == [True], "Expected the files to be closed when an analysis raises"
+
+    database = Mock()
+    database.fetch_session_file_ids = AsyncMock(return_value=["a", "b"])
+    database.fetch_files = Mock(side_effect=fetch_files)
+    asyncio.run(run())
+
+
+def test_session_mode_wrong_mode(db_mock):
+    response = client.post("/sessions/session-1/modes/error-rate", json={"fileState": {}})
+    assert response.status_code == 422, "Expected status code 422 for a mode that does not run on files"
+
+
 def test_signal_mode_transcription_db_problem(db_mock):
     db_mock.fetch_file.side_effect = HTTPException(status_code=500, detail="database error")
     response = client.get("/transcription/deepgram/1")
@@ -274,15 +889,6 @@ def test_transcribe_file_no_api_key(db_mock):
         assert db_mock.fetch_file.call_count == 1, "Expected fetch_file to be called once"
 
 
-@pytest.fixture
-def mock_db(mocker):
-    mock_db_class = mocker.patch("spectral.database.Database")
-    mock_db_instance = mock_db_class.return_value
-    mock_db_instance.connection = Mock()
-    mock_db_instance.close = Mock()
-    return mock_db_instance
-
-
 def test_error_rate_no_reference(db_mock, file_state):
     response = client.post("/signals/modes/error-rate", json={"fileState": file_state})
 
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+from scipy.signal import lfilter
+from spectral.fast_formants import levinson_durbin, lpc_formants, polynomial_roots
+from spectral.signal_analysis import FORMANT_CEILING, frame_grid, load_wav
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+torgo_files = sorted(os.listdir(os.path.join(data_dir, "torgo-dataset")))
+
+
+def vowel_signal(formants, fs=16000, f0=120.0, duration=1.0):
+    """A pulse train through a cascade of resonators, like a synthetic vowel."""
+    samples = np.zeros(int(fs * duration))
+    samples[:: int(fs / f0)] = 1.0
+    for frequency in formants:
+        radius = np.exp(-np.pi * 80 / fs)
+        samples = lfilter([1.0], [1.0, -2 * radius * np.cos(2 * np.pi * frequency / fs), radius**2], samples)
+    return samples
+
+
+def test_levinson_durbin_solves_normal_equations():
+    frames = np.random.default_rng(0).standard_normal((3, 400))
+    autocorrelation = np.stack([[frame[: 400 - lag] @ frame[lag:] for lag in range(9)] for frame in frames])
+    coefficients = levinson_durbin(autocorrelation, 8)
+    for row, frame_coefficients in zip(autocorrelation, coefficients):
+        toeplitz = row[np.abs(np.arange(8)[:, None] - np.arange(8))]
+        expected = np.linalg.solve(toeplitz, -row[1:9])
+        assert frame_coefficients == pytest.approx(np.concatenate([[1.0], expected])), "Expected the LPC solution"
+
+
+def test_levinson_durbin_silent_frames():
+    coefficients = levinson_durbin(np.zeros((2, 5)), 4)
+    assert np.isnan(coefficients).all(), "Expected no coefficients without energy"
+
+
+def test_polynomial_roots():
+    roots = polynomial_roots(np.array([[1.0, -3.0, 2.0], [1.0, 0.0, -4.0]]))
+    assert np.sort(roots.real, axis=1) == pytest.approx(np.array([[1.0, 2.0], [-2.0, 2.0]])), "Expected the roots"
+
+
+@pytest.mark.parametrize("fs", [11000, 16000, 44100])
+def test_lpc_formants_synthetic_vowel(fs):
+    centers = np.arange(0.1, 0.9, 0.01) * fs
+    resonances = [600.0, 1200.0, 2500.0, 3500.0, 4500.0]
+    tracks = lpc_formants(vowel_signal(resonances, fs), fs, centers, 0.025, 5)
+    assert tracks.shape == (len(centers), 5), "Expected five formants for every frame"
+    # like with Burg, the pre-emphasis raises the first formant a bit
+    assert np.median(tracks, axis=0) == pytest.approx(resonances, rel=0.15), "Expected the resonances"
+
+
+def test_lpc_formants_silence_and_no_frames():
+    assert np.isnan(lpc_formants(np.zeros(16000), 16000, np.array([8000]), 0.025, 5)).all(), "Expected silence"
+    assert lpc_formants(np.zeros(100), 16000, np.array([]), 0.025, 5).shape == (0, 5), "Expected no frames"
+
+
+def test_lpc_formants_subset_of_frames():
+    samples = vowel_signal([500.0, 1500.0], 16000)
+    centers = np.arange(400, 15600, 100)
+    tracks = lpc_formants(samples, 16000, centers, 0.025, 2)
+    subset = lpc_formants(samples, 16000, centers[40:60], 0.025, 2)
+    assert subset == pytest.approx(tracks[40:60], nan_ok=True), "Expected the same formants for a subset of frames"
+
+
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_lpc_formants_close_to_burg(file_name):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        sound = load_wav(f.read()).sound
+    formant = sound.resample(2 * FORMANT_CEILING).to_formant_burg(time_step=0.00625, window_length=0.025)
+    burg = np.array([[formant.get_value_at_time(i, t) for i in (1, 2)] for t in formant.xs()])
+    n_frames, first_frame_time = frame_grid(sound, 0.05, 0.00625, 2 * FORMANT_CEILING)
+    assert n_frames == formant.nt, "Expected the frames of the Burg analysis"
+    centers = (first_frame_time + np.arange(n_frames) * 0.00625 - sound.x1) / sound.dx
+    lpc = lpc_formants(sound.as_array()[0], sound.sampling_frequency, centers, 0.025, 2)
+    assert np.mean(np.isnan(lpc[:, 0]) == np.isnan(burg[:, 0])) > 0.95, "Expected mostly the same defined frames"
+    difference = np.abs(lpc - burg) / burg
+    assert np.nanmedian(difference) < 0.1, "Expected mostly the same formants as Burg"
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+from spectral.fast_pitch import yin_pitch
+from spectral.signal_analysis import frame_grid, load_wav
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+torgo_files = sorted(os.listdir(os.path.join(data_dir, "torgo-dataset")))
+
+
+def harmonic_signal(f0, fs=16000, duration=1.0):
+    t = np.arange(int(fs * duration)) / fs
+    return sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+
+
+@pytest.mark.parametrize("fs", [8000, 16000, 44100])
+@pytest.mark.parametrize("f0", [80.0, 123.4, 220.0, 550.0])
+def test_yin_pitch_harmonic_signal(f0, fs):
+    centers = np.arange(0.1, 0.9, 0.01) * fs
+    pitch = yin_pitch(harmonic_signal(f0, fs), fs, centers, 75.0)
+    assert pitch == pytest.approx(np.full(len(centers), f0), rel=0.01), "Expected the fundamental frequency"
+
+
+def test_yin_pitch_silence_is_unvoiced():
+    samples = harmonic_signal(200.0)
+    samples[8000:] *= 0.001
+    pitch = yin_pitch(samples, 16000, np.array([4000, 12000]), 75.0)
+    assert pitch[0] == pytest.approx(200.0, rel=0.005), "Expected the loud frame to be voiced"
+    assert pitch[1] == 0, "Expected the frame below the silence threshold to be unvoiced"
+    assert yin_pitch(samples[8000:], 16000, np.array([4000]), 75.0, peak=np.abs(samples).max())[0] == 0, "Global peak"
+
+
+def test_yin_pitch_noise_is_unvoiced():
+    samples = np.random.default_rng(0).standard_normal(16000)
+    assert np.mean(yin_pitch(samples, 16000, np.arange(800, 15200, 160), 75.0) > 0) < 0.1, "Expected no pitch"
+
+
+def test_yin_pitch_no_frames():
+    assert len(yin_pitch(np.zeros(100), 16000, np.array([]), 75.0)) == 0, "Expected no frames"
+    assert yin_pitch(np.zeros(16000), 16000, np.array([8000]), 75.0).tolist() == [0], "Expected silence"
+
+
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_yin_pitch_close_to_praat(file_name):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        sound = load_wav(f.read()).sound
+    praat = sound.to_pitch(time_step=0.01).selected_array["frequency"]
+    n_frames, first_frame_time = frame_grid(sound, 0.04, 0.01)
+    centers = (first_frame_time + np.arange(n_frames) * 0.01 - sound.x1) / sound.dx
+    yin = yin_pitch(sound.as_array()[0], sound.sampling_frequency, centers, 75.0)
+    assert np.mean((yin > 0) == (praat > 0)) > 0.8, "Expected mostly the same voicing as Praat"
+    voiced = (yin > 0) & (praat > 0)
+    cents = np.abs(1200 * np.log2(yin[voiced] / praat[voiced]))
+    assert np.median(cents) < 25, "Expected mostly the same pitch as Praat"
@@ -1,13 +1,20 @@
 import pytest
 import math
 from spectral.frame_analysis import (
+    FRAME_BATCH_SIZE,
+    batch_frame_info,
     calculate_frame_duration,
     calculate_frame_pitch,
     calculate_frame_f1_f2,
+    simple_frame_info,
+    track_median,
 )
 import json
 import os
 from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # Load the JSON file
 with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), "data/frames.json"), "r") as file:
@@ -97,3 +104,24 @@ def test_formants_empty_frame():
     assert len(formants) == 2, "Expected two formants for empty frame"
     assert math.isnan(formants[0]), "Expected first formant (f1) for empty frame to be NaN"
     assert math.isnan(formants[1]), "Expected second formant (f2) for empty frame to be NaN"
+
+
+def test_batch_frame_info_in_worker_processes():
+    samples = np.concatenate([frame_data[name]["data"] for name in ("voiced-1", "unvoiced-1", "noise-1")])
+    fs = frame_data["voiced-1"]["fs"]
+    frames = [{"startIndex": start, "endIndex": start + 480} for start in range(0, len(samples) - 480, 60)]
+    assert len(frames) > 2 * FRAME_BATCH_SIZE, "Expected several batches"
+    expected = np.array([list(simple_frame_info(samples, fs, frame).values()) for frame in frames])
+    actual = np.array([list(info.values()) for info in batch_frame_info(samples, fs, frames)])
+    np.testing.assert_array_equal(actual, expected, "Expected the info of every frame")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        actual = np.array([list(info.values()) for info in batch_frame_info(samples, fs, frames, pool)])
+    np.testing.assert_array_equal(actual, expected, "Expected the same info from the worker processes")
+
+
+def test_track_median_frames_in_window():
+    values = np.array([100.0, np.nan, 120.0, 130.0, 200.0])
+    assert track_median(values, 0.01, 0.005, 0.0, 0.04) == 120.0, "Expected the median of the defined values"
+    assert track_median(values, 0.01, 0.005, 0.027, 0.029) == 120.0, "Expected the frame nearest to a short window"
+    assert math.isnan(track_median(values, 0.01, 0.005, 0.01, 0.02)), "Expected NaN without defined values"
+    assert math.isnan(track_median(np.array([]), 0.01, 0.005, 0.0, 0.1)), "Expected NaN without frames"
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from spectral.mode_pool import (
+    PACK_MIN_LENGTH,
+    ModePool,
+    PackedArray,
+    pack_payload,
+    parse_mode_limits,
+    run_analysis,
+    unpack_payload,
+    worker_file,
+)
+from spectral import signal_analysis
+from spectral.signal_analysis import load_wav
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+
+
+@pytest.fixture(scope="module")
+def mode_pool():
+    pool = ModePool(processes=2, limits={"slow": 1})
+    yield pool
+    pool.shutdown()
+
+
+def timed_analysis(file, file_state):
+    start = time.monotonic()
+    time.sleep(file_state["sleep"])
+    return {"start": start, "end": time.monotonic()}
+
+
+def long_analysis(file, file_state):
+    return {"id": file["id"], "data": [[float(i), None] for i in range(file_state["length"])]}
+
+
+def failing_analysis(file, file_state):
+    raise HTTPException(status_code=400, detail="invalid file state")
+
+
+def audio_analysis(file, file_state):
+    cached = signal_analysis.audio_cache.get(signal_analysis.audio_cache_key(file)) is not None
+    audio = signal_analysis.get_audio(file)
+    return {"frameRate": audio.frame_rate, "length": len(audio.samples), "cached": cached}
+
+
+def worker_pid(file, file_state):
+    return os.getpid()
+
+
+def exiting_analysis(file, file_state):
+    os._exit(1)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"data": [0.5] * PACK_MIN_LENGTH},
+        {"data": [1, 2, 3] * PACK_MIN_LENGTH},
+        {"data": [[0.5, None]] * PACK_MIN_LENGTH, "time_step": 0.01},
+        [{"f1": 0.5, "f2": None}] * PACK_MIN_LENGTH,
+        {"data": ["a"] * PACK_MIN_LENGTH},
+        {"data": [[0.5], [0.5, 1.0]] * PACK_MIN_LENGTH},
+        {"data": [0.5, None, 2]},
+        None,
+    ],
+)
+def test_pack_payload_round_trip(payload):
+    assert unpack_payload(pack_payload(payload)) == payload, "Expected the same payload after unpacking"
+
+
+def test_pack_payload_packs_long_lists_of_numbers():
+    packed = pack_payload({"pitch": [100.0] * PACK_MIN_LENGTH, "formants": [[None, 1.0]] * PACK_MIN_LENGTH})
+    assert isinstance(packed["pitch"], PackedArray), "Expected a long list of floats to be packed"
+    assert isinstance(packed["formants"], PackedArray), "Expected a long list of formants to be packed"
+    assert np.isnan(packed["formants"].array[:, 0]).all(), "Expected None to be packed as NaN"
+    assert pack_payload({"pitch": [100.0]}) == {"pitch": [100.0]}, "Expected a short list not to be packed"
+
+
+def test_parse_mode_limits():
+    assert parse_mode_limits("") == {}, "Expected no limits"
+    assert parse_mode_limits("spectrogram=1, waveform = 2") == {"spectrogram": 1, "waveform": 2}, "Expected limits"
+
+
+def test_worker_file_sends_only_wav_data():
+    with open(os.path.join(data_dir, "torgo-dataset", "MC02_control_head_sentence1.wav"), mode="rb") as f:
+        data = f.read()
+    file = worker_file({"id": 1, "modifiedTime": 1, "data": data, "audio": load_wav(data), "analysis": object()})
+    assert set(file) == {"id", "modifiedTime", "data"}, "Expected the decoded audio and analysis context to stay behind"
+
+
+def test_mode_pool_runs_analysis(mode_pool):
+    result = asyncio.run(mode_pool.run("waveform", long_analysis, {"id": 1}, {"length": 1000}))
+    assert result == long_analysis({"id": 1}, {"length": 1000}), "Expected the result of the analysis"
+
+
+def test_mode_pool_decodes_audio_in_worker(mode_pool):
+    with open(os.path.join(data_dir, "torgo-dataset", "MC02_control_head_sentence1.wav"), mode="rb") as f:
+        file = {"id": "decoded", "modifiedTime": 1, "data": f.read()}
+    first = asyncio.run(mode_pool.run("peaks", audio_analysis, file, {}))
+    second = asyncio.run(mode_pool.run("peaks", audio_analysis, file, {}))
+    audio = load_wav(file["data"])
+    expected = {"frameRate": audio.frame_rate, "length": len(audio.samples), "cached": False}
+    assert first == expected, "Expected the audio decoded in the worker"
+    assert second["cached"], "Expected the worker to keep the decoded audio"
+    assert len(signal_analysis.audio_cache) == 0, "Expected no decoded audio in this process"
+
+
+def test_mode_pool_raises_http_exceptions(mode_pool):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(mode_pool.run("waveform", failing_analysis, {}, {}))
+    assert e.value.status_code == 400, "Expected the status code of the analysis"
+    assert e.value.detail == "invalid file state", "Expected the detail of the analysis"
+    assert asyncio.run(mode_pool.run("waveform", long_analysis, {"id": 2}, {"length": 1}))["id"] == 2, "Pool works"
+
+
+def test_mode_pool_limits_concurrency_per_mode(mode_pool):
+    async def run_both(mode):
+        return await asyncio.gather(*(mode_pool.run(mode, timed_analysis, {}, {"sleep": 0.3}) for _ in range(2)))
+
+    first, second = sorted(asyncio.run(run_both("slow")), key=lambda result: result["start"])
+    assert second["start"] >= first["end"], "Expected the limited mode to run one analysis at a time"
+    first, second = sorted(asyncio.run(run_both("fast")), key=lambda result: result["start"])
+    assert second["start"] < first["end"], "Expected the other modes to run analyses in parallel"
+
+
+def worker_analysis(file, file_state):
+    return {
+        "pid": os.getpid(),
+        "chunked": signal_analysis.analysis_pool() is not None,
+        "analysisCacheSize": signal_analysis.analysis_cache.max_size,
+    }
+
+
+def test_mode_pool_routes_files_to_workers(mode_pool):
+    async def run_twice(file_ids):
+        rounds = []
+        for _ in range(2):
+            runs = (mode_pool.run("routed", worker_analysis, {"id": i}, {}) for i in file_ids)
+            rounds.append(await asyncio.gather(*runs))
+        return rounds
+
+    file_ids = [str(i) for i in range(8)]
+    first, second = asyncio.run(run_twice(file_ids))
+    assert [r["pid"] for r in first] == [r["pid"] for r in second], "Expected every file on the same worker"
+    assert len({r["pid"] for r in first}) == 2, "Expected the files to be spread over the workers"
+    workers = {}
+    for file_id, result in zip(file_ids, first):
+        workers.setdefault(mode_pool.worker_index({"id": file_id}), set()).add(result["pid"])
+    assert all(len(pids) == 1 for pids in workers.values()), "Expected a worker per index"
+    assert {r["analysisCacheSize"] for r in first} == {signal_analysis.analysis_cache.max_size // 2}, "Split budget"
+
+
+def test_mode_pool_workers_analyse_in_chunks():
+    pool = ModePool(processes=1, analysis_processes=2)
+    try:
+        assert asyncio.run(pool.run("waveform", worker_analysis, {"id": "1"}, {}))["chunked"], "Expected a pool"
+    finally:
+        pool.shutdown()
+    pool = ModePool(processes=1, analysis_processes=1)
+    try:
+        assert not asyncio.run(pool.run("waveform", worker_analysis, {"id": "1"}, {}))["chunked"], "Expected no pool"
+    finally:
+        pool.shutdown()
+
+
+def test_mode_pool_replaces_exited_worker():
+    pool = ModePool(processes=1, analysis_processes=1)
+    try:
+        pid = asyncio.run(pool.run("waveform", worker_pid, {"id": "1"}, {}))
+        os.kill(pid, signal.SIGKILL)
+        assert asyncio.run(pool.cache_stats())["workers"] == [None], "Expected no stats of the killed worker"
+        new_pid = asyncio.run(pool.run("waveform", worker_pid, {"id": "1"}, {}))
+        assert new_pid != pid, "Expected the killed worker to be replaced"
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(pool.run("waveform", exiting_analysis, {"id": "1"}, {}))
+        assert e.value.status_code == 503, "Expected an analysis that keeps stopping its worker to be given up"
+        assert asyncio.run(pool.run("waveform", worker_pid, {"id": "1"}, {})) not in (pid, new_pid), "Replaced"
+    finally:
+        pool.shutdown()
+
+
+def test_run_analysis_without_pool():
+    result = asyncio.run(run_analysis(None, "waveform", long_analysis, {"id": 1}, {"length": 2}))
+    assert result == {"id": 1, "data": [[0.0, None], [1.0, None]]}, "Expected the analysis to run in this process"
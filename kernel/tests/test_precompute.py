@@ -0,0 +1,140 @@
+import asyncio
+import os
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from spectral.mode_handler import wav_cache
+from spectral.mode_pool import ModePool
+from spectral.precompute import PRECOMPUTE_ANALYSES, PRECOMPUTE_NEW_FILES_AGE, PrecomputeWorker, precompute_file
+from spectral.result_cache import audio_digest_cache, result_cache, result_cache_key
+from spectral.signal_analysis import analysis_cache, audio_cache, audio_cache_key
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+
+with open(os.path.join(data_dir, "torgo-dataset", "MC02_control_head_sentence1.wav"), mode="rb") as f:
+    control_sentence = f.read()
+
+modified_time = datetime(2024, 5, 21)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in (audio_cache, wav_cache, analysis_cache, result_cache, audio_digest_cache):
+        cache.clear()
+    yield
+    for cache in (audio_cache, wav_cache, analysis_cache, result_cache, audio_digest_cache):
+        cache.clear()
+
+
+@pytest.fixture
+def database():
+    mock = Mock()
+    mock.fetch_file_metadata = AsyncMock(
+        return_value={"id": "1", "fileSize": len(control_sentence), "creationTime": 1, "modifiedTime": modified_time}
+    )
+    mock.fetch_file = AsyncMock(
+        return_value={"id": "1", "data": control_sentence, "creationTime": 1, "modifiedTime": modified_time}
+    )
+    mock.claim_precompute_job = AsyncMock(return_value={"file": "1", "modifiedTime": modified_time})
+    mock.finish_precompute_job = AsyncMock()
+    mock.enqueue_new_files = AsyncMock()
+    mock.close = AsyncMock()
+    return mock
+
+
+def test_precompute_file_warms_caches(database):
+    asyncio.run(precompute_file(database, "1"))
+    assert audio_cache.get(("1", modified_time)) is not None, "Expected the decoded audio to be cached"
+    file = {"id": "1", "modifiedTime": modified_time, "data": control_sentence}
+    context = analysis_cache.get(("1", modified_time))
+    assert context is not None, "Expected the analysis context to be cached"
+    analyses = {key[0] for key in context._analyses}
+    assert {"pitch_track", "formant_tracks", "peak_pyramid", "spectrogram_pyramid"} <= analyses, "Expected the tracks"
+    for mode, _, file_state in PRECOMPUTE_ANALYSES:
+        assert result_cache.get(result_cache_key(mode, file, file_state)) is not None, f"Expected the {mode} result"
+
+
+def cached_analyses(file, file_state):
+    context = analysis_cache.get(audio_cache_key(file))
+    return None if context is None else sorted({key[0] for key in context._analyses})
+
+
+def test_precompute_file_warms_worker_caches(database):
+    pool = ModePool(processes=2, analysis_processes=1)
+    try:
+        asyncio.run(precompute_file(database, "1", pool))
+        file = {"id": "1", "modifiedTime": modified_time}
+        analyses = asyncio.run(pool.run("cached-analyses", cached_analyses, file, {}))
+    finally:
+        pool.shutdown()
+    assert analyses is not None, "Expected the analysis context in the worker of the file"
+    assert len(audio_cache) == 0, "Expected the audio to be decoded only in the worker"
+    expected = {"pitch_track", "formant_tracks", "peak_pyramid", "spectrogram_pyramid"}
+    assert expected <= set(analyses), "Expected the tracks and pyramids in the worker of the file"
+
+
+def test_precompute_worker_runs_job(database):
+    worker = PrecomputeWorker(AsyncMock(return_value=database), workers=1)
+    assert asyncio.run(worker.run_job()), "Expected a job to be run"
+    database.finish_precompute_job.assert_awaited_once_with("1", modified_time, None)
+    assert database.close.await_count == 3, "Expected a connection to claim, to fetch and to finish the job"
+    assert result_cache.stats()["memory"]["entries"] == len(PRECOMPUTE_ANALYSES), "Expected the results to be cached"
+
+
+class ConnectionCheckingPool:
+    """Runs analyses like a `ModePool`, and records the open connections meanwhile."""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.open_connections = []
+
+    async def run(self, mode, analysis, file, file_state):
+        self.open_connections.append(self.connections["open"])
+        return analysis(file, file_state)
+
+
+def test_precompute_worker_releases_connection_during_analyses(database):
+    connections = {"open": 0}
+
+    async def open_database():
+        connections["open"] += 1
+        return database
+
+    async def close(commit=True):
+        connections["open"] -= 1
+
+    database.close = AsyncMock(side_effect=close)
+    pool = ConnectionCheckingPool(connections)
+    worker = PrecomputeWorker(open_database, pool, workers=1)
+    assert asyncio.run(worker.run_job()), "Expected a job to be run"
+    assert pool.open_connections == [0] * len(PRECOMPUTE_ANALYSES), "Expected no connection held by the analyses"
+    assert connections["open"] == 0, "Expected every connection to be closed"
+
+
+def test_precompute_worker_marks_failed_jobs(database):
+    database.fetch_file.side_effect = FileNotFoundError
+    worker = PrecomputeWorker(AsyncMock(return_value=database), workers=1)
+    assert asyncio.run(worker.run_job()), "Expected a job to be run"
+    database.finish_precompute_job.assert_awaited_once_with("1", modified_time, "404: File not found")
+    assert database.close.await_count == 3, "Expected the connection of the failed fetch to be closed"
+
+
+def test_precompute_worker_enqueues_new_files_when_idle(database):
+    database.claim_precompute_job.return_value = None
+    worker = PrecomputeWorker(AsyncMock(return_value=database), workers=1)
+    assert not asyncio.run(worker.run_job()), "Expected no job to be run"
+    database.enqueue_new_files.assert_awaited_once_with(PRECOMPUTE_NEW_FILES_AGE)
+    database.close.assert_awaited_once()
+
+
+def test_precompute_worker_start_and_stop(database):
+    async def run():
+        worker = PrecomputeWorker(AsyncMock(return_value=database), workers=2, poll_interval=0.01)
+        database.claim_precompute_job.return_value = None
+        worker.start()
+        await asyncio.sleep(0.05)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert database.enqueue_new_files.await_count >= 2, "Expected the workers to poll for new files"
@@ -0,0 +1,271 @@
+import asyncio
+import io
+import os
+import wave
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from spectral import result_cache as cache_module
+from spectral.mode_pool import PACK_MIN_LENGTH
+from spectral.result_cache import (
+    DiskCache,
+    ResultCache,
+    audio_digest,
+    cached_analysis,
+    decode_result,
+    encode_result,
+    result_cache_key,
+)
+from spectral.signal_analysis import audio_cache
+
+
+def make_wav(samples, frame_rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(frame_rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def wav():
+    return make_wav(np.arange(1000))
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache_module.result_cache.clear()
+    cache_module.audio_digest_cache.clear()
+    cache_module.running_analyses.clear()
+    yield
+    cache_module.result_cache.clear()
+    cache_module.audio_digest_cache.clear()
+    cache_module.running_analyses.clear()
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"pitch": [100.0, None], "pitchTimeStep": 0.01},
+        {"formants": [[500.0, None]] * PACK_MIN_LENGTH, "pitch": [1.5] * PACK_MIN_LENGTH, "peaks": [3] * 300},
+        {"frames": [{"duration": 0.04, "pitch": None, "f1": 500.0, "f2": 1500.0}] * 3},
+        [[float(i)] * 5 for i in range(PACK_MIN_LENGTH)],
+        {"fileCreationDate": 1, "name": "a", "cycle": True},
+        None,
+    ],
+)
+def test_encode_result_round_trip(result):
+    assert decode_result(encode_result(result)) == result, "Expected the same result after decoding"
+
+
+def test_encode_result_non_finite_floats():
+    decoded = decode_result(encode_result({"pitch": float("nan"), "values": [float("inf"), -float("inf")]}))
+    assert np.isnan(decoded["pitch"]), "Expected NaN to stay NaN"
+    assert decoded["values"] == [float("inf"), -float("inf")], "Expected infinity to stay infinity"
+
+
+def test_encode_result_arrays():
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)[:, 1:]
+    decoded = decode_result(encode_result({"timeStep": 0.01, "data": data}))
+    assert isinstance(decoded["data"], np.ndarray), "Expected an array to stay an array"
+    assert decoded["data"].dtype == np.float32, "Expected the type of the array"
+    np.testing.assert_array_equal(decoded["data"], data)
+
+
+def test_encode_result_is_compact():
+    result = {"formants": [[500.0, 1500.0, None, 3500.0, 4500.0]] * 1000}
+    assert len(encode_result(result)) < 1000 * 5 * 8 + 200, "Expected the numbers as a binary buffer"
+
+
+def test_encode_result_datetime_and_invalid():
+    date = datetime(2024, 5, 21, 9, 58, 42)
+    assert decode_result(encode_result({"date": date})) == {"date": date.isoformat()}, "Expected an ISO date"
+    with pytest.raises(TypeError):
+        encode_result({"value": object()})
+    with pytest.raises(ValueError, match="Not an encoded result"):
+        decode_result(b"not a result")
+
+
+def test_decode_result_damaged():
+    data = encode_result({"formants": [[500.0, None]] * PACK_MIN_LENGTH})
+    for damaged in (data[:6], data[:-8], data[:12] + b"{" + data[13:]):
+        with pytest.raises(ValueError):
+            decode_result(damaged)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") == b"a" * 100, "Expected the stored entry"
+    cache.put("c", b"c" * 100)
+    assert cache.get("b") is None, "Expected the least recently used entry to be evicted"
+    assert cache.get("a") == b"a" * 100, "Expected the recently used entry to be kept"
+    cache.put("d", b"d" * 300)
+    assert cache.get("d") is None, "Expected an entry larger than the budget not to be stored"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.bin", "c.bin"], "Expected only the cached files"
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "evictions": 1,
+        "entries": 2,
+        "size": 200,
+        "maxSize": 250,
+    }, "Expected the counters of the cache"
+
+
+def test_disk_cache_persists(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=1000)
+    cache.put("a", b"first")
+    cache.put("b", b"second")
+    os.utime(tmp_path / "a.bin", (0, 0))
+    reopened = DiskCache(str(tmp_path), max_size=6)
+    assert len(reopened) == 1, "Expected the oldest entries to be evicted to fit the budget"
+    assert reopened.get("b") == b"second", "Expected the entry of the earlier cache"
+    reopened.clear()
+    assert list(tmp_path.iterdir()) == [], "Expected the files to be removed"
+
+
+def test_disk_cache_entry_evicted_while_read(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_size=1000)
+    cache.put("a", b"first")
+    read_bytes = Path.read_bytes
+
+    def read_and_evict(path):
+        data = read_bytes(path)
+        path.unlink()
+        return data
+
+    monkeypatch.setattr(Path, "read_bytes", read_and_evict)
+    assert cache.get("a") is None, "Expected an entry evicted by another process to be a miss"
+    assert list(tmp_path.iterdir()) == [], "Expected the evicted file not to be created again"
+    assert cache.stats()["size"] == 0, "Expected the evicted entry not to be counted"
+
+
+def test_disk_cache_opens_while_entries_are_evicted(tmp_path, monkeypatch):
+    DiskCache(str(tmp_path), max_size=1000).put("a", b"first")
+    glob = Path.glob
+
+    def glob_with_evicted(path, pattern):
+        yield path / "evicted.bin"
+        yield from glob(path, pattern)
+
+    monkeypatch.setattr(Path, "glob", glob_with_evicted)
+    cache = DiskCache(str(tmp_path), max_size=1000)
+    assert cache.stats()["entries"] == 1, "Expected only the entries that still exist"
+
+
+def test_disk_cache_entries_of_other_processes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=1000)
+    DiskCache(str(tmp_path), max_size=1000).put("a", b"shared")
+    assert cache.get("a") == b"shared", "Expected the entry stored by the other cache"
+    assert cache.stats()["size"] == 6, "Expected the entry to be counted"
+
+
+def test_result_cache_tiers(tmp_path):
+    cache = ResultCache(max_size=1000, directory=str(tmp_path), disk_size=1000)
+    cache.put("a", b"result")
+    cache.memory.clear()
+    assert cache.get("a") == b"result", "Expected the result from disk"
+    assert "a" in cache.memory, "Expected the result from disk to be kept in memory"
+    assert ResultCache(max_size=1000).stats()["disk"] is None, "Expected no disk tier without a directory"
+
+
+def test_audio_digest(wav):
+    audio_cache.clear()
+    digest = audio_digest({"data": wav})
+    assert audio_digest({"id": 1, "modifiedTime": 1, "data": wav}) == digest, "Expected the digest of the audio"
+    assert audio_digest({"data": make_wav(np.arange(1000), 8000)}) != digest, "Expected the frame rate to matter"
+    assert audio_digest({"data": make_wav(np.arange(1000)[::-1])}) != digest, "Expected the samples to matter"
+    assert audio_digest({"id": 1}) is None, "Expected no digest without audio"
+    assert len(audio_cache) == 0, "Expected the audio not to be decoded"
+
+
+def test_result_cache_key(wav, monkeypatch):
+    file = {"id": 1, "data": wav}
+    key = result_cache_key("waveform", file, {"id": 1, "startTime": 0.5})
+    assert result_cache_key("waveform", {"id": 2, "data": wav}, {"id": 2, "startTime": 0.5}) == key, "Same audio"
+    assert result_cache_key("waveform", file, {"startTime": 0.5, "name": "a"}) == key, "Expected other keys ignored"
+    assert result_cache_key("waveform", file, {"startTime": 0.6}) != key, "Expected the parameters to matter"
+    assert result_cache_key("spectrogram", file, {"startTime": 0.5}) != key, "Expected the mode to matter"
+    assert result_cache_key("transcription", file, {}) is None, "Expected unlisted modes not to be cached"
+    assert result_cache_key("waveform", file, {"startTime": object()}) is None, "Expected no key for invalid state"
+    simple_info = result_cache_key("simple-info", {**file, "creationTime": 1}, {})
+    assert result_cache_key("simple-info", {**file, "creationTime": 2}, {}) != simple_info, "Expected the metadata"
+    monkeypatch.setattr(cache_module, "ANALYSIS_VERSION", "0")
+    assert result_cache_key("waveform", file, {"startTime": 0.5}) != key, "Expected the version to matter"
+
+
+def test_cached_analysis_runs_once(wav):
+    calls = []
+
+    def analysis(file, file_state):
+        calls.append(file_state)
+        return {"pitch": [100.0] * PACK_MIN_LENGTH}
+
+    file = {"id": 1, "data": wav}
+    first = asyncio.run(cached_analysis(None, "waveform", analysis, file, {}))
+    second = asyncio.run(cached_analysis(None, "waveform", analysis, file, {}))
+    assert first == second == {"pitch": [100.0] * PACK_MIN_LENGTH}, "Expected the result of the analysis"
+    assert len(calls) == 1, "Expected the analysis to run once"
+
+
+def test_cached_analysis_recomputes_damaged_results(wav):
+    def analysis(file, file_state):
+        return {"pitch": [100.0] * PACK_MIN_LENGTH}
+
+    file = {"id": 1, "data": wav}
+    key = result_cache_key("waveform", file, {})
+    cache_module.result_cache.put(key, encode_result({"pitch": [100.0] * PACK_MIN_LENGTH})[:-8])
+    result = asyncio.run(cached_analysis(None, "waveform", analysis, file, {}))
+    assert result == {"pitch": [100.0] * PACK_MIN_LENGTH}, "Expected the result to be computed again"
+    assert decode_result(cache_module.result_cache.get(key)) == result, "Expected the damaged result to be replaced"
+
+
+def test_cached_analysis_does_not_cache_errors(wav):
+    calls = []
+
+    def analysis(file, file_state):
+        calls.append(file_state)
+        raise HTTPException(status_code=400, detail="invalid")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            asyncio.run(cached_analysis(None, "waveform", analysis, {"data": wav}, {}))
+    assert len(calls) == 2, "Expected a failed analysis to run again"
+
+
+class SlowPool:
+    """Runs analyses like a `ModePool`, but later, so requests overlap."""
+
+    def __init__(self):
+        self.runs = 0
+
+    async def run(self, mode, analysis, file, file_state):
+        self.runs += 1
+        await asyncio.sleep(0.01)
+        return analysis(file, file_state)
+
+
+def test_cached_analysis_coalesces_concurrent_requests(wav):
+    pool = SlowPool()
+
+    def analysis(file, file_state):
+        return {"peaks": file_state.get("peakCount")}
+
+    async def run():
+        return await asyncio.gather(
+            cached_analysis(pool, "peaks", analysis, {"data": wav}, {"peakCount": 10}),
+            cached_analysis(pool, "peaks", analysis, {"data": wav}, {"peakCount": 10, "name": "a"}),
+            cached_analysis(pool, "peaks", analysis, {"data": wav}, {"peakCount": 20}),
+        )
+
+    assert asyncio.run(run()) == [{"peaks": 10}, {"peaks": 10}, {"peaks": 20}], "Expected the results"
+    assert pool.runs == 2, "Expected the identical requests to share one analysis"
+    stats = cache_module.running_analyses.stats()
+    assert stats == {"calls": 2, "coalesced": 1, "inFlight": 0}, "Expected the coalesced request to be counted"
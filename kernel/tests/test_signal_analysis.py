@@ -0,0 +1,489 @@
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from scipy.io import wavfile as wv
+from spectral.signal_analysis import (
+    FORMANT_CEILING,
+    PEAK_BASE_SAMPLES,
+    SPECTROGRAM_TILE_FRAMES,
+    AnalysisContext,
+    PeakPyramid,
+    SpectrogramPyramid,
+    analyse_time_window,
+    analysis_cache,
+    calculate_sound_pitch,
+    get_analysis_context,
+    calculate_sound_f1_f2,
+    calculate_sound_formants_for_spectrogram,
+    frame_grid,
+    formant_tracks,
+    get_audio,
+    global_peak,
+    load_wav,
+    nan_to_none,
+    signal_to_sound,
+    wav_chunks,
+)
+from spectral import signal_analysis
+
+data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+torgo_files = sorted(os.listdir(os.path.join(data_dir, "torgo-dataset")))
+
+with open(os.path.join(data_dir, "torgo-dataset/MC02_control_head_sentence1.wav"), mode="rb") as f:
+    control_sentence = f.read()
+
+
+def wav_file(samples, fs=16000):
+    buffer = io.BytesIO()
+    wv.write(buffer, fs, samples)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_load_wav_torgo(file_name):
+    path = os.path.join(data_dir, "torgo-dataset", file_name)
+    fs, expected = wv.read(path)
+    with open(path, mode="rb") as f:
+        audio = load_wav(f.read())
+    assert audio.frame_rate == fs, "Expected the sample rate of the file"
+    assert audio.samples.dtype == np.int16, "Expected 16-bit samples"
+    assert np.array_equal(audio.samples, expected), "Expected the same samples as scipy"
+
+
+def test_load_wav_is_a_view():
+    audio = load_wav(control_sentence)
+    assert not audio.samples.flags.owndata, "Expected the samples to be a view on the file"
+    assert not audio.samples.flags.writeable, "Expected the samples to be read-only"
+
+
+def test_load_wav_duration():
+    audio = get_audio({"data": control_sentence})
+    assert audio.duration_seconds == pytest.approx(4.565), "Expected duration to be approximately 4.565"
+
+
+def test_load_wav_streamed_sizes():
+    streamed = bytearray(control_sentence)
+    streamed[4:8] = b"\xff\xff\xff\xff"
+    streamed[40:44] = b"\xff\xff\xff\xff"
+    audio = load_wav(bytes(streamed))
+    assert np.array_equal(audio.samples, load_wav(control_sentence).samples), "Expected the sizes to be clamped"
+
+
+def test_load_wav_stereo():
+    left = np.arange(100, dtype=np.int16)
+    right = np.full(100, 50, dtype=np.int16)
+    audio = load_wav(wav_file(np.stack([left, right], axis=1)))
+    assert len(audio.samples) == 100, "Expected one sample per frame"
+    assert np.allclose(audio.samples, (left + right) / 2), "Expected the channels to be mixed down"
+
+
+def test_load_wav_float():
+    samples = np.linspace(-1, 1, 100, dtype=np.float32)
+    audio = load_wav(wav_file(samples, fs=8000))
+    assert audio.frame_rate == 8000, "Expected the sample rate of the file"
+    assert np.array_equal(audio.samples, samples), "Expected the float samples"
+
+
+def test_load_wav_unsupported_sample_type():
+    with pytest.raises(ValueError):
+        load_wav(wav_file(np.zeros(100, dtype=np.uint8)))
+
+
+def test_load_wav_not_wav():
+    with pytest.raises(ValueError):
+        load_wav(b"OggS" + b"\x00" * 100)
+
+
+def test_wav_chunks():
+    assert [chunk_id for chunk_id, _, _ in wav_chunks(control_sentence)] == [b"fmt ", b"data"]
+
+
+def test_signal_to_sound_from_view():
+    audio = load_wav(control_sentence)
+    sound = signal_to_sound(audio.samples, audio.frame_rate)
+    assert sound.sampling_frequency == 16000, "Expected the sample rate of the signal"
+    assert np.array_equal(sound.values[0], audio.samples), "Expected the samples of the signal"
+
+
+def formant_values_per_frame(formants, n_formants):
+    return np.array(
+        [
+            [
+                formants.get_value_at_time(formant_number=formant_number, time=formants.frame_number_to_time(frame))
+                for formant_number in range(1, n_formants + 1)
+            ]
+            for frame in range(1, len(formants) + 1)
+        ]
+    )
+
+
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_formant_tracks_torgo(file_name):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        formants = load_wav(f.read()).sound.to_formant_burg(window_length=0.025)
+    tracks = formant_tracks(formants, 5)
+    expected = formant_values_per_frame(formants, 5)
+    assert tracks.shape == (len(formants), 5), "Expected a row per frame and a column per formant"
+    assert np.array_equal(np.isnan(tracks), np.isnan(expected)), "Expected the same undefined formants"
+    assert np.allclose(tracks, expected, equal_nan=True), "Expected the same formants as the per-frame lookup"
+
+
+def test_formant_tracks_no_formants():
+    formants = load_wav(control_sentence).sound.to_formant_burg()
+    assert formant_tracks(formants, 0).shape == (len(formants), 0), "Expected an empty row per frame"
+
+
+def test_nan_to_none():
+    result = nan_to_none(np.array([[1.5, np.nan], [np.nan, 2.0]]))
+    assert result == [[1.5, None], [None, 2.0]], "Expected None where the array is NaN"
+    assert isinstance(result[0][0], float), "Expected Python floats"
+
+
+def test_calculate_sound_f1_f2_matches_per_frame_lookup():
+    sound = load_wav(control_sentence).sound
+    result = calculate_sound_f1_f2(sound, window_length=0.025)
+    expected = formant_values_per_frame(sound.to_formant_burg(window_length=0.025), 2)
+    assert len(result["data"]) == len(expected), "Expected a row per frame"
+    for row, expected_row in zip(result["data"], expected):
+        for value, expected_value in zip(row, expected_row):
+            if np.isnan(expected_value):
+                assert value is None, "Expected None for an undefined formant"
+            else:
+                assert value == pytest.approx(expected_value), "Expected the same formant as the per-frame lookup"
+
+
+def test_analysis_context_memoizes_analyses():
+    context = AnalysisContext(load_wav(control_sentence))
+    assert context.pitch() is context.pitch(), "Expected the pitch to be computed once"
+    assert context.formant() is context.formant(), "Expected the formants to be computed once"
+    assert context.spectrogram() is context.spectrogram(), "Expected the spectrogram to be computed once"
+    assert context.pitch(0.01) is not context.pitch(), "Expected other parameters to give another analysis"
+
+
+def test_analysis_context_of_sound():
+    sound = signal_to_sound(np.zeros(1600), 16000)
+    context = AnalysisContext(sound)
+    assert context.sound is sound, "Expected the given sound to be analysed"
+    assert calculate_sound_pitch(context) == calculate_sound_pitch(sound), "Expected the same pitch as the sound"
+
+
+def test_get_analysis_context_cached():
+    analysis_cache.clear()
+    first = get_analysis_context({"id": 1, "modifiedTime": 1, "data": control_sentence})
+    second = get_analysis_context({"id": 1, "modifiedTime": 1, "data": control_sentence})
+    modified = get_analysis_context({"id": 1, "modifiedTime": 2, "data": control_sentence})
+    assert first is second, "Expected the context of the same file to be reused"
+    assert modified is not first, "Expected a modified file to get a new context"
+    analysis_cache.clear()
+
+
+def test_get_analysis_context_not_cached_without_id():
+    analysis_cache.clear()
+    file = {"data": control_sentence}
+    context = get_analysis_context(file)
+    assert get_analysis_context(file) is context, "Expected the context to be kept on the file"
+    assert len(analysis_cache) == 0, "Expected a file without id not to be cached"
+
+
+def test_analysis_context_computes_different_analyses_at_once():
+    context = AnalysisContext(load_wav(control_sentence))
+    first_started = threading.Event()
+    second_done = threading.Event()
+    waited = []
+
+    def first():
+        first_started.set()
+        return second_done.wait(5)
+
+    thread = threading.Thread(target=lambda: waited.append(context._memoize(("first",), first)))
+    thread.start()
+    first_started.wait(5)
+    context._memoize(("second",), second_done.set)
+    thread.join()
+    assert waited == [True], "Expected the second analysis not to wait for the first one"
+
+
+def test_analysis_cache_measures_contexts():
+    analysis_cache.clear()
+    context = get_analysis_context({"id": 1, "modifiedTime": 1, "data": control_sentence})
+    size = analysis_cache.stats()["size"]
+    assert size == context.nbytes > 0, "Expected the size of the audio"
+    context.pitch_track()
+    assert analysis_cache.stats()["size"] == context.nbytes > size, "Expected the size to include the pitch"
+    analysis_cache.clear()
+
+
+def test_analysis_cache_budget(monkeypatch):
+    analysis_cache.clear()
+    context = get_analysis_context({"id": 1, "modifiedTime": 1, "data": control_sentence})
+    monkeypatch.setattr(analysis_cache, "max_size", context.nbytes)
+    context.spectrogram_pyramid()
+    assert len(analysis_cache) == 0, "Expected a context over the budget to be dropped"
+    analysis_cache.clear()
+
+
+def make_pyramid(n_frames, n_bins=3):
+    values = np.arange(n_bins * n_frames, dtype=np.float64).reshape(n_bins, n_frames)
+    return values, SpectrogramPyramid(
+        values, time_step=0.002, window_length=0.005, frequency_step=20.0, start_time=0.01
+    )
+
+
+def test_spectrogram_pyramid_single_tile():
+    values, pyramid = make_pyramid(SPECTROGRAM_TILE_FRAMES)
+    assert pyramid.max_zoom == 0, "Expected one level when the spectrogram fits in a tile"
+    tile = pyramid.tile(0, 0)
+    assert np.array_equal(tile["data"], values), "Expected the whole spectrogram in the tile"
+    assert tile["startTime"] == pytest.approx(0.01), "Expected the start time of the spectrogram"
+    assert tile["tiles"] == 1, "Expected one tile"
+
+
+def test_spectrogram_pyramid_levels():
+    values, pyramid = make_pyramid(4 * SPECTROGRAM_TILE_FRAMES + 1)
+    assert pyramid.max_zoom == 3, "Expected levels until the spectrogram fits in a tile"
+    assert [pyramid.tile_count(zoom) for zoom in range(4)] == [1, 2, 3, 5], "Expected the amount of tiles per level"
+
+    full = pyramid.tile(3, 1)
+    assert np.array_equal(full["data"], values[:, SPECTROGRAM_TILE_FRAMES : 2 * SPECTROGRAM_TILE_FRAMES])
+    assert full["timeStep"] == pytest.approx(0.002), "Expected the time step of the spectrogram"
+    assert full["startTime"] == pytest.approx(0.01 + SPECTROGRAM_TILE_FRAMES * 0.002), "Expected the frame time"
+    assert pyramid.tile(3, 4)["data"].shape == (3, 1), "Expected a partial last tile"
+
+    half = pyramid.tile(2, 0)
+    assert np.allclose(half["data"][:, 0], values[:, 0:2].mean(axis=1)), "Expected the mean of two frames"
+    assert half["timeStep"] == pytest.approx(0.004), "Expected twice the time step"
+    assert half["startTime"] == pytest.approx(0.011), "Expected the center of the two frames"
+
+    coarsest = pyramid.tile(0, 0)
+    assert coarsest["data"].shape == (3, SPECTROGRAM_TILE_FRAMES // 2 + 1), "Expected the whole spectrogram"
+    assert np.allclose(coarsest["data"][:, 0], values[:, 0:8].mean(axis=1)), "Expected the mean of eight frames"
+    assert np.allclose(coarsest["data"][:, -1], values[:, -1]), "Expected the odd last frame to be kept"
+
+
+def test_spectrogram_pyramid_odd_frame_count():
+    values, pyramid = make_pyramid(2 * SPECTROGRAM_TILE_FRAMES + 3)
+    assert pyramid.max_zoom == 2, "Expected levels until the spectrogram fits in a tile"
+    coarsest = pyramid.tile(0, 0)["data"]
+    assert coarsest.shape == (3, SPECTROGRAM_TILE_FRAMES // 2 + 1), "Expected a frame for every four frames"
+    expected = [values[:, start : start + 4].mean(axis=1) for start in range(0, values.shape[1], 4)]
+    assert np.allclose(coarsest, np.stack(expected, axis=1)), "Expected the mean of the frames that are covered"
+
+
+@pytest.mark.parametrize("zoom,index", [(-1, 0), (2, 0), (1, 2), (0, -1)])
+def test_spectrogram_pyramid_tile_not_found(zoom, index):
+    _, pyramid = make_pyramid(2 * SPECTROGRAM_TILE_FRAMES)
+    with pytest.raises(IndexError):
+        pyramid.tile(zoom, index)
+
+
+def test_analysis_context_spectrogram_pyramid():
+    context = AnalysisContext(load_wav(control_sentence))
+    pyramid = context.spectrogram_pyramid()
+    assert pyramid is context.spectrogram_pyramid(), "Expected the pyramid to be built once"
+    assert {key[0] for key in context._analyses} == {"spectrogram_pyramid"}, "Expected the spectrogram to be dropped"
+    spectrogram = context.spectrogram().as_array()
+    tile = pyramid.tile(pyramid.max_zoom, 0)
+    assert np.allclose(tile["data"], spectrogram[:, :SPECTROGRAM_TILE_FRAMES], rtol=1e-6), "Expected the spectrogram"
+
+
+def test_peak_pyramid_levels():
+    samples = np.random.default_rng(0).integers(-(2**15), 2**15, 5 * PEAK_BASE_SAMPLES + 3, dtype=np.int16)
+    pyramid = PeakPyramid(samples, 16000)
+    assert pyramid.samples_per_peak == [PEAK_BASE_SAMPLES * 2**level for level in range(4)], "Expected levels to 1 peak"
+
+    finest = pyramid.peaks(6)
+    assert finest["samplesPerPeak"] == PEAK_BASE_SAMPLES, "Expected the finest level that fits"
+    buckets = [samples[start : start + PEAK_BASE_SAMPLES] for start in range(0, len(samples), PEAK_BASE_SAMPLES)]
+    assert finest["min"] == [bucket.min() for bucket in buckets], "Expected the minimum of every bucket"
+    assert finest["max"] == [bucket.max() for bucket in buckets], "Expected the maximum of every bucket"
+    expected_rms = [np.sqrt(np.mean(np.square(bucket, dtype=np.float64))) for bucket in buckets]
+    assert np.allclose(finest["rms"], expected_rms), "Expected the RMS of every bucket"
+
+    coarser = pyramid.peaks(3)
+    assert coarser["samplesPerPeak"] == 2 * PEAK_BASE_SAMPLES, "Expected a coarser level"
+    assert len(coarser["min"]) == 3, "Expected a peak for every two buckets"
+    assert coarser["min"][0] == samples[: 2 * PEAK_BASE_SAMPLES].min(), "Expected the minimum of two buckets"
+    last_samples = samples[4 * PEAK_BASE_SAMPLES :].astype(np.float64)
+    assert coarser["rms"][2] == pytest.approx(
+        np.sqrt(np.mean(np.square(last_samples)))
+    ), "Expected the RMS of a partial peak"
+    assert len(pyramid.peaks(2)["min"]) == 2, "Expected the odd last peak to be kept"
+
+    coarsest = pyramid.peaks(1)
+    assert coarsest["min"] == [samples.min()], "Expected the minimum of the signal"
+    assert coarsest["max"] == [samples.max()], "Expected the maximum of the signal"
+    assert coarsest["rms"][0] == pytest.approx(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))), "Expected RMS"
+
+
+def test_peak_pyramid_empty():
+    peaks = PeakPyramid(np.zeros(0, dtype=np.int16), 16000).peaks(10)
+    assert peaks["min"] == [], "Expected no peaks for an empty signal"
+
+
+def test_analysis_context_peak_pyramid():
+    audio = load_wav(control_sentence)
+    pyramid = AnalysisContext(audio).peak_pyramid()
+    assert pyramid is not AnalysisContext(audio).peak_pyramid(), "Expected another context to compute its own"
+    context = AnalysisContext(audio.sound)
+    assert context.peak_pyramid() is context.peak_pyramid(), "Expected the pyramid to be computed once"
+    assert context.peak_pyramid().peaks(1)["max"] == [float(audio.samples.max())], "Expected the samples of the sound"
+
+
+@pytest.mark.parametrize(
+    "analyse,window_duration,time_step",
+    [
+        (lambda sound: sound.to_pitch(time_step=0.01), 0.04, 0.01),
+        (lambda sound: sound.to_spectrogram(time_step=0.002, window_length=0.005), 0.01, 0.002),
+        (lambda sound: sound.resample(11000).to_formant_burg(time_step=0.00625), 0.05, 0.00625),
+    ],
+)
+@pytest.mark.parametrize("file_name", torgo_files[:3])
+def test_frame_grid_matches_praat(file_name, analyse, window_duration, time_step):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        sound = load_wav(f.read()).sound
+    analysis = analyse(sound)
+    resampled = sound.resample(11000) if window_duration == 0.05 else sound
+    n_frames, first_frame_time = frame_grid(resampled, window_duration, time_step)
+    assert n_frames == analysis.n_frames, "Expected the amount of frames of Praat"
+    assert first_frame_time == pytest.approx(
+        analysis.get_time_from_frame_number(1)
+    ), "Expected the first frame of Praat"
+
+
+@pytest.mark.parametrize("start_time,end_time", [(0, 1), (1.0, 2.0), (2.5, None), (None, 0.3), (4.0, 10)])
+def test_pitch_time_window_matches_whole_file(start_time, end_time):
+    context = AnalysisContext(load_wav(control_sentence))
+    whole = calculate_sound_pitch(context)
+    window = calculate_sound_pitch(context, start_time=start_time, end_time=end_time)
+    first_frame = round((window["start_time"] - whole["start_time"]) / whole["time_step"])
+    assert window["start_time"] == pytest.approx(whole["start_time"] + first_frame * whole["time_step"]), "On the grid"
+    assert window["start_time"] >= (start_time or 0), "Expected the first frame in the window"
+    last_time = window["start_time"] + (len(window["data"]) - 1) * window["time_step"]
+    assert last_time <= min(end_time or 10, 4.565), "Expected the last frame in the window"
+    expected = whole["data"][first_frame : first_frame + len(window["data"])]
+    assert window["data"] == expected, "Expected the same pitch as the analysis of the whole file"
+
+
+def test_pitch_time_windows_stitch():
+    context = AnalysisContext(load_wav(control_sentence))
+    whole = calculate_sound_pitch(context)
+    first = calculate_sound_pitch(context, end_time=2.0)
+    second = calculate_sound_pitch(context, start_time=2.0)
+    assert first["data"] + second["data"] == whole["data"], "Expected adjacent windows to stitch into the whole file"
+
+
+def test_time_window_outside_of_file():
+    context = AnalysisContext(load_wav(control_sentence))
+    assert calculate_sound_pitch(context, start_time=10, end_time=11)["data"] == [], "Expected no frames"
+    assert calculate_sound_f1_f2(context, start_time=10)["data"] == [], "Expected no frames"
+
+
+@pytest.mark.parametrize("start_time,end_time", [(0, 1), (1.0, 2.0), (2.5, None)])
+def test_formant_time_window_matches_whole_file(start_time, end_time):
+    context = AnalysisContext(load_wav(control_sentence))
+    whole = calculate_sound_formants_for_spectrogram(context)
+    window = calculate_sound_formants_for_spectrogram(context, start_time=start_time, end_time=end_time)
+    first_frame = round((window["startTime"] - whole["startTime"]) / whole["timeStep"])
+    assert window["startTime"] == pytest.approx(whole["startTime"] + first_frame * whole["timeStep"]), "On the grid"
+    expected = np.array(whole["formants"][first_frame : first_frame + len(window["formants"])], dtype=np.float64)
+    actual = np.array(window["formants"], dtype=np.float64)
+    assert actual.shape == expected.shape, "Expected the frames of the whole file in the window"
+    assert np.array_equal(np.isnan(actual), np.isnan(expected)), "Expected the same undefined formants"
+    # frames centered exactly on a sample can have their analysis window one sample off
+    resampled = context.resampled(2 * FORMANT_CEILING)
+    frame_times = window["startTime"] + np.arange(len(actual)) * window["timeStep"]
+    positions = (frame_times - resampled.x1) / resampled.dx
+    on_sample = np.abs(positions - np.round(positions)) < 1e-6
+    error = np.nan_to_num(np.abs(actual - expected)).max(axis=1)
+    assert np.all(error[~on_sample] < 1e-6), "Expected the formants of the analysis of the whole file"
+    assert np.all(error[on_sample] < 250), "Expected the formants of the frames on a sample to be close"
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def load_torgo_sound(file_name):
+    with open(os.path.join(data_dir, "torgo-dataset", file_name), mode="rb") as f:
+        return load_wav(f.read()).sound
+
+
+@pytest.mark.parametrize("chunk_duration", [0.5, 1.0])
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_chunked_pitch_matches_single_shot(process_pool, file_name, chunk_duration):
+    sound = load_torgo_sound(file_name)
+    pitch = sound.to_pitch(time_step=0.01)
+    expected = pitch.selected_array["frequency"]
+    actual, first_frame_time = analyse_time_window(
+        sound, None, None, 0.04, 0.01, "pitch", {"peak": global_peak(sound)}, process_pool, chunk_duration
+    )
+    assert first_frame_time == pytest.approx(pitch.get_time_from_frame_number(1)), "Expected the frames of Praat"
+    assert actual.shape == expected.shape, "Expected the frames of Praat"
+    # the path finder sees less context and frame times differ by a rounding error, so a few frames can differ
+    assert np.mean((actual > 0) != (expected > 0)) <= 0.01, "Expected the same voicing"
+    voiced = (actual > 0) & (expected > 0)
+    assert np.mean(np.abs(actual[voiced] - expected[voiced]) < 0.01 * expected[voiced]) >= 0.99, "Expected the pitch"
+
+
+@pytest.mark.parametrize("file_name", torgo_files)
+def test_chunked_formants_match_single_shot(process_pool, file_name):
+    sound = load_torgo_sound(file_name)
+    formants = sound.to_formant_burg(time_step=0.00625)
+    expected = formant_tracks(formants, 5)
+    actual, first_frame_time = analyse_time_window(
+        sound.resample(11000),
+        None,
+        None,
+        0.05,
+        0.00625,
+        "formant",
+        {"window_length": 0.025, "n_formants": 5},
+        process_pool,
+        chunk_duration=1.0,
+    )
+    assert first_frame_time == pytest.approx(formants.get_time_from_frame_number(1)), "Expected the frames of Praat"
+    assert actual.shape == expected.shape, "Expected the frames of Praat"
+    assert np.mean(np.isnan(actual) != np.isnan(expected)) <= 0.01, "Expected the same undefined formants"
+    defined = ~np.isnan(actual) & ~np.isnan(expected)
+    relative_error = np.abs(actual[defined] - expected[defined]) / expected[defined]
+    assert np.mean(relative_error < 0.01) >= 0.99, "Expected the formants of the whole file"
+
+
+def test_start_and_shutdown_analysis_pool():
+    signal_analysis.start_analysis_pool(2)
+    pool = signal_analysis.analysis_pool()
+    try:
+        assert isinstance(pool, ProcessPoolExecutor), "Expected a process pool"
+        assert pool.submit(int, "1").result() == 1, "Expected the pool to run jobs"
+    finally:
+        signal_analysis.shutdown_analysis_pool()
+    assert signal_analysis.analysis_pool() is None, "Expected no pool after shutting it down"
+    with pytest.raises(RuntimeError):
+        pool.submit(int, "1")
+
+    signal_analysis.start_analysis_pool(1)
+    assert signal_analysis.analysis_pool() is None, "Expected no pool for a single process"
+
+
+def test_analysis_context_chunks_long_sounds(monkeypatch, process_pool):
+    monkeypatch.setattr(signal_analysis, "ANALYSIS_CHUNK_DURATION", 1.0)
+    monkeypatch.setattr(signal_analysis, "analysis_pool", lambda: process_pool)
+    sound = load_wav(control_sentence).sound
+    chunked = AnalysisContext(sound)
+    pitch = calculate_sound_pitch(chunked)
+    assert "pitch" not in {key[0] for key in chunked._analyses}, "Expected no Pitch object for a long sound"
+
+    monkeypatch.setattr(signal_analysis, "ANALYSIS_CHUNK_DURATION", 30.0)
+    expected = calculate_sound_pitch(sound)
+    assert pitch["start_time"] == pytest.approx(expected["start_time"]), "Expected the frames of the whole file"
+    assert len(pitch["data"]) == len(expected["data"]), "Expected the frames of the whole file"
+    formants = calculate_sound_formants_for_spectrogram(chunked)
+    assert len(formants["formants"]) == len(calculate_sound_formants_for_spectrogram(sound)["formants"]), "All frames"
+    f1_f2 = calculate_sound_f1_f2(chunked)["data"]
+    assert f1_f2 == [frame[:2] for frame in formants["formants"]], "Expected the formant tracks to be shared"
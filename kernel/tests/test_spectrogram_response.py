@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+from spectral.spectrogram_response import (
+    SPECTROGRAM_FLOAT32_MEDIA_TYPE,
+    SPECTROGRAM_UINT8_MEDIA_TYPE,
+    encode_spectrogram,
+    negotiate_spectrogram_encoding,
+    quantize_spectrogram,
+    spectrogram_response,
+)
+
+
+def decode_spectrogram(payload):
+    header_length = int.from_bytes(payload[:4], "little")
+    header = json.loads(payload[4 : 4 + header_length])
+    values = np.frombuffer(payload[4 + header_length :], dtype=header["dtype"]).reshape(header["shape"])
+    return header, values
+
+
+@pytest.fixture
+def spectrogram():
+    return {
+        "timeStep": 0.002,
+        "windowLength": 0.005,
+        "frequencyStep": 20.0,
+        "startTime": 0.0035,
+        "data": np.array([[1e-4, 1e-6, 0.0], [4e-10, 1e-12, 2e-5]]),
+    }
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [
+        (None, None),
+        ("", None),
+        ("application/json", None),
+        ("*/*", None),
+        (SPECTROGRAM_FLOAT32_MEDIA_TYPE, "float32"),
+        (SPECTROGRAM_UINT8_MEDIA_TYPE, "uint8"),
+        ("application/octet-stream", "float32"),
+        (f"{SPECTROGRAM_FLOAT32_MEDIA_TYPE}, application/json", None),
+        (f"{SPECTROGRAM_FLOAT32_MEDIA_TYPE}, application/json;q=0.9", "float32"),
+        (f"{SPECTROGRAM_FLOAT32_MEDIA_TYPE};q=0.5, {SPECTROGRAM_UINT8_MEDIA_TYPE}", "uint8"),
+        (f"{SPECTROGRAM_UINT8_MEDIA_TYPE};q=0", None),
+        (f"{SPECTROGRAM_UINT8_MEDIA_TYPE};q=x", None),
+        ("text/html", None),
+    ],
+)
+def test_negotiate_spectrogram_encoding(accept, expected):
+    assert negotiate_spectrogram_encoding(accept) == expected, "Expected the preferred supported encoding"
+
+
+def test_quantize_spectrogram():
+    values = np.array([[4e-10 * 10**7, 4e-10 * 10**3.5, 4e-10, 0.0]])
+    quantized, db_min, db_max = quantize_spectrogram(values)
+    assert quantized.dtype == np.uint8, "Expected unsigned bytes"
+    assert db_max == pytest.approx(70.0), "Expected the maximum in dB relative to 2e-5 Pa"
+    assert db_min == pytest.approx(0.0), "Expected the minimum 70 dB below the maximum"
+    assert quantized.tolist() == [[255, 128, 0, 0]], "Expected dB values scaled to the byte range and clipped"
+
+
+def test_quantize_spectrogram_silence():
+    quantized, _, _ = quantize_spectrogram(np.zeros((2, 2)))
+    assert quantized.tolist() == [[0, 0], [0, 0]], "Expected silence to be quantized to 0"
+
+
+def test_encode_spectrogram_float32(spectrogram):
+    header, values = decode_spectrogram(encode_spectrogram(spectrogram, "float32"))
+    assert header["shape"] == [2, 3], "Expected the shape of the spectrogram in the header"
+    assert header["timeStep"] == 0.002, "Expected the time step in the header"
+    assert values.dtype == np.dtype("<f4"), "Expected little-endian float32 values"
+    assert np.allclose(values, spectrogram["data"], rtol=1e-6, atol=0), "Expected the float32 values"
+
+
+def test_encode_spectrogram_aligned(spectrogram):
+    payload = encode_spectrogram(spectrogram, "float32")
+    header_length = int.from_bytes(payload[:4], "little")
+    assert header_length % 4 == 0, "Expected the values to be aligned to 4 bytes"
+    assert len(payload) == 4 + header_length + 6 * 4, "Expected 4 bytes per value"
+
+
+def test_encode_spectrogram_uint8(spectrogram):
+    header, values = decode_spectrogram(encode_spectrogram(spectrogram, "uint8"))
+    assert values.dtype == np.uint8, "Expected unsigned byte values"
+    assert header["dbMax"] == pytest.approx(10 * np.log10(1e-4 / 4e-10)), "Expected the maximum in dB"
+    assert header["dbMax"] - header["dbMin"] == pytest.approx(70.0), "Expected a range of 70 dB"
+    assert values[0, 0] == 255, "Expected the maximum to be quantized to 255"
+
+
+def test_spectrogram_response_json(spectrogram):
+    response = spectrogram_response(spectrogram, "application/json")
+    assert response.media_type == "application/json", "Expected a JSON response"
+    assert json.loads(response.body)["data"] == spectrogram["data"].tolist(), "Expected the values as nested lists"
+    assert response.headers["vary"] == "Accept", "Expected the response to vary on the Accept header"
+
+
+def test_spectrogram_response_none():
+    response = spectrogram_response(None, SPECTROGRAM_FLOAT32_MEDIA_TYPE)
+    assert response.media_type == "application/json", "Expected a JSON response without a spectrogram"
+    assert response.body == b"null", "Expected null without a spectrogram"
+
+
+def test_spectrogram_response_binary(spectrogram):
+    response = spectrogram_response(spectrogram, SPECTROGRAM_UINT8_MEDIA_TYPE)
+    assert response.media_type == SPECTROGRAM_UINT8_MEDIA_TYPE, "Expected the negotiated media type"
+    header, _ = decode_spectrogram(response.body)
+    assert header["dtype"] == "uint8", "Expected uint8 values"
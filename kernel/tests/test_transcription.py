@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import torch
 from unittest.mock import Mock, patch
@@ -197,7 +198,7 @@ def test_hf_transcription_no_model():
 def test_hf_transcription_basic(mock_model_getter, sig_duration, get_audio):
     fake_audio = Mock()
     get_audio.return_value = fake_audio
-    fake_audio.raw_data = b""
+    fake_audio.samples = np.zeros(0, dtype=np.int16)
     sig_duration.return_value = 1.5
     mock_model = Mock()
     mock_processor = Mock()
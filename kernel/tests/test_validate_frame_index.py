@@ -1,6 +1,6 @@
 import pytest
 from fastapi import HTTPException
-from spectral.frame_analysis import validate_frame_index
+from spectral.frame_analysis import validate_frame_index, validate_frames
 from array import array
 
 
@@ -49,3 +49,23 @@ def test_frame_none():
     data = [0] * 100
     frame_index = validate_frame_index(array("h", data), {"frame": None})
     assert frame_index is None
+
+
+def test_validate_frames_valid():
+    frames = [{"startIndex": 10, "endIndex": 20}, {"startIndex": 0, "endIndex": 100}]
+    assert validate_frames(array("h", [0] * 100), {"frames": frames}) == frames
+
+
+@pytest.mark.parametrize(
+    "frames",
+    [None, {"startIndex": 10, "endIndex": 20}, [[10, 20]], [{"startIndex": None, "endIndex": None}]],
+)
+def test_validate_frames_invalid(frames):
+    with pytest.raises(HTTPException):
+        validate_frames(array("h", [0] * 100), {"frames": frames})
+
+
+def test_validate_frames_invalid_frame():
+    frames = [{"startIndex": 10, "endIndex": 20}, {"startIndex": 10, "endIndex": 200}]
+    with pytest.raises(HTTPException):
+        validate_frames(array("h", [0] * 100), {"frames": frames})